@@ -0,0 +1,262 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from donnees import REPERTOIRE_MAGASIN, charger_donnees_brutes, entree_magasin
+from ressources import gestionnaire
+from score_lot import lire_par_morceaux, taille_morceau
+from statistiques_flux import TAILLE_CROQUIS, MesureMemoire, analyser, types_colonnes
+
+# Cube d'agrégats de la page de visualisation : tout ce que tracent les graphiques
+# (histogrammes, densités, boîtes, effectifs, moments par groupe, corrélations) est calculé
+# une seule fois par empreinte des données, puis enregistré à côté du magasin Parquet.
+# Les graphiques ne lisent plus que ces petits tableaux : leur coût ne dépend plus du nombre de lignes.
+
+FORMAT_CUBE = 2  # Version 2 : cubes calculés sur les jeux où les catégories manquantes sont nulles
+NB_CLASSES = 30  # Classes des histogrammes (comme sns.histplot(bins=30))
+NB_POINTS_DENSITE = 512  # Grille de la densité estimée par noyau
+# Au-delà de ce nombre de lignes, le cube est calculé en flux depuis le fichier Parquet, sans charger le jeu
+SEUIL_LIGNES_FLUX = int(os.environ.get("STUDENT_STATS_FLUX_LIGNES", "5000000"))
+BUDGET_FLUX = 64 * 1024 ** 2
+
+
+# Grille fine de la densité par noyau gaussien (fenêtre de Scott, comme gaussian_kde)
+def _grille_densite(n, ecart_type, minimum, maximum):
+    if n < 2 or not ecart_type > 0:
+        return None, None
+    fenetre = ecart_type * n ** (-1 / 5)
+    return np.linspace(minimum - 3 * fenetre, maximum + 3 * fenetre, NB_POINTS_DENSITE + 1), fenetre
+
+
+# Lissage de l'histogramme fin, à l'échelle des effectifs de l'histogramme à NB_CLASSES classes
+def _lisser(effectifs, bornes, fenetre, largeur_classe):
+    pas = bornes[1] - bornes[0]
+    demi = int(np.ceil(4 * fenetre / pas))
+    decalages = np.arange(-demi, demi + 1) * pas
+    noyau = np.exp(-0.5 * (decalages / fenetre) ** 2) / (fenetre * np.sqrt(2 * np.pi))
+    return {"x": (bornes[:-1] + bornes[1:]) / 2, "y": np.convolve(effectifs, noyau, mode="same") * largeur_classe}
+
+
+def _densite(valeurs, largeur_classe):
+    bornes, fenetre = _grille_densite(valeurs.size, valeurs.std(ddof=1) if valeurs.size > 1 else 0.0,
+                                      valeurs.min() if valeurs.size else 0.0, valeurs.max() if valeurs.size else 0.0)
+    if bornes is None:
+        return None
+    effectifs, _ = np.histogram(valeurs, bins=bornes)
+    return _lisser(effectifs, bornes, fenetre, largeur_classe)
+
+
+# Statistiques de boîtes à moustaches (mêmes règles que matplotlib : quartiles linéaires,
+# moustaches à 1,5 IQR) et moments, par groupe ; les valeurs aberrantes sont dédoublonnées
+def _boites(valeurs, groupes):
+    df = pd.DataFrame({"g": groupes, "x": valeurs})
+    df = df[(df["g"] >= 0) & df["x"].notna()]
+    gb = df.groupby("g")["x"]
+
+    quartiles = gb.quantile([0.25, 0.5, 0.75]).unstack()
+    iqr = quartiles[0.75] - quartiles[0.25]
+    bas = (quartiles[0.25] - 1.5 * iqr).reindex(df["g"]).to_numpy()
+    haut = (quartiles[0.75] + 1.5 * iqr).reindex(df["g"]).to_numpy()
+    dedans = (df["x"].to_numpy() >= bas) & (df["x"].to_numpy() <= haut)
+
+    interieur = df[dedans].groupby("g")["x"]
+    moustache_basse, moustache_haute = interieur.min(), interieur.max()
+    aberrantes = df[~dedans].drop_duplicates().groupby("g")["x"]
+    aberrantes = {g: np.sort(x.to_numpy()) for g, x in aberrantes}
+    moments = gb.agg(["count", "mean", "std"])
+
+    boites = {}
+    for g in quartiles.index:
+        boites[g] = {
+            "q1": quartiles.at[g, 0.25], "med": quartiles.at[g, 0.5], "q3": quartiles.at[g, 0.75],
+            "whislo": moustache_basse.get(g, quartiles.at[g, 0.25]),
+            "whishi": moustache_haute.get(g, quartiles.at[g, 0.75]),
+            "fliers": aberrantes.get(g, np.empty(0)),
+            "count": int(moments.at[g, "count"]), "mean": moments.at[g, "mean"], "std": moments.at[g, "std"],
+        }
+    return boites
+
+
+# Construction du cube à partir du DataFrame complet (un seul passage par agrégat)
+def calculer_agregats(data):
+    quantitatives, qualitatives = types_colonnes(data)
+    cube = {
+        "format": FORMAT_CUBE,
+        "methode": "memoire",
+        "nb_lignes": len(data),
+        "quantitatives": quantitatives,
+        "qualitatives": qualitatives,
+        "generales": {
+            "moyenne_exam_score": data["Exam_Score"].mean(),
+            "moyenne_sleep": data["Sleep_Hours"].mean(),
+            "heures_etude_median": data["Hours_Studied"].median(),
+        },
+        "histogrammes": {},
+        "boites": {},
+        "effectifs": {},
+        "groupes": {},
+        "correlation": data[quantitatives].corr(),
+        "describe_quantitatives": data[quantitatives].describe() if quantitatives else None,
+        "describe_qualitatives": data[qualitatives].describe() if qualitatives else None,
+    }
+
+    tous = np.zeros(len(data), dtype=np.int64)
+    for colonne in quantitatives:
+        valeurs = data[colonne].dropna().to_numpy(dtype=np.float64)
+        effectifs, bornes = np.histogram(valeurs, bins=NB_CLASSES)
+        cube["histogrammes"][colonne] = {"effectifs": effectifs, "bornes": bornes,
+                                         "densite": _densite(valeurs, bornes[1] - bornes[0])}
+        cube["boites"][colonne] = _boites(data[colonne], tous).get(0)
+
+    for qualitative in qualitatives:
+        # Ordre d'apparition des catégories, comme seaborn
+        codes, categories = pd.factorize(data[qualitative])
+        cube["effectifs"][qualitative] = pd.Series(np.bincount(codes[codes >= 0], minlength=len(categories)),
+                                                   index=categories, name="count")
+        for quantitative in quantitatives:
+            boites = _boites(data[quantitative], codes)
+            cube["groupes"][(qualitative, quantitative)] = {categories[g]: boite for g, boite in boites.items()}
+    return cube
+
+
+# Boîtes à moustaches d'un passage en flux : quartiles issus des croquis, moustaches et
+# valeurs aberrantes exactes (calculées au second passage, une fois les bornes connues)
+class _BoiteFlux:
+    def __init__(self, croquis, moments, j):
+        self.q1, self.med, self.q3 = croquis.quantiles([0.25, 0.5, 0.75])
+        iqr = self.q3 - self.q1
+        self.bas, self.haut = self.q1 - 1.5 * iqr, self.q3 + 1.5 * iqr
+        self.count, self.mean = int(moments.n[j]), moments.moyenne[j]
+        self.std = moments.ecart_type[j]
+        self.whislo, self.whishi = np.inf, -np.inf
+        self.fliers = np.empty(0)
+
+    def mettre_a_jour(self, valeurs):
+        valeurs = valeurs[~np.isnan(valeurs)]
+        dedans = (valeurs >= self.bas) & (valeurs <= self.haut)
+        if dedans.any():
+            self.whislo = min(self.whislo, valeurs[dedans].min())
+            self.whishi = max(self.whishi, valeurs[dedans].max())
+        if not dedans.all():
+            self.fliers = np.union1d(self.fliers, valeurs[~dedans])
+
+    def statistiques(self):
+        return {"q1": self.q1, "med": self.med, "q3": self.q3,
+                "whislo": self.whislo if np.isfinite(self.whislo) else self.q1,
+                "whishi": self.whishi if np.isfinite(self.whishi) else self.q3,
+                "fliers": self.fliers, "count": self.count, "mean": self.mean, "std": self.std}
+
+
+# Construction du cube en deux passages à mémoire bornée sur un fichier CSV ou Parquet :
+# le premier accumule moments, croquis de quantiles, effectifs et covariance ; le second,
+# connaissant minimums, maximums et quartiles, compte les histogrammes et fixe les moustaches
+def calculer_agregats_flux(source, budget_octets=BUDGET_FLUX, k=TAILLE_CROQUIS):
+    stats, memoire_passage_1 = analyser(source, budget_octets, k=k, par_groupe=True)
+    quantitatives, qualitatives = stats.quantitatives, stats.qualitatives
+    moments = stats.moments
+
+    histogrammes, densites, boites, boites_groupes = {}, {}, {}, {}
+    for j, colonne in enumerate(quantitatives):
+        histogrammes[colonne] = np.zeros(NB_CLASSES, dtype=np.int64)
+        densites[colonne] = _grille_densite(moments.n[j], moments.ecart_type[j], moments.min[j], moments.max[j])
+        boites[colonne] = _BoiteFlux(stats.croquis[colonne], moments, j)
+    for qualitative in qualitatives:
+        groupes = stats.groupes[qualitative]
+        for categorie, moments_groupe in groupes.moments.items():
+            for j, quantitative in enumerate(quantitatives):
+                boites_groupes[(qualitative, categorie, quantitative)] = _BoiteFlux(
+                    groupes.croquis[categorie][j], moments_groupe, j)
+    effectifs_densite = {colonne: np.zeros(NB_POINTS_DENSITE, dtype=np.int64) for colonne in quantitatives}
+
+    with MesureMemoire() as memoire_passage_2:
+        for morceau in lire_par_morceaux(source, taille_morceau(budget_octets, 20)):
+            X = morceau[quantitatives].to_numpy(dtype=np.float64, na_value=np.nan)
+            for j, colonne in enumerate(quantitatives):
+                valeurs = X[:, j][~np.isnan(X[:, j])]
+                histogrammes[colonne] += np.histogram(valeurs, bins=NB_CLASSES,
+                                                      range=(moments.min[j], moments.max[j]))[0]
+                bornes_densite = densites[colonne][0]
+                if bornes_densite is not None:
+                    effectifs_densite[colonne] += np.histogram(valeurs, bins=bornes_densite)[0]
+                boites[colonne].mettre_a_jour(X[:, j])
+            for qualitative in qualitatives:
+                codes, categories = pd.factorize(morceau[qualitative])
+                for g, categorie in enumerate(categories):
+                    lignes = X[codes == g]
+                    for j, quantitative in enumerate(quantitatives):
+                        boites_groupes[(qualitative, categorie, quantitative)].mettre_a_jour(lignes[:, j])
+            memoire_passage_2.echantillonner()
+
+    cube = {
+        "format": FORMAT_CUBE,
+        "methode": "flux",
+        "nb_lignes": stats.nb_lignes,
+        "quantitatives": quantitatives,
+        "qualitatives": qualitatives,
+        "generales": {
+            "moyenne_exam_score": moments.moyenne[quantitatives.index("Exam_Score")],
+            "moyenne_sleep": moments.moyenne[quantitatives.index("Sleep_Hours")],
+            "heures_etude_median": stats.croquis["Hours_Studied"].quantile(0.5),
+        },
+        "histogrammes": {},
+        "boites": {colonne: boite.statistiques() for colonne, boite in boites.items()},
+        "effectifs": {colonne: stats.categories[colonne].serie() for colonne in qualitatives},
+        "groupes": {},
+        "correlation": stats.correlation(),
+        "describe_quantitatives": stats.describe_quantitatives(),
+        "describe_qualitatives": stats.describe_qualitatives(),
+        "memoire": {"passage_1": memoire_passage_1, "passage_2": memoire_passage_2.rapport()},
+    }
+    for j, colonne in enumerate(quantitatives):
+        bornes = np.linspace(moments.min[j], moments.max[j], NB_CLASSES + 1)
+        bornes_densite, fenetre = densites[colonne]
+        cube["histogrammes"][colonne] = {
+            "effectifs": histogrammes[colonne], "bornes": bornes,
+            "densite": None if bornes_densite is None else _lisser(effectifs_densite[colonne], bornes_densite,
+                                                                      fenetre, bornes[1] - bornes[0]),
+        }
+    for qualitative in qualitatives:
+        for quantitative in quantitatives:
+            cube["groupes"][(qualitative, quantitative)] = {
+                categorie: boites_groupes[(qualitative, categorie, quantitative)].statistiques()
+                for categorie in stats.groupes[qualitative].moments}
+    return cube
+
+
+def chemin_cube(empreinte_donnees, repertoire=REPERTOIRE_MAGASIN, methode="memoire"):
+    suffixe = "-flux" if methode == "flux" else ""
+    return os.path.join(repertoire, f"agregats-{empreinte_donnees[:16]}-v{FORMAT_CUBE}{suffixe}.joblib")
+
+
+# Cube d'un jeu de données : relu depuis le disque s'il existe pour cette empreinte, sinon calculé
+# (en mémoire depuis le DataFrame, ou en flux depuis le fichier source) et enregistré
+def obtenir_agregats(data, empreinte_donnees, repertoire=REPERTOIRE_MAGASIN, source=None):
+    chemin = chemin_cube(empreinte_donnees, repertoire, "memoire" if source is None else "flux")
+    if os.path.exists(chemin):
+        cube = joblib.load(chemin)
+    else:
+        cube = calculer_agregats(data) if source is None else calculer_agregats_flux(source)
+        os.makedirs(repertoire, exist_ok=True)
+        temporaire = chemin + ".tmp"
+        joblib.dump(cube, temporaire)
+        os.replace(temporaire, chemin)
+    # L'empreinte accompagne le cube : elle indexe les graphiques rendus depuis ce cube
+    cube["empreinte"] = empreinte_donnees
+    return cube
+
+
+# Cube des données brutes, partagé par toutes les sessions du processus ; un jeu trop volumineux
+# n'est jamais chargé en entier : le cube est calculé en flux depuis son fichier Parquet
+def charger_agregats():
+    return gestionnaire.obtenir(("agregats", "brutes"), _construire_agregats, "agregats")
+
+
+def _construire_agregats():
+    entree = entree_magasin("brutes")
+    fichier = os.path.join(REPERTOIRE_MAGASIN, entree["fichier"])
+    if pq.ParquetFile(fichier).metadata.num_rows > SEUIL_LIGNES_FLUX:
+        return obtenir_agregats(None, entree["sha256"], source=fichier)
+    return obtenir_agregats(charger_donnees_brutes(), entree["sha256"])
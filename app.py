@@ -1,9 +1,9 @@
+import time
 import streamlit as st
-import pandas as pd
-from visualisation import afficher_page_visualisation
-from introduction import page_introduction
-from modelisation import page_modelisation
-from prediction import page_prediction  # Assurez-vous que page_prediction est importé
+from registre_pages import PAGES, afficher_page  # Les modules des pages sont importés à la demande
+from instrumentation import debut_execution, profiler
+from panneau_instrumentation import options_instrumentation, afficher_panneau
+import ressources
 
 # Définir la configuration de la page en premier
 st.set_page_config(page_title="Student Performance Analysis", page_icon="📊", layout="wide")
@@ -124,16 +124,14 @@ st.markdown("""
     Vous pouvez naviguer entre les différentes pages pour découvrir les insights cachés dans les données.
 """)
 
-PAGES = {
-    "Introduction": page_introduction,
-    "Modélisation": lambda: page_modelisation(data),  # Passer data ici
-    "Visualisation": lambda:afficher_page_visualisation(data),
-    "Prédiction": page_prediction   # Pas besoin de data ici
-}
-# Sélection de la page via un menu déroulant dans la barre latérale
+# Sélection de la page via un menu déroulant dans la barre latérale ;
+# le paramètre d'URL ?page=... permet d'ouvrir directement une page
+pages = list(PAGES.keys())
+page_demandee = st.query_params.get("page")
 page = st.sidebar.selectbox(
     "Choisissez une page",
-    options=list(PAGES.keys()),
+    options=pages,
+    index=pages.index(page_demandee) if page_demandee in pages else 0,
     label_visibility="collapsed"  # Masquer l'étiquette de la sélection
 )
 
@@ -152,8 +150,18 @@ st.sidebar.markdown("### 📊 Student Performance Data")
 st.sidebar.markdown("Cette analyse est basée sur les facteurs influençant la performance des étudiants.")
 st.sidebar.markdown("---")
 
-# Chargement des données
-data = pd.read_csv("https://raw.githubusercontent.com/OusseynouDIOP16/IML_STUDENT_PERFORMANCE/main/StudentPerformanceFactors.csv", sep=",")
-
-# Appel de la fonction de la page sélectionnée
-PAGES[page]()  # Remarquez qu'on ne passe plus `data` ici, car page_prediction ne prend pas d'argument
+# Instrumentation : temps par étape de cette exécution et profilage cProfile facultatif
+debut_execution()
+afficher_instrumentation, profil_demande = options_instrumentation()
+debut = time.perf_counter()
+
+# Appel de la fonction de la page sélectionnée (les données sont chargées par la page elle-même, si besoin).
+# Les ressources partagées obtenues par la page restent retenues jusqu'à la fin de l'exécution.
+ressources.debut_execution()
+try:
+    with profiler(profil_demande) as profil:
+        afficher_page(page)
+finally:
+    ressources.fin_execution()
+
+afficher_panneau(afficher_instrumentation, profil, time.perf_counter() - debut)
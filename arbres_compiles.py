@@ -0,0 +1,282 @@
+import argparse
+import os
+
+import joblib
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.tree import DecisionTreeRegressor
+
+from pretraitement import CODES_CATEGORIES, COLONNES_BRUTES, colonne_source
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba est optionnel : le noyau NumPy vectorisé prend le relais
+    njit, prange = None, range
+
+# Inférence compilée des arbres : les arbres sklearn (Gradient Boosting, arbre de décision)
+# sont aplatis dans des tableaux NumPy contigus, parcourus par un noyau numba (ou NumPy).
+# L'entrée est toujours la matrice "codes" (colonnes COLONNES_BRUTES, catégories codées) ;
+# le prétraitement d'un pipeline (imputation, standardisation, one-hot) est replié dans
+# la description des variables, si bien qu'aucun appel sklearn n'a lieu à la prédiction.
+# Les prédictions sont identiques bit à bit à celles de sklearn.
+# Le gain porte sur les petits lots (requêtes interactives et API, de 1 à ~1000 lignes) où le coût
+# fixe de sklearn domine ; sur de très grands lots, la boucle Cython de sklearn reste compétitive
+# pour le Gradient Boosting (voir benchmarks/bench_arbres.py).
+
+# Nature d'une variable vue par les arbres
+IDENTITE, STANDARDISEE, INDICATRICE = 0, 1, 2
+SEUIL_PARALLELE = 2048  # Lignes à partir desquelles le noyau numba parallèle est utilisé
+TAILLE_BLOC = 256
+
+
+# Variables vues par les arbres, calculées une fois par ligne (float32 comme dans sklearn)
+def _transformer(X, source, nature, a, b, Z):
+    for i in prange(X.shape[0]):
+        for f in range(source.shape[0]):
+            x = X[i, source[f]]
+            if nature[f] == STANDARDISEE:
+                # Même calcul que StandardScaler (float64) puis conversion float32
+                Z[i, f] = np.float32((x - a[f]) / b[f])
+            elif nature[f] == INDICATRICE:
+                Z[i, f] = np.float32(1.0) if x == a[f] else np.float32(0.0)
+            else:
+                Z[i, f] = np.float32(x)
+
+
+def _parcourir(Z, variable, seuil, gauche, droite, valeur, racines, taux, base, sortie):
+    # Les lignes sont traitées par blocs, arbre par arbre : les noeuds d'un arbre restent en cache
+    nb_blocs = (Z.shape[0] + TAILLE_BLOC - 1) // TAILLE_BLOC
+    for k in prange(nb_blocs):
+        debut = k * TAILLE_BLOC
+        fin = min(debut + TAILLE_BLOC, Z.shape[0])
+        for i in range(debut, fin):
+            sortie[i] = base
+        for t in range(racines.shape[0]):
+            for i in range(debut, fin):
+                noeud = racines[t]
+                while gauche[noeud] != -1:
+                    if Z[i, variable[noeud]] <= seuil[noeud]:
+                        noeud = gauche[noeud]
+                    else:
+                        noeud = droite[noeud]
+                # Même ordre d'accumulation que sklearn : base puis + taux * feuille, arbre par arbre
+                sortie[i] += taux * valeur[noeud]
+
+
+if njit is not None:
+    _noyaux = {parallele: (njit(cache=True, parallel=parallele)(_transformer),
+                           njit(cache=True, parallel=parallele)(_parcourir))
+               for parallele in (False, True)}
+
+
+# Versions NumPy vectorisées : toutes les lignes descendent un arbre en même temps, niveau par niveau
+def _transformer_numpy(X, source, nature, a, b):
+    x = X[:, source]
+    Z = np.where(nature == STANDARDISEE, (x - a) / b, np.where(nature == INDICATRICE, (x == a).astype(np.float64), x))
+    return Z.astype(np.float32)
+
+
+def _parcourir_numpy(Z, variable, seuil, gauche, droite, valeur, racines, taux, base):
+    sortie = np.full(Z.shape[0], base, dtype=np.float64)
+    for racine in racines:
+        noeuds = np.full(Z.shape[0], racine, dtype=np.int64)
+        actives = np.flatnonzero(gauche[noeuds] != -1)
+        while actives.size:
+            courants = noeuds[actives]
+            noeuds[actives] = np.where(Z[actives, variable[courants]] <= seuil[courants],
+                                       gauche[courants], droite[courants])
+            actives = actives[gauche[noeuds[actives]] != -1]
+        sortie += taux * valeur[noeuds]
+    return sortie
+
+
+class ForetCompilee:
+    def __init__(self, source, nature, a, b, variable, seuil, gauche, droite, valeur, racines, taux, base,
+                 remplissage):
+        self.source = np.ascontiguousarray(source, dtype=np.int64)
+        self.nature = np.ascontiguousarray(nature, dtype=np.int64)
+        self.a = np.ascontiguousarray(a, dtype=np.float64)
+        self.b = np.ascontiguousarray(b, dtype=np.float64)
+        self.variable = np.ascontiguousarray(variable, dtype=np.int64)
+        self.seuil = np.ascontiguousarray(seuil, dtype=np.float64)
+        self.gauche = np.ascontiguousarray(gauche, dtype=np.int64)
+        self.droite = np.ascontiguousarray(droite, dtype=np.int64)
+        self.valeur = np.ascontiguousarray(valeur, dtype=np.float64)
+        self.racines = np.ascontiguousarray(racines, dtype=np.int64)
+        self.taux = float(taux)
+        self.base = float(base)
+        self.remplissage = np.ascontiguousarray(remplissage, dtype=np.float64)  # Valeurs d'imputation par colonne
+
+    @property
+    def nb_noeuds(self):
+        return self.variable.shape[0]
+
+    # Prédiction sur une matrice "codes" (n, 19) ou un DataFrame ayant les colonnes COLONNES_BRUTES
+    def predict(self, X):
+        if hasattr(X, "columns"):
+            X = X[COLONNES_BRUTES]
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        manquantes = np.isnan(X)
+        if manquantes.any():
+            X = np.where(manquantes, self.remplissage, X)
+
+        variables = (self.source, self.nature, self.a, self.b)
+        arbres = (self.variable, self.seuil, self.gauche, self.droite, self.valeur, self.racines, self.taux, self.base)
+        if njit is None:
+            return _parcourir_numpy(_transformer_numpy(X, *variables), *arbres)
+
+        transformer, parcourir = _noyaux[X.shape[0] >= SEUIL_PARALLELE]
+        Z = np.empty((X.shape[0], self.source.shape[0]), dtype=np.float32)
+        transformer(X, *variables, Z)
+        sortie = np.empty(X.shape[0], dtype=np.float64)
+        parcourir(Z, *arbres, sortie)
+        return sortie
+
+    def sauvegarder(self, chemin):
+        np.savez(chemin, **{nom: getattr(self, nom) for nom in _CHAMPS})
+
+    @classmethod
+    def charger(cls, chemin):
+        with np.load(chemin) as tableaux:
+            return cls(**{nom: tableaux[nom] for nom in _CHAMPS})
+
+
+_CHAMPS = ("source", "nature", "a", "b", "variable", "seuil", "gauche", "droite", "valeur", "racines",
+           "taux", "base", "remplissage")
+
+
+# Description des variables vues par les arbres d'un pipeline (ColumnTransformer num/cat de l'artefact)
+def _variables_pipeline(pretraitement):
+    source, nature, a, b = [], [], [], []
+    remplissage = np.full(len(COLONNES_BRUTES), np.nan)
+
+    for nom, transformateur, colonnes in pretraitement.transformers_:
+        if nom == "remainder":
+            continue
+        etapes = dict(transformateur.steps)
+        imputation = etapes.get("imputer")
+        if "scaler" in etapes:
+            scaler = etapes["scaler"]
+            for j, colonne in enumerate(colonnes):
+                source.append(COLONNES_BRUTES.index(colonne))
+                nature.append(STANDARDISEE)
+                a.append(scaler.mean_[j] if scaler.with_mean else 0.0)
+                b.append(scaler.scale_[j] if scaler.with_std else 1.0)
+                if imputation is not None:
+                    remplissage[COLONNES_BRUTES.index(colonne)] = imputation.statistics_[j]
+        elif "onehot" in etapes:
+            for j, colonne in enumerate(colonnes):
+                codes = CODES_CATEGORIES[colonne]
+                for categorie in etapes["onehot"].categories_[j]:
+                    source.append(COLONNES_BRUTES.index(colonne))
+                    nature.append(INDICATRICE)
+                    a.append(codes.get(categorie, np.nan))  # Catégorie sans code : jamais égale
+                    b.append(1.0)
+                if imputation is not None:
+                    remplissage[COLONNES_BRUTES.index(colonne)] = codes.get(imputation.statistics_[j], np.nan)
+        else:
+            raise ValueError(f"Transformation non prise en charge : {nom}")
+    return source, nature, a, b, remplissage
+
+
+# Aplatissement d'une liste d'arbres sklearn dans des tableaux contigus (indices globaux)
+def _aplatir(arbres):
+    variable, seuil, gauche, droite, valeur, racines = [], [], [], [], [], []
+    decalage = 0
+    for arbre in arbres:
+        t = arbre.tree_
+        feuilles = t.children_left == -1
+        racines.append(decalage)
+        variable.append(np.where(feuilles, 0, t.feature))
+        seuil.append(t.threshold)
+        gauche.append(np.where(feuilles, -1, t.children_left + decalage))
+        droite.append(np.where(feuilles, -1, t.children_right + decalage))
+        valeur.append(t.value[:, 0, 0])
+        decalage += t.node_count
+    return [np.concatenate(x) for x in (variable, seuil, gauche, droite, valeur)] + [np.array(racines)]
+
+
+# Description des variables d'un régresseur entraîné sur la matrice standardisée (modèles de la page de
+# modélisation) : la standardisation du prétraitement enregistré avec l'artefact (moyennes, échelles, ordre
+# des variables) est repliée dans la description, l'entrée reste la matrice "codes"
+def _variables_standardisees(pretraitement, features):
+    if pretraitement is None or pretraitement.features is None:
+        raise ValueError("Artefact standardisé sans prétraitement ajusté : espace d'entrée inconnu")
+    if features is not None and list(features) != list(pretraitement.features):
+        raise ValueError("Les variables de l'artefact ne sont pas celles de son prétraitement")
+    source = [COLONNES_BRUTES.index(colonne_source(feature)) for feature in pretraitement.features]
+    return source, [STANDARDISEE] * len(source), list(pretraitement.moyennes), list(pretraitement.echelles)
+
+
+# Export d'un artefact (GradientBoostingRegressor, DecisionTreeRegressor ou Pipeline) vers une ForetCompilee.
+# L'espace d'entrée du régresseur doit être connu : pipeline (prétraitement inclus), noms des variables
+# (feature_names_in_), ou métadonnées du registre ("codes", ou "standardise" avec le prétraitement de
+# l'artefact). Un régresseur nu sans ces informations est refusé : rien ne dit sur quelles colonnes,
+# ni à quelle échelle, il a été entraîné.
+def compiler(modele, metadonnees=None, pretraitement=None):
+    format_entree = (metadonnees or {}).get("format_entree")
+    remplissage = np.full(len(COLONNES_BRUTES), np.nan)
+    if isinstance(modele, Pipeline):
+        if len(modele) != 2:
+            raise ValueError("Seuls les pipelines (prétraitement, régresseur) sont pris en charge")
+        source, nature, a, b, remplissage = _variables_pipeline(modele[0])
+        regresseur = modele[-1]
+    elif format_entree == "standardise":
+        source, nature, a, b = _variables_standardisees(pretraitement, metadonnees.get("features"))
+        regresseur = modele
+    elif hasattr(modele, "feature_names_in_") or format_entree == "codes":
+        if hasattr(modele, "feature_names_in_"):
+            noms = list(modele.feature_names_in_)
+        else:
+            noms = list(metadonnees.get("features", COLONNES_BRUTES))
+        source = [COLONNES_BRUTES.index(nom) for nom in noms]
+        nature, a, b = [IDENTITE] * len(source), [0.0] * len(source), [1.0] * len(source)
+        regresseur = modele
+    else:
+        raise ValueError("Espace d'entrée inconnu : ni pipeline, ni feature_names_in_, ni format d'entrée connu")
+
+    if isinstance(regresseur, GradientBoostingRegressor):
+        if regresseur.init_ == "zero":
+            base = 0.0
+        elif hasattr(regresseur.init_, "constant_"):
+            base = float(np.ravel(regresseur.init_.constant_)[0])
+        else:
+            raise ValueError("Seule l'initialisation constante (DummyRegressor) est prise en charge")
+        arbres, taux = regresseur.estimators_[:, 0], regresseur.learning_rate
+    elif isinstance(regresseur, DecisionTreeRegressor):
+        arbres, taux, base = [regresseur], 1.0, 0.0
+    else:
+        raise ValueError(f"Modèle non pris en charge : {type(regresseur).__name__}")
+
+    variable, seuil, gauche, droite, valeur, racines = _aplatir(arbres)
+    return ForetCompilee(source, nature, a, b, variable, seuil, gauche, droite, valeur, racines, taux, base,
+                         remplissage)
+
+
+# Compilation si l'artefact s'y prête, None sinon (autres familles de modèles, espace d'entrée inconnu)
+def compiler_si_possible(modele, metadonnees=None, pretraitement=None):
+    try:
+        return compiler(modele, metadonnees, pretraitement)
+    except (ValueError, KeyError, AttributeError):
+        return None
+
+
+# Export en ligne de commande (métadonnées et prétraitement relus à côté de l'artefact) :
+#   python arbres_compiles.py "Gradient Boosting Regressor.joblib" gbr_compile.npz
+if __name__ == "__main__":
+    from pretraitement import Pretraitement
+    from registre_modeles import ARTEFACTS_FOURNIS, lire_metadonnees
+
+    parser = argparse.ArgumentParser(description="Export des arbres d'un artefact vers des tableaux NumPy contigus")
+    parser.add_argument("artefact", help="Fichier .joblib du modèle")
+    parser.add_argument("sortie", help="Fichier .npz de la forêt compilée")
+    args = parser.parse_args()
+
+    metadonnees = {**ARTEFACTS_FOURNIS.get(os.path.basename(args.artefact), {}), **lire_metadonnees(args.artefact)}
+    pretraitement = Pretraitement.charger(metadonnees["pretraitement"]) if metadonnees.get("pretraitement") else None
+    foret = compiler(joblib.load(args.artefact), metadonnees, pretraitement)
+    foret.sauvegarder(args.sortie)
+    print(f"{len(foret.racines)} arbre(s), {foret.nb_noeuds} noeuds exportés vers {args.sortie}")
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.svm import SVR
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generateur import morceau_brutes, nettoyer  # noqa: E402
+from catalogue_modeles import CIBLE, FEATURES  # noqa: E402
+from pretraitement import Pretraitement, codes_depuis_nettoyees  # noqa: E402
+from schema_donnees import TYPE_MATRICE  # noqa: E402
+
+# Précision et temps des variantes à l'échelle (modeles_approches.py) face aux versions exactes,
+# sur des données synthétiques de taille croissante :
+#   - SVR() contre le SVR approché (Nystroem), pour plusieurs nombres de composantes ;
+#   - KNeighborsRegressor() contre le KNN à index persistant, au premier ajustement (construction et
+#     enregistrement de l'index) et au suivant (index relu depuis le cache).
+# Le SVR exact n'est mesuré que jusqu'à --max-lignes-svr lignes d'ajustement (coût quadratique à cubique).
+#   python benchmarks/bench_approches.py --tailles 5000 20000 100000 --sortie bench_approches.json
+
+TAILLES = [5_000, 20_000, 100_000]
+COMPOSANTES = [100, 300, 1000]
+MAX_LIGNES_SVR = 20_000
+
+
+# Données standardisées comme sur la page de modélisation, découpées en ajustement et test
+def preparer(taille, graine=0):
+    nettoyees = nettoyer(morceau_brutes(taille, graine))
+    X = nettoyees[FEATURES]
+    X_scaled = Pretraitement().ajuster(X).standardiser(codes_depuis_nettoyees(X), dtype=TYPE_MATRICE)
+    return train_test_split(X_scaled, nettoyees[CIBLE].to_numpy(dtype=np.float64), test_size=0.2, random_state=42)
+
+
+# Ajustement puis prédiction du test chronométrés
+def mesurer_modele(modele, X_train, y_train, X_test, y_test):
+    debut = time.perf_counter()
+    modele.fit(X_train, y_train)
+    ajustement = time.perf_counter() - debut
+    debut = time.perf_counter()
+    y_pred = modele.predict(X_test)
+    prediction = time.perf_counter() - debut
+    return {"ajustement_s": ajustement, "prediction_s": prediction, "test_r2": float(r2_score(y_test, y_pred))}
+
+
+def mesurer(tailles, composantes, max_lignes_svr):
+    # Import après le choix du répertoire des index (lu à l'import)
+    from modeles_approches import KNNIndexe, svr_nystroem
+
+    resultats = []
+    for taille in tailles:
+        X_train, X_test, y_train, y_test = preparer(taille)
+        lignes = len(y_train)
+        modeles = []
+        if lignes <= max_lignes_svr:
+            modeles.append(("SVR exact", None, SVR()))
+        modeles += [("SVR approché (Nystroem)", n, svr_nystroem(n)) for n in composantes]
+        modeles += [("KNN exact", None, KNeighborsRegressor()),
+                    ("KNN index persistant (construction)", None, KNNIndexe()),
+                    ("KNN index persistant (relu)", None, KNNIndexe())]
+
+        for nom, n_composantes, modele in modeles:
+            mesure = mesurer_modele(modele, X_train, y_train, X_test, y_test)
+            resultats.append({"modele": nom, "composantes": n_composantes, "taille": taille, "lignes": lignes,
+                              **mesure})
+            libelle = nom if n_composantes is None else f"{nom} {n_composantes}"
+            print(f"{libelle:42s} {lignes:>8d} lignes  fit {mesure['ajustement_s']:8.3f} s  "
+                  f"predict {mesure['prediction_s']:8.3f} s  R² {mesure['test_r2']:.4f}")
+    return resultats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Variantes à l'échelle du SVR et du KNN face aux versions exactes")
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES)
+    parser.add_argument("--composantes", type=int, nargs="+", default=COMPOSANTES)
+    parser.add_argument("--max-lignes-svr", type=int, default=MAX_LIGNES_SVR)
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    # Index dans un répertoire temporaire : la première mesure construit toujours l'index
+    repertoire_index = tempfile.mkdtemp(prefix="index_knn-")
+    os.environ["STUDENT_INDEX_KNN"] = repertoire_index
+    try:
+        resultats = mesurer(args.tailles, args.composantes, args.max_lignes_svr)
+    finally:
+        shutil.rmtree(repertoire_index, ignore_errors=True)
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            json.dump(resultats, f, indent=4)
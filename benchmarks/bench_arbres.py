@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arbres_compiles import compiler  # noqa: E402
+from pretraitement import BORNES, CODES_CATEGORIES, COLONNES_BRUTES, Pretraitement  # noqa: E402
+
+# Latence de l'inférence compilée des arbres face à sklearn, pour les deux artefacts livrés :
+#   python benchmarks/bench_arbres.py --sortie bench_arbres.json
+# La parité bit à bit est vérifiée par les tests (tests/test_arbres_compiles.py), y compris pour
+# les modèles standardisés de la page de modélisation.
+
+ARTEFACTS = {
+    "Gradient Boosting Regressor.joblib": "codes",
+    "Decision Tree Regressor_model.joblib": "brut",
+}
+TAILLES = [1, 10, 100, 1_000, 10_000, 100_000]
+
+
+# Matrice "codes" aléatoire couvrant le domaine de chaque variable
+def matrice_codes(nombre, graine=0):
+    generateur = np.random.default_rng(graine)
+    colonnes = []
+    for colonne in COLONNES_BRUTES:
+        if colonne in CODES_CATEGORIES:
+            colonnes.append(generateur.choice(list(CODES_CATEGORIES[colonne].values()), nombre))
+        else:
+            bas, haut = BORNES[colonne]
+            colonnes.append(generateur.integers(bas, haut + 1, nombre))
+    return np.column_stack(colonnes).astype(np.float64)
+
+
+# Meilleur temps sur plusieurs répétitions (au moins ~0,2 s de mesure par taille)
+def chronometrer(fonction, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+
+def mesurer(racine, tailles):
+    resultats = []
+    pretraitement = Pretraitement()
+    for fichier, format_entree in ARTEFACTS.items():
+        modele = joblib.load(os.path.join(racine, fichier))
+        metadonnees = {"format_entree": format_entree, "features": COLONNES_BRUTES}
+        foret = compiler(modele, metadonnees, pretraitement)
+
+        for taille in tailles:
+            X = matrice_codes(taille, graine=taille)
+            # L'entrée sklearn est préparée hors chronométrage : seule la prédiction est comparée
+            entree = pretraitement.pour_modele(X, metadonnees)
+
+            foret.predict(X)  # Premier appel : compilation JIT, hors mesure
+            repetitions = max(3, min(200, int(20_000 / taille)))
+            t_sklearn = chronometrer(lambda: modele.predict(entree), repetitions)
+            t_compile = chronometrer(lambda: foret.predict(X), repetitions)
+            resultats.append({
+                "artefact": fichier,
+                "lignes": taille,
+                "sklearn_ms": t_sklearn * 1000,
+                "compile_ms": t_compile * 1000,
+                "acceleration": t_sklearn / t_compile,
+            })
+            print(f"{fichier:40s} {taille:>7d} lignes  sklearn {t_sklearn * 1000:9.3f} ms  "
+                  f"compilé {t_compile * 1000:9.3f} ms  x{t_sklearn / t_compile:7.1f}")
+    return resultats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latence de l'inférence compilée des arbres")
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES)
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    args = parser.parse_args()
+
+    racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultats = mesurer(racine, args.tailles)
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            json.dump(resultats, f, indent=4)
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from registre_pages import PAGES  # noqa: E402
+
+# Coût de démarrage de l'application, chaque mesure dans un processus neuf :
+#   - profil d'import (python -X importtime) : coût du module de chaque page une fois Streamlit
+#     importé, et principaux paquets importés avec lui ; "toutes les pages" correspond à
+#     l'ancien app.py, qui importait tous les modules de pages au démarrage ;
+#   - temps jusqu'au premier affichage de chaque page ouverte directement (?page=...), en
+#     exécutant app.py avec le banc de test de Streamlit, sans navigateur.
+# Les caches sur disque (magasin, cube d'agrégats, modèles entraînés) sont ceux de l'environnement :
+# la première répétition peut les remplir, les suivantes mesurent un démarrage à caches chauds.
+#   python benchmarks/demarrage.py --repetitions 3 --sortie demarrage.json
+
+REPETITIONS_DEFAUT = 3
+NB_PAQUETS = 8
+
+
+# Lignes de -X importtime : (cumul en µs, profondeur, nom du module)
+def profil_import(instruction):
+    processus = subprocess.run([sys.executable, "-X", "importtime", "-c", instruction], cwd=RACINE,
+                               capture_output=True, text=True, check=True)
+    lignes = []
+    for ligne in processus.stderr.splitlines():
+        if not ligne.startswith("import time:") or "cumulative" in ligne:
+            continue
+        _, cumul, nom = ligne[len("import time:"):].split("|")
+        profondeur = (len(nom) - len(nom.lstrip())) // 2
+        lignes.append((int(cumul), profondeur, nom.strip()))
+    return lignes
+
+
+# Coût d'import d'un ou plusieurs modules, Streamlit étant déjà importé
+def mesurer_import(modules):
+    lignes = profil_import("import streamlit; " + "; ".join(f"import {module}" for module in modules))
+    # Les modules de premier niveau importés après Streamlit sont ceux des pages et leurs dépendances
+    debut = max(i for i, (_, profondeur, nom) in enumerate(lignes) if nom == "streamlit" and profondeur == 0) + 1
+    premier_niveau = [(cumul, nom) for cumul, profondeur, nom in lignes[debut:] if profondeur == 0]
+    # Principaux paquets tiers importés à leur suite : coût cumulé de l'import de leur racine
+    dependances = {nom: cumul for cumul, _, nom in lignes[debut:]
+                   if "." not in nom and not nom.startswith("_") and not os.path.exists(os.path.join(RACINE, f"{nom}.py"))}
+    paquets = sorted(dependances.items(), key=lambda element: element[1], reverse=True)[:NB_PAQUETS]
+    return {"secondes": sum(cumul for cumul, _ in premier_niveau) / 1e6,
+            "paquets": {paquet: cumul / 1e6 for paquet, cumul in paquets}}
+
+
+# Exécution de app.py sur une page, dans le processus courant (appelé par mesurer_rendu)
+def rendu_interne(page):
+    debut = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_streamlit = time.perf_counter() - debut
+
+    os.chdir(RACINE)
+    application = AppTest.from_file("app.py", default_timeout=3600)
+    application.query_params["page"] = page
+    debut = time.perf_counter()
+    application.run()
+    rendu = time.perf_counter() - debut
+    erreurs = [element.value for element in application.error] + [e.message for e in application.exception]
+    modules = [module for module, _ in PAGES.values() if module in sys.modules]
+    return {"import_streamlit_s": import_streamlit, "premier_rendu_s": rendu, "erreurs": erreurs,
+            "modules_pages_importes": modules}
+
+
+# Temps jusqu'au premier affichage d'une page, dans un processus neuf
+def mesurer_rendu(page):
+    debut = time.perf_counter()
+    processus = subprocess.run([sys.executable, os.path.abspath(__file__), "--rendu-interne", page], cwd=RACINE,
+                               capture_output=True, text=True)
+    total = time.perf_counter() - debut
+    if processus.returncode != 0:
+        return {"processus_s": total, "erreurs": [processus.stderr.strip().splitlines()[-1]]}
+    mesure = json.loads(processus.stdout.strip().splitlines()[-1])
+    mesure["processus_s"] = total
+    return mesure
+
+
+def executer(repetitions):
+    resultats = {"import": {}, "rendu": {}}
+    print("Coût d'import (Streamlit déjà importé)")
+    for page, (module, _) in PAGES.items():
+        resultats["import"][page] = mesurer_import([module])
+        print(f"  {page:15s} {resultats['import'][page]['secondes'] * 1000:8.1f} ms  "
+              + ", ".join(f"{p} {s * 1000:.0f} ms" for p, s in list(resultats["import"][page]["paquets"].items())[:4]))
+    resultats["import"]["toutes les pages"] = mesurer_import([module for module, _ in PAGES.values()])
+    print(f"  {'toutes':15s} {resultats['import']['toutes les pages']['secondes'] * 1000:8.1f} ms")
+
+    print("Premier affichage (processus neuf)")
+    for page in PAGES:
+        mesures = [mesurer_rendu(page) for _ in range(repetitions)]
+        resultats["rendu"][page] = mesures
+        for mesure in mesures:
+            if "premier_rendu_s" in mesure:
+                print(f"  {page:15s} rendu {mesure['premier_rendu_s']:7.3f} s  processus {mesure['processus_s']:7.3f} s"
+                      f"  modules {mesure['modules_pages_importes']}  {'; '.join(mesure['erreurs'])}")
+            else:
+                print(f"  {page:15s} échec : {'; '.join(mesure['erreurs'])}")
+    return resultats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profil d'import et temps de premier affichage par page")
+    parser.add_argument("--repetitions", type=int, default=REPETITIONS_DEFAUT)
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    parser.add_argument("--rendu-interne", choices=list(PAGES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rendu_interne:
+        print(json.dumps(rendu_interne(args.rendu_interne)))
+        sys.exit(0)
+
+    resultats = executer(args.repetitions)
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            json.dump(resultats, f, indent=4)
@@ -0,0 +1,125 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalogue_modeles import CIBLE, FEATURES  # noqa: E402
+from donnees import FICHIERS_SOURCES  # noqa: E402
+from pretraitement import BORNES, CODES_CATEGORIES, COLONNES_BRUTES, colonne_source  # noqa: E402
+
+# Générateur de données synthétiques au schéma de StudentPerformanceFactors.csv (et de
+# data_clean.csv, colonnes de modelisation.features), de 10 000 à plusieurs dizaines de
+# millions de lignes. Les lignes sont produites et écrites par morceaux : la mémoire ne dépend
+# pas de la taille demandée. Chaque morceau a sa propre graine : le résultat est reproductible.
+#   python benchmarks/generateur.py --lignes 1000000 --sortie donnees_synthetiques/
+#   STUDENT_DATA_SOURCE=donnees_synthetiques/ streamlit run app.py
+
+TAILLE_MORCEAU = 250_000
+
+# Proportions des catégories (ordre de CODES_CATEGORIES), proches du jeu d'origine
+PROPORTIONS = {
+    "Parental_Involvement": [0.20, 0.51, 0.29],
+    "Access_to_Resources": [0.20, 0.50, 0.30],
+    "Extracurricular_Activities": [0.40, 0.60],
+    "Motivation_Level": [0.29, 0.51, 0.20],
+    "Internet_Access": [0.08, 0.92],
+    "Family_Income": [0.40, 0.40, 0.20],
+    "Teacher_Quality": [0.10, 0.60, 0.30],
+    "School_Type": [0.70, 0.30],
+    "Peer_Influence": [0.21, 0.39, 0.40],
+    "Learning_Disabilities": [0.89, 0.11],
+    "Parental_Education_Level": [0.50, 0.30, 0.20],
+    "Distance_from_Home": [0.60, 0.30, 0.10],
+    "Gender": [0.58, 0.42],
+}
+
+# Colonnes avec des valeurs manquantes dans le jeu d'origine (environ 1 % des lignes)
+TAUX_MANQUANTS = {"Teacher_Quality": 0.012, "Parental_Education_Level": 0.014, "Distance_from_Home": 0.010}
+
+# Effet de chaque variable sur la note (par unité ou par niveau de code)
+EFFETS = {"Hours_Studied": 0.29, "Attendance": 0.2, "Previous_Scores": 0.05, "Tutoring_Sessions": 0.5,
+          "Physical_Activity": 0.15, "Parental_Involvement": 1.0, "Access_to_Resources": 1.0,
+          "Motivation_Level": 0.5, "Family_Income": 0.5, "Teacher_Quality": 0.5, "Peer_Influence": 0.5,
+          "Parental_Education_Level": 0.5, "Distance_from_Home": -0.5, "Internet_Access": 0.9,
+          "Extracurricular_Activities": 0.5, "Learning_Disabilities": -0.9}
+
+
+# Un morceau de données brutes : catégories en texte, manquants, note entière dans [55, 101]
+def morceau_brutes(nombre, graine):
+    generateur = np.random.default_rng(graine)
+    colonnes, codes = {}, {}
+    for colonne in COLONNES_BRUTES:
+        if colonne in CODES_CATEGORIES:
+            categories = list(CODES_CATEGORIES[colonne])
+            choix = generateur.choice(len(categories), nombre, p=PROPORTIONS[colonne])
+            codes[colonne] = np.array([CODES_CATEGORIES[colonne][c] for c in categories], dtype=float)[choix]
+            valeurs = np.array(categories, dtype=object)[choix]
+            if colonne in TAUX_MANQUANTS:
+                valeurs[generateur.random(nombre) < TAUX_MANQUANTS[colonne]] = None
+            colonnes[colonne] = valeurs
+        else:
+            bas, haut = BORNES[colonne]
+            colonnes[colonne] = codes[colonne] = generateur.integers(bas, haut + 1, nombre)
+
+    note = 29.0 + sum(effet * codes[colonne] for colonne, effet in EFFETS.items())
+    note = note + generateur.normal(0, 2, nombre)
+    # Quelques notes atypiques au-dessus de la tendance, comme dans le jeu d'origine
+    atypiques = generateur.random(nombre) < 0.005
+    note[atypiques] += generateur.uniform(5, 30, atypiques.sum())
+    colonnes[CIBLE] = np.clip(np.rint(note), 55, 101).astype(np.int64)
+    return pd.DataFrame(colonnes)
+
+
+# Données nettoyées : lignes complètes, catégories remplacées par leur code (*_Encoded)
+def nettoyer(brutes):
+    nettoyees = brutes.dropna()
+    colonnes = {}
+    for feature in FEATURES:
+        source = colonne_source(feature)
+        if source in CODES_CATEGORIES:
+            colonnes[feature] = nettoyees[source].map(CODES_CATEGORIES[source]).astype(np.int64)
+        else:
+            colonnes[feature] = nettoyees[source]
+    colonnes[CIBLE] = nettoyees[CIBLE]
+    return pd.DataFrame(colonnes)
+
+
+# Écriture des deux CSV (noms attendus par donnees.py) dans le répertoire de sortie
+def generer(nombre, sortie, graine=0, taille_morceau=TAILLE_MORCEAU):
+    os.makedirs(sortie, exist_ok=True)
+    chemins = {nom: os.path.join(sortie, fichier) for nom, fichier in FICHIERS_SOURCES.items()}
+    fichiers, ecrivains = {}, {}
+    try:
+        for i, debut in enumerate(range(0, nombre, taille_morceau)):
+            brutes = morceau_brutes(min(taille_morceau, nombre - debut), (graine, i))
+            for nom, morceau in (("brutes", brutes), ("nettoyees", nettoyer(brutes))):
+                table = pa.Table.from_pandas(morceau, preserve_index=False)
+                if nom not in ecrivains:
+                    # En-tête et valeurs sans guillemets, comme les CSV d'origine
+                    fichiers[nom] = open(chemins[nom], "wb")
+                    fichiers[nom].write((",".join(table.column_names) + "\n").encode())
+                    ecrivains[nom] = pv.CSVWriter(fichiers[nom], table.schema, write_options=pv.WriteOptions(
+                        include_header=False, quoting_style="none"))
+                ecrivains[nom].write_table(table)
+    finally:
+        for nom, ecrivain in ecrivains.items():
+            ecrivain.close()
+            fichiers[nom].close()
+    return chemins
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génération de données étudiantes synthétiques")
+    parser.add_argument("--lignes", type=int, default=100_000)
+    parser.add_argument("--sortie", required=True, help="Répertoire des CSV générés")
+    parser.add_argument("--graine", type=int, default=0)
+    args = parser.parse_args()
+
+    for nom, chemin in generer(args.lignes, args.sortie, args.graine).items():
+        print(f"{nom:10s} {chemin} ({os.path.getsize(chemin) / 1024 ** 2:.1f} Mo)")
@@ -0,0 +1,288 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import psutil
+import pyarrow.parquet as pq
+import sklearn
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregats import SEUIL_LIGNES_FLUX, calculer_agregats, calculer_agregats_flux  # noqa: E402
+from benchmarks.generateur import generer  # noqa: E402
+from catalogue_modeles import CIBLE, FEATURES, modeles_standard  # noqa: E402
+from donnees import FICHIERS_SOURCES, ingerer, lire_index, lire_jeu  # noqa: E402
+from evaluation import ajuster_complet, evaluer_pli  # noqa: E402
+from pretraitement import Pretraitement, codes_depuis_nettoyees  # noqa: E402
+from registre_modeles import ARTEFACTS_FOURNIS  # noqa: E402
+from schema_donnees import TYPE_MATRICE, memoire_octets  # noqa: E402
+from score_lot import lire_par_morceaux  # noqa: E402
+
+# Suite de performance de l'application sur des données synthétiques de taille croissante :
+#   - chargement    : ingestion CSV -> magasin Parquet, puis lecture en DataFrame (donnees.py) ;
+#   - entrainement  : ajustement et validation croisée de chaque modèle de la page de modélisation ;
+#   - prediction    : latence unitaire (formulaire de prédiction) et débit par lot des artefacts livrés ;
+#   - visualisation : calcul du cube d'agrégats de la page de visualisation (en mémoire ou en flux,
+#                     selon le même seuil que l'application).
+# Chaque étape s'exécute dans un processus séparé : le pic de mémoire résidente mesuré est celui
+# de l'étape seule, et une étape arrêtée (mémoire insuffisante) est enregistrée comme un échec
+# sans interrompre la suite.
+# Les résultats sont écrits en JSON, un enregistrement par mesure ; --reference compare avec un
+# fichier d'un autre commit et échoue si une mesure ralentit au-delà de la tolérance. Rien n'accède
+# au réseau.
+#   python benchmarks/suite.py --tailles 10000 100000 1000000 --sortie bench.json
+#   python benchmarks/suite.py --tailles 10000 100000 --reference bench.json
+
+FORMAT_RESULTATS = 1
+TAILLES = [10_000, 100_000, 1_000_000]
+ETAPES = ("chargement", "entrainement", "prediction", "visualisation")
+NB_PLIS = 5
+MAX_LIGNES_ENTRAINEMENT = 100_000
+# Modèles dont le coût croît plus vite que le nombre de lignes : entraînés sur moins de lignes
+LIMITES_ENTRAINEMENT = {"Support Vector Regressor (SVR)": 20_000, "KNN (index persistant)": 20_000}
+TAILLES_LOT = [1_000, 100_000, 1_000_000]
+REPETITIONS_UNITAIRES = 200
+TOLERANCE_DEFAUT = 0.25
+
+
+# Exécution chronométrée : (résultat, secondes)
+def chronometrer(fonction, *args):
+    debut = time.perf_counter()
+    resultat = fonction(*args)
+    return resultat, time.perf_counter() - debut
+
+
+def _mesure(etape, operation, objet, taille, lignes, secondes, **autres):
+    mesure = {"etape": etape, "operation": operation, "objet": objet, "taille": taille, "lignes": lignes,
+              "secondes": secondes, "rss_octets": psutil.Process().memory_info().rss,
+              "pic_rss_octets": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    mesure.update(autres)
+    return mesure
+
+
+def mesurer_chargement(source, magasin, taille, jeux=tuple(FICHIERS_SOURCES)):
+    mesures = []
+    for nom in jeux:
+        entree, secondes = chronometrer(ingerer, nom, source, magasin)
+        lignes = pq.ParquetFile(os.path.join(magasin, entree["fichier"])).metadata.num_rows
+        mesures.append(_mesure("chargement", "ingestion", nom, taille, lignes, secondes))
+
+        # Au-delà du seuil, l'application ne charge jamais les données brutes en entier
+        if nom == "brutes" and lignes > SEUIL_LIGNES_FLUX:
+            continue
+        donnees, secondes = chronometrer(lire_jeu, entree, magasin)
+        mesures.append(_mesure("chargement", "lecture", nom, taille, lignes, secondes,
+                               memoire_octets=memoire_octets(donnees)))
+        del donnees
+    return mesures
+
+
+def mesurer_entrainement(nettoyees, taille, graine=42):
+    mesures = []
+    X = nettoyees[FEATURES]
+    X_scaled = Pretraitement().ajuster(X).standardiser(codes_depuis_nettoyees(X), dtype=TYPE_MATRICE)
+    y = nettoyees[CIBLE].to_numpy(dtype=np.float64)
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=graine)
+
+    for nom, modele in modeles_standard().items():
+        lignes = min(len(y_train), LIMITES_ENTRAINEMENT.get(nom, MAX_LIGNES_ENTRAINEMENT))
+        X_ajustement, y_ajustement = X_train[:lignes], y_train[:lignes]
+        (_, _, y_test_pred), secondes_fit = chronometrer(ajuster_complet, clone(modele), X_ajustement,
+                                                         y_ajustement, X_test)
+        scores, secondes_cv = chronometrer(
+            lambda: [evaluer_pli(modele, X_ajustement, y_ajustement, pli, NB_PLIS) for pli in range(NB_PLIS)])
+        mesures.append(_mesure("entrainement", "ajustement", nom, taille, lignes, secondes_fit,
+                               test_r2=r2_score(y_test, y_test_pred)))
+        mesures.append(_mesure("entrainement", "validation_croisee", nom, taille, lignes, secondes_cv,
+                               validation_r2=float(np.mean(scores))))
+        print(f"  {nom:32s} {lignes:>9d} lignes  fit {secondes_fit:8.3f} s  CV {secondes_cv:8.3f} s")
+    return mesures
+
+
+def mesurer_prediction(racine, fichier_brutes, taille):
+    mesures = []
+    pretraitement = Pretraitement()
+    plus_grand_lot = min(max(TAILLES_LOT), taille)
+    brutes = next(lire_par_morceaux(fichier_brutes, plus_grand_lot))
+
+    for fichier, metadonnees in ARTEFACTS_FOURNIS.items():
+        modele = joblib.load(os.path.join(racine, fichier))
+
+        # Latence unitaire : une ligne saisie dans le formulaire, encodée puis prédite
+        def predire(lot):
+            X_codes, valides = pretraitement.encoder(lot)
+            return modele.predict(pretraitement.pour_modele(X_codes[valides], metadonnees))
+
+        ligne = brutes.dropna().iloc[[0]]
+        predire(ligne)  # Premier appel hors mesure
+        durees = []
+        for _ in range(REPETITIONS_UNITAIRES):
+            durees.append(chronometrer(predire, ligne)[1])
+        durees = np.array(durees) * 1000
+        mesures.append(_mesure("prediction", "unitaire", fichier, taille, 1, float(durees.mean() / 1000),
+                               p50_ms=float(np.percentile(durees, 50)), p99_ms=float(np.percentile(durees, 99))))
+
+        for taille_lot in sorted({min(t, plus_grand_lot) for t in TAILLES_LOT}):
+            _, secondes = chronometrer(predire, brutes.iloc[:taille_lot])
+            mesures.append(_mesure("prediction", "lot", fichier, taille, taille_lot, secondes,
+                                   lignes_par_seconde=taille_lot / secondes))
+        print(f"  {fichier:40s} unitaire p50 {np.percentile(durees, 50):7.3f} ms  "
+              f"lot de {taille_lot} lignes {secondes:7.3f} s")
+    return mesures
+
+
+def mesurer_visualisation(entree, magasin, taille):
+    fichier = os.path.join(magasin, entree["fichier"])
+    lignes = pq.ParquetFile(fichier).metadata.num_rows
+    if lignes > SEUIL_LIGNES_FLUX:
+        cube, secondes = chronometrer(calculer_agregats_flux, fichier)
+    else:
+        cube, secondes = chronometrer(calculer_agregats, lire_jeu(entree, magasin))
+    return [_mesure("visualisation", "agregats", cube["methode"], taille, lignes, secondes)]
+
+
+# Une étape, dans le processus courant ; le magasin a été rempli par l'étape de chargement
+def executer_etape(etape, taille, source, magasin, jeu=None):
+    racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if etape == "chargement":
+        return mesurer_chargement(source, magasin, taille, [jeu] if jeu else FICHIERS_SOURCES)
+    index = lire_index(magasin)
+    if etape == "entrainement":
+        return mesurer_entrainement(lire_jeu(index["nettoyees"], magasin), taille)
+    if etape == "prediction":
+        return mesurer_prediction(racine, os.path.join(magasin, index["brutes"]["fichier"]), taille)
+    return mesurer_visualisation(index["brutes"], magasin, taille)
+
+
+# Une étape dans un processus séparé : ses mesures, ou un enregistrement d'échec
+def executer_etape_isolee(etape, taille, source, magasin, jeu=None):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        sortie = f.name
+    try:
+        commande = [sys.executable, os.path.abspath(__file__), "--etape-interne", etape, "--tailles", str(taille),
+                    "--source", source, "--magasin", magasin, "--sortie", sortie]
+        processus = subprocess.run(commande + (["--jeu", jeu] if jeu else []))
+        if processus.returncode != 0:
+            print(f"  échec de l'étape {etape} {jeu or ''} (code {processus.returncode})")
+            return [{"etape": etape, "operation": "echec", "objet": jeu, "taille": taille, "lignes": None,
+                     "secondes": None, "code_retour": processus.returncode}]
+        with open(sortie, "r") as f:
+            return json.load(f)
+    finally:
+        os.remove(sortie)
+
+
+def environnement():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "scikit_learn": sklearn.__version__, "plateforme": platform.platform(), "processeurs": os.cpu_count(),
+            "memoire_octets": psutil.virtual_memory().total}
+
+
+def executer(tailles, etapes, repertoire_donnees, graine=0):
+    mesures = []
+    for taille in tailles:
+        print(f"{taille} lignes")
+        source = os.path.join(repertoire_donnees, f"{taille}-{graine}")
+        # Les données générées sont réutilisées d'une exécution à l'autre (même taille, même graine)
+        if not all(os.path.exists(os.path.join(source, f)) for f in FICHIERS_SOURCES.values()):
+            _, secondes = chronometrer(generer, taille, source, graine)
+            print(f"  génération {secondes:.1f} s")
+
+        with tempfile.TemporaryDirectory(prefix="magasin-") as magasin:
+            # Le chargement remplit le magasin utilisé par les autres étapes : il est toujours exécuté,
+            # un jeu par processus (l'ingestion garde le CSV entier en mémoire)
+            resultats = [mesure for nom in FICHIERS_SOURCES
+                         for mesure in executer_etape_isolee("chargement", taille, source, magasin, nom)]
+            if "chargement" in etapes:
+                mesures += resultats
+            if len(lire_index(magasin)) < len(FICHIERS_SOURCES):
+                continue
+            for etape in ETAPES[1:]:
+                if etape in etapes:
+                    mesures += executer_etape_isolee(etape, taille, source, magasin)
+    return mesures
+
+
+# Comparaison avec un fichier de résultats de référence : rapport des durées, mesure par mesure
+def comparer(mesures, reference, tolerance):
+    def cle(mesure):
+        return mesure["etape"], mesure["operation"], mesure["objet"], mesure["taille"], mesure["lignes"]
+
+    anciennes = {cle(mesure): mesure for mesure in reference["mesures"]}
+    regressions = []
+    for mesure in mesures:
+        # Une étape qui échoue est toujours une régression
+        if mesure["operation"] == "echec":
+            print(f"{mesure['etape']}/{mesure['taille']} : échec (code {mesure['code_retour']})  <-- régression")
+            regressions.append(cle(mesure))
+            continue
+        ancienne = anciennes.get(cle(mesure))
+        if ancienne is None or not ancienne["secondes"]:
+            continue
+        rapport = mesure["secondes"] / ancienne["secondes"]
+        signe = "  <-- régression" if rapport > 1 + tolerance else ""
+        print(f"{'/'.join(str(c) for c in cle(mesure)):90s} x{rapport:6.2f}{signe}")
+        if signe:
+            regressions.append(cle(mesure))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de performance sur données synthétiques")
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES)
+    parser.add_argument("--etapes", nargs="+", choices=ETAPES, default=list(ETAPES))
+    parser.add_argument("--donnees", default=os.path.join(tempfile.gettempdir(), "student-bench"),
+                        help="Répertoire des données générées (réutilisées d'une exécution à l'autre)")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    parser.add_argument("--reference", help="Fichier JSON d'une exécution précédente, pour comparaison")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE_DEFAUT,
+                        help="Ralentissement relatif toléré avant d'échouer (avec --reference)")
+    # Exécution d'une seule étape, dans le processus lancé par executer_etape_isolee
+    parser.add_argument("--etape-interne", choices=ETAPES, help=argparse.SUPPRESS)
+    parser.add_argument("--source", help=argparse.SUPPRESS)
+    parser.add_argument("--magasin", help=argparse.SUPPRESS)
+    parser.add_argument("--jeu", choices=list(FICHIERS_SOURCES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.etape_interne:
+        mesures = executer_etape(args.etape_interne, args.tailles[0], args.source, args.magasin, args.jeu)
+        with open(args.sortie, "w") as f:
+            json.dump(mesures, f)
+        sys.exit(0)
+
+    resultats = {
+        "format": FORMAT_RESULTATS,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environnement": environnement(),
+        "parametres": {"tailles": args.tailles, "etapes": args.etapes, "graine": args.graine, "nb_plis": NB_PLIS,
+                       "max_lignes_entrainement": MAX_LIGNES_ENTRAINEMENT,
+                       "limites_entrainement": LIMITES_ENTRAINEMENT, "seuil_lignes_flux": SEUIL_LIGNES_FLUX},
+        "mesures": executer(args.tailles, args.etapes, args.donnees, args.graine),
+    }
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            json.dump(resultats, f, indent=4)
+
+    if args.reference:
+        with open(args.reference, "r") as f:
+            regressions = comparer(resultats["mesures"], json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(f"{len(regressions)} mesure(s) au-delà de la tolérance de {args.tolerance:.0%}")
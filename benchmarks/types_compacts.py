@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generateur import generer  # noqa: E402
+from catalogue_modeles import CIBLE, FEATURES, modeles_standard  # noqa: E402
+from donnees import FICHIERS_SOURCES, REPERTOIRE_SOURCE, lire_csv  # noqa: E402
+from evaluation import evaluer_modele  # noqa: E402
+from pretraitement import Pretraitement, codes_depuis_nettoyees  # noqa: E402
+from schema_donnees import TYPE_MATRICE, compacter_table, memoire_octets  # noqa: E402
+
+# Gain mémoire du schéma compact (schema_donnees.py) et vérification que les métriques ne changent pas :
+#   - mémoire des deux jeux lus avec les types par défaut (int64, float64, object) et au schéma compact ;
+#   - mémoire de la matrice des variables explicatives en float64 et en float32 ;
+#   - métriques de chaque modèle de la page de modélisation (validation croisée et test, même découpage)
+#     entraîné sur la matrice float64 puis sur la matrice float32 : l'écart relatif doit rester sous la tolérance.
+#   python benchmarks/types_compacts.py --source donnees_synthetiques/ --sortie types.json
+#   python benchmarks/types_compacts.py --lignes 1000000
+
+TOLERANCE_DEFAUT = 1e-3
+# Lignes des comparaisons de métriques (le SVR croît plus vite que le nombre de lignes)
+MAX_LIGNES_DEFAUT = 25_000
+
+
+def mesurer_memoire(repertoire):
+    resultats, jeux = {}, {}
+    for nom, fichier in FICHIERS_SOURCES.items():
+        with open(os.path.join(repertoire, fichier), "rb") as f:
+            contenu = f.read()
+        defaut = memoire_octets(pv.read_csv(pa.BufferReader(contenu)).to_pandas())
+        jeux[nom] = compacter_table(lire_csv(contenu)).to_pandas()
+        compact = memoire_octets(jeux[nom])
+        resultats[nom] = {"lignes": len(jeux[nom]), "defaut_octets": defaut, "compact_octets": compact,
+                          "gain": 1 - compact / defaut, "types": jeux[nom].dtypes.astype(str).value_counts().to_dict()}
+    return resultats, jeux
+
+
+def comparer_metriques(nettoyees, max_lignes, graine=42):
+    nettoyees = nettoyees.iloc[:max_lignes]
+    X = nettoyees[FEATURES]
+    pretraitement = Pretraitement().ajuster(X)
+    matrices = {np.dtype(dtype).name: pretraitement.standardiser(codes_depuis_nettoyees(X), dtype=dtype)
+                for dtype in (np.float64, TYPE_MATRICE)}
+    y = nettoyees[CIBLE].to_numpy()
+    resultats = {"matrice": {nom: matrice.nbytes for nom, matrice in matrices.items()}, "modeles": {}}
+
+    metriques = {}
+    for nom_matrice, matrice in matrices.items():
+        X_train, X_test, y_train, y_test = train_test_split(matrice, y, test_size=0.2, random_state=graine)
+        for nom, modele in modeles_standard().items():
+            # Graine fixée : les forêts et les arbres tirés au hasard sont comparables d'une matrice à l'autre
+            modele = clone(modele)
+            if "random_state" in modele.get_params():
+                modele.set_params(random_state=graine)
+            evaluation = evaluer_modele(modele, X_train, y_train, X_test, y_test)
+            metriques.setdefault(nom, {})[nom_matrice] = evaluation.resultats
+
+    for nom, par_matrice in metriques.items():
+        reference, compacte = par_matrice["float64"], par_matrice[np.dtype(TYPE_MATRICE).name]
+        ecarts = {metrique: abs(compacte[metrique] - valeur) / max(abs(valeur), 1e-12)
+                  for metrique, valeur in reference.items()}
+        resultats["modeles"][nom] = {"float64": reference, "compacte": compacte, "ecart_relatif_max": max(ecarts.values())}
+    return resultats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gain mémoire des types compacts et stabilité des métriques")
+    parser.add_argument("--source", default=REPERTOIRE_SOURCE, help="Répertoire contenant les deux CSV")
+    parser.add_argument("--lignes", type=int, help="Générer des données synthétiques de cette taille")
+    parser.add_argument("--max-lignes", type=int, default=MAX_LIGNES_DEFAUT)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE_DEFAUT)
+    parser.add_argument("--sortie", help="Fichier JSON des résultats")
+    args = parser.parse_args()
+    if args.source is None and args.lignes is None:
+        parser.error("indiquez --source (ou STUDENT_DATA_SOURCE) ou --lignes")
+
+    with tempfile.TemporaryDirectory(prefix="types-") as temporaire:
+        repertoire = args.source
+        if args.lignes is not None:
+            repertoire = temporaire
+            generer(args.lignes, repertoire)
+        memoire, jeux = mesurer_memoire(repertoire)
+
+    print("Mémoire des jeux (types par défaut -> schéma compact)")
+    for nom, mesure in memoire.items():
+        print(f"  {nom:10s} {mesure['lignes']:>10d} lignes  {mesure['defaut_octets'] / 1024 ** 2:9.1f} Mo -> "
+              f"{mesure['compact_octets'] / 1024 ** 2:7.1f} Mo  (-{mesure['gain']:.0%})")
+
+    metriques = comparer_metriques(jeux["nettoyees"], args.max_lignes)
+    tailles = metriques["matrice"]
+    print(f"Matrice des variables : float64 {tailles['float64'] / 1024 ** 2:.1f} Mo -> "
+          f"{np.dtype(TYPE_MATRICE).name} {tailles[np.dtype(TYPE_MATRICE).name] / 1024 ** 2:.1f} Mo")
+
+    print(f"Métriques float64 -> {np.dtype(TYPE_MATRICE).name} (écart relatif maximal, tolérance {args.tolerance:g})")
+    hors_tolerance = []
+    for nom, resultat in metriques["modeles"].items():
+        if resultat["ecart_relatif_max"] > args.tolerance:
+            hors_tolerance.append(nom)
+        print(f"  {nom:32s} Test R² {resultat['float64']['Test R²']:.6f} -> {resultat['compacte']['Test R²']:.6f}"
+              f"  écart {resultat['ecart_relatif_max']:.2e}")
+
+    if args.sortie:
+        with open(args.sortie, "w") as f:
+            json.dump({"memoire": memoire, "metriques": metriques, "tolerance": args.tolerance}, f, indent=4)
+    if hors_tolerance:
+        print(f"Métriques hors tolérance : {', '.join(hors_tolerance)}")
+        sys.exit(1)
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import joblib
+import numpy as np
+
+from ressources import gestionnaire
+
+# Emplacement et taille maximale (en octets) du cache persistant des modèles entraînés
+REPERTOIRE_CACHE = os.environ.get("STUDENT_MODEL_CACHE", "model_cache")
+TAILLE_MAX_CACHE = int(os.environ.get("STUDENT_MODEL_CACHE_MAX_MB", "512")) * 1024 ** 2
+
+# Version du format des entrées : toute modification invalide les anciennes entrées
+FORMAT_ENTREES = 2
+
+
+# Empreinte d'un ensemble de tableaux (données d'entraînement, cible...)
+def empreinte_tableaux(*tableaux):
+    h = hashlib.sha256()
+    for tableau in tableaux:
+        tableau = np.ascontiguousarray(tableau)
+        h.update(str((tableau.shape, tableau.dtype.str)).encode())
+        h.update(tableau.tobytes())
+    return h.hexdigest()
+
+
+# Cache des estimateurs entraînés et de leurs métriques, indexé par
+# (empreinte des données, graine du découpage, classe et hyperparamètres de l'estimateur).
+# Les entrées déjà désérialisées sont gardées par le gestionnaire de ressources du processus
+# (catégorie "modeles"), sous son plafond mémoire commun.
+class CacheModeles:
+    def __init__(self, repertoire=REPERTOIRE_CACHE, taille_max=TAILLE_MAX_CACHE):
+        self.repertoire = repertoire
+        self.taille_max = taille_max
+        os.makedirs(repertoire, exist_ok=True)
+
+    @staticmethod
+    def cle(empreinte_donnees, graine, modele):
+        classe = type(modele)
+        description = {
+            "format": FORMAT_ENTREES,
+            "donnees": empreinte_donnees,
+            "graine": graine,
+            "estimateur": f"{classe.__module__}.{classe.__qualname__}",
+            "parametres": repr(sorted(modele.get_params().items())),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def _chemin(self, cle):
+        return os.path.join(self.repertoire, f"{cle}.joblib")
+
+    # Clé de l'entrée dans le gestionnaire de ressources
+    def _ressource(self, cle):
+        return ("entrainement", self.repertoire, cle)
+
+    # Retourne l'entrée en cache (dictionnaire) ou None
+    def obtenir(self, cle):
+        chemin = self._chemin(cle)
+        entree = gestionnaire.consulter(self._ressource(cle), "modeles")
+        if entree is not None:
+            if os.path.exists(chemin):
+                os.utime(chemin)
+            return entree
+
+        if not os.path.exists(chemin):
+            return None
+        try:
+            entree = joblib.load(chemin)
+        except Exception:
+            # Fichier corrompu ou incompatible : on le traite comme absent
+            os.remove(chemin)
+            return None
+
+        # La date de modification sert d'horodatage LRU sur disque
+        os.utime(chemin)
+        return gestionnaire.deposer(self._ressource(cle), entree, "modeles")
+
+    def stocker(self, cle, entree):
+        chemin = self._chemin(cle)
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        joblib.dump(entree, temporaire)
+        os.replace(temporaire, chemin)
+        gestionnaire.deposer(self._ressource(cle), entree, "modeles")
+        self.evincer()
+
+    # Suppression des entrées les moins récemment utilisées au-delà de la taille maximale
+    def evincer(self):
+        fichiers = []
+        for nom in os.listdir(self.repertoire):
+            if not nom.endswith(".joblib"):
+                continue
+            chemin = os.path.join(self.repertoire, nom)
+            statistiques = os.stat(chemin)
+            fichiers.append((statistiques.st_mtime, statistiques.st_size, chemin))
+
+        total = sum(taille for _, taille, _ in fichiers)
+        for _, taille, chemin in sorted(fichiers):
+            if total <= self.taille_max:
+                break
+            os.remove(chemin)
+            total -= taille
+            gestionnaire.retirer(self._ressource(os.path.basename(chemin)[:-len(".joblib")]))
+
+    def vider(self):
+        for nom in os.listdir(self.repertoire):
+            if nom.endswith(".joblib"):
+                os.remove(os.path.join(self.repertoire, nom))
+                gestionnaire.retirer(self._ressource(nom[:-len(".joblib")]))
@@ -0,0 +1,41 @@
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import ElasticNet, Lasso, Ridge
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.svm import SVR
+from sklearn.tree import DecisionTreeRegressor
+
+from modeles_approches import COMPOSANTES_NOYAU, KNNIndexe, svr_nystroem
+
+# Variables explicatives, cible et modèles de la page de modélisation, sans dépendance à
+# Streamlit ni aux données : les scripts hors application (benchmarks, lignes de commande)
+# entraînent ainsi exactement les mêmes modèles que la page.
+
+FEATURES = [
+    'Hours_Studied', 'Attendance', 'Sleep_Hours', 'Previous_Scores', 'Tutoring_Sessions',
+    'Physical_Activity', 'Parental_Involvement_Encoded', 'Access_to_Resources_Encoded',
+    'Motivation_Level_Encoded', 'Family_Income_Encoded', 'Teacher_Quality_Encoded',
+    'Extracurricular_Activities_Encoded', 'Internet_Access_Encoded', 'Learning_Disabilities_Encoded',
+    'School_Type_Encoded', 'Peer_Influence_Encoded', 'Parental_Education_Level_Encoded',
+    'Distance_from_Home_Encoded', 'Gender_Encoded'
+]
+CIBLE = 'Exam_Score'
+
+# Modèles proposés mais non cochés par défaut sur la page de modélisation : dans cet espace à 19 variables,
+# la recherche par arbre est plus lente que la recherche exhaustive (benchmarks/bench_approches.py)
+MODELES_NON_SELECTIONNES = {"KNN (index persistant)"}
+
+
+# Modèles disponibles, non entraînés, avec leurs hyperparamètres par défaut
+def modeles_standard(composantes_noyau=COMPOSANTES_NOYAU):
+    return {
+        "Régression Ridge": Ridge(),
+        "Régression Lasso": Lasso(),
+        "Régression ElasticNet": ElasticNet(),
+        "Random Forest Regressor": RandomForestRegressor(),
+        "Gradient Boosting Regressor": GradientBoostingRegressor(),
+        "K-Nearest Neighbors (KNN)": KNeighborsRegressor(),
+        "KNN (index persistant)": KNNIndexe(),
+        "Support Vector Regressor (SVR)": SVR(),
+        "SVR approché (Nystroem)": svr_nystroem(composantes_noyau),
+        "Decision Tree Regressor": DecisionTreeRegressor()
+    }
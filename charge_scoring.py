@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from pretraitement import BORNES, CODES_CATEGORIES, COLONNES_BRUTES
+
+# Générateur de charge local pour serveur_scoring.py : des clients concurrents envoient
+# des requêtes sur des connexions persistantes ; on mesure les latences (p50/p99) et le débit.
+#   python charge_scoring.py --clients 64 --requetes 200
+#   python charge_scoring.py --lot 1000 --clients 4 --requetes 20
+
+
+# Étudiants d'exemple : lus depuis un fichier ou tirés au hasard dans les domaines des variables
+def etudiants_exemple(nombre, fichier=None, graine=0):
+    if fichier is not None:
+        donnees = pd.read_parquet(fichier) if fichier.endswith(".parquet") else pd.read_csv(fichier)
+        return donnees[COLONNES_BRUTES].sample(nombre, replace=True, random_state=graine).to_dict("records")
+
+    generateur = np.random.default_rng(graine)
+    etudiants = []
+    for _ in range(nombre):
+        etudiant = {}
+        for colonne in COLONNES_BRUTES:
+            if colonne in CODES_CATEGORIES:
+                etudiant[colonne] = str(generateur.choice(list(CODES_CATEGORIES[colonne])))
+            else:
+                bas, haut = BORNES[colonne]
+                etudiant[colonne] = int(generateur.integers(bas, haut + 1))
+        etudiants.append(etudiant)
+    return etudiants
+
+
+async def _requete(lecteur, ecrivain, hote, chemin, corps):
+    ecrivain.write((f"POST {chemin} HTTP/1.1\r\nHost: {hote}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(corps)}\r\n\r\n").encode() + corps)
+    await ecrivain.drain()
+
+    statut = int((await lecteur.readline()).split()[1])
+    longueur = 0
+    while True:
+        ligne = await lecteur.readline()
+        if ligne in (b"\r\n", b""):
+            break
+        nom, _, valeur = ligne.decode("latin-1").partition(":")
+        if nom.strip().lower() == "content-length":
+            longueur = int(valeur)
+    await lecteur.readexactly(longueur)
+    return statut
+
+
+async def _client(hote, port, charges, chemin, latences, erreurs):
+    lecteur, ecrivain = await asyncio.open_connection(hote, port)
+    try:
+        for corps in charges:
+            debut = time.perf_counter()
+            statut = await _requete(lecteur, ecrivain, hote, chemin, corps)
+            latences.append(time.perf_counter() - debut)
+            if statut != 200:
+                erreurs.append(statut)
+    finally:
+        ecrivain.close()
+
+
+async def lancer(hote, port, clients, requetes, taille_lot, fichier):
+    etudiants = etudiants_exemple(max(1, taille_lot) * requetes, fichier)
+    if taille_lot:
+        chemin = "/predire/lot"
+        charges = [json.dumps(etudiants[i * taille_lot:(i + 1) * taille_lot]).encode() for i in range(requetes)]
+    else:
+        chemin = "/predire"
+        charges = [json.dumps(etudiant).encode() for etudiant in etudiants]
+
+    latences, erreurs = [], []
+    debut = time.perf_counter()
+    await asyncio.gather(*(_client(hote, port, charges, chemin, latences, erreurs) for _ in range(clients)))
+    duree = time.perf_counter() - debut
+
+    latences_ms = np.array(latences) * 1000
+    total = len(latences)
+    return {
+        "requetes": total,
+        "erreurs": len(erreurs),
+        "duree_s": duree,
+        "requetes_par_s": total / duree,
+        "etudiants_par_s": total * max(1, taille_lot) / duree,
+        "p50_ms": float(np.percentile(latences_ms, 50)),
+        "p99_ms": float(np.percentile(latences_ms, 99)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Générateur de charge pour le serveur de scoring")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--clients", type=int, default=32, help="Nombre de clients concurrents")
+    parser.add_argument("--requetes", type=int, default=100, help="Requêtes envoyées par client")
+    parser.add_argument("--lot", type=int, default=0, help="Étudiants par requête sur /predire/lot (0 : unitaire)")
+    parser.add_argument("--donnees", help="CSV ou Parquet d'étudiants à rejouer (par défaut : tirage aléatoire)")
+    args = parser.parse_args()
+
+    resultats = asyncio.run(lancer(args.hote, args.port, args.clients, args.requetes, args.lot, args.donnees))
+    print(json.dumps(resultats, indent=4))
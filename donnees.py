@@ -0,0 +1,203 @@
+import functools
+import hashlib
+import json
+import os
+import argparse
+import tempfile
+import threading
+import urllib.request
+
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+import streamlit as st
+
+from instrumentation import mesurer
+from ressources import gestionnaire
+from schema_donnees import TYPES_COLONNES, compacter_table
+
+# Sources distantes des deux jeux de données utilisés par l'application
+URL_BASE = "https://raw.githubusercontent.com/OusseynouDIOP16/IML_STUDENT_PERFORMANCE/main"
+FICHIERS_SOURCES = {
+    "brutes": "StudentPerformanceFactors.csv",
+    "nettoyees": "data_clean.csv",
+}
+
+# Répertoire local du magasin Parquet et répertoire source optionnel (hors ligne)
+REPERTOIRE_MAGASIN = os.environ.get("STUDENT_DATA_STORE", "data_store")
+REPERTOIRE_SOURCE = os.environ.get("STUDENT_DATA_SOURCE")
+FICHIER_INDEX = "index.json"
+# Version de l'ingestion : l'incrémenter fait réingérer les jeux déjà présents dans le magasin
+# (version 2 : les catégories manquantes sont lues comme nulles et non comme chaînes vides)
+VERSION_INGESTION = 2
+
+# Valeurs lues comme manquantes dans les CSV, y compris dans les colonnes texte
+VALEURS_NULLES = ["", "NA", "NaN", "nan", "null"]
+
+# Mises à jour de l'index par les sessions du processus : lecture, modification et écriture d'un seul tenant
+_verrou_index = threading.Lock()
+
+
+# Lecture de l'index du magasin (nom du jeu -> fichier Parquet et empreinte)
+def lire_index(repertoire=REPERTOIRE_MAGASIN):
+    chemin = os.path.join(repertoire, FICHIER_INDEX)
+    if not os.path.exists(chemin):
+        return {}
+    with open(chemin, "r") as f:
+        return json.load(f)
+
+
+# Écriture atomique d'un fichier du magasin, par un fichier temporaire propre à l'écrivain
+def _ecrire_atomique(chemin, ecrire):
+    descripteur, temporaire = tempfile.mkstemp(dir=os.path.dirname(chemin) or ".", suffix=".tmp")
+    os.close(descripteur)
+    try:
+        ecrire(temporaire)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.remove(temporaire)
+        raise
+
+
+def _enregistrer_entree(nom, entree, repertoire):
+    def ecrire(temporaire):
+        with open(temporaire, "w") as f:
+            json.dump(index, f, indent=4)
+
+    with _verrou_index:
+        index = lire_index(repertoire)
+        index[nom] = entree
+        _ecrire_atomique(os.path.join(repertoire, FICHIER_INDEX), ecrire)
+
+
+# Résolution de la source d'un jeu : répertoire local si fourni, sinon URL GitHub
+def resoudre_source(nom, source=None):
+    fichier = FICHIERS_SOURCES[nom]
+    source = source or REPERTOIRE_SOURCE
+    if source is None:
+        return f"{URL_BASE}/{fichier}"
+    if os.path.isdir(source):
+        return os.path.join(source, fichier)
+    return source
+
+
+def _lire_octets(source):
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=30) as reponse:
+            return reponse.read()
+    with open(source, "rb") as f:
+        return f.read()
+
+
+# Analyse d'un CSV : les colonnes connues sont lues directement au type compact du schéma.
+# Une valeur hors du domaine prévu fait relire le fichier avec les types déduits par Arrow.
+# Dans les deux cas, une catégorie manquante est nulle (comme avec pandas.read_csv), pas une chaîne vide.
+def lire_csv(contenu):
+    options = {"strings_can_be_null": True, "null_values": VALEURS_NULLES}
+    try:
+        return pv.read_csv(pa.BufferReader(contenu),
+                           convert_options=pv.ConvertOptions(column_types=TYPES_COLONNES, **options))
+    except pa.ArrowInvalid:
+        return pv.read_csv(pa.BufferReader(contenu), convert_options=pv.ConvertOptions(**options))
+
+
+# Ingestion d'un CSV dans le magasin : le fichier Parquet est nommé d'après le hash du contenu
+@mesurer("donnees.ingestion")
+def ingerer(nom, source=None, repertoire=REPERTOIRE_MAGASIN):
+    source = resoudre_source(nom, source)
+    contenu = _lire_octets(source)
+    empreinte = hashlib.sha256(contenu).hexdigest()
+
+    os.makedirs(repertoire, exist_ok=True)
+    fichier = f"{nom}-v{VERSION_INGESTION}-{empreinte[:16]}.parquet"
+    chemin = os.path.join(repertoire, fichier)
+
+    # Un contenu déjà ingéré n'est jamais réécrit
+    if not os.path.exists(chemin):
+        table = compacter_table(lire_csv(contenu))
+        _ecrire_atomique(chemin, lambda temporaire: pq.write_table(table, temporaire))
+
+    entree = {"fichier": fichier, "sha256": empreinte, "source": source, "version": VERSION_INGESTION}
+    _enregistrer_entree(nom, entree, repertoire)
+    return entree
+
+
+# Empreinte d'un fichier source local, lue par blocs et calculée une fois par
+# (fichier, date de modification, taille)
+@functools.lru_cache(maxsize=32)
+def _empreinte_fichier(chemin, date_modification, taille):
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for morceau in iter(lambda: f.read(1 << 20), b""):
+            h.update(morceau)
+    return h.hexdigest()
+
+
+def empreinte_source(chemin):
+    etat = os.stat(chemin)
+    return _empreinte_fichier(chemin, etat.st_mtime_ns, etat.st_size)
+
+
+# Retourne l'entrée du magasin pour un jeu, en l'ingérant si besoin
+def entree_magasin(nom, source=None, repertoire=REPERTOIRE_MAGASIN):
+    entree = lire_index(repertoire).get(nom)
+    source_locale = source or REPERTOIRE_SOURCE
+
+    # Une entrée d'une version d'ingestion antérieure est réingérée
+    if entree is not None and entree.get("version") == VERSION_INGESTION \
+            and os.path.exists(os.path.join(repertoire, entree["fichier"])):
+        # Une source locale explicite dont le contenu a changé déclenche une réingestion
+        if source_locale is None:
+            return entree
+        if empreinte_source(resoudre_source(nom, source)) == entree["sha256"]:
+            return entree
+
+    return ingerer(nom, source, repertoire)
+
+
+# Lecture d'une entrée du magasin (Parquet en mémoire mappée), au schéma compact
+# (les fichiers écrits avant le schéma sont convertis à la lecture)
+@mesurer("donnees.lecture")
+def lire_jeu(entree, repertoire=REPERTOIRE_MAGASIN):
+    table = pq.read_table(os.path.join(repertoire, entree["fichier"]), memory_map=True)
+    return compacter_table(table).to_pandas()
+
+
+# Chargement d'un jeu depuis le magasin
+def charger_jeu(nom, source=None, repertoire=REPERTOIRE_MAGASIN):
+    return lire_jeu(entree_magasin(nom, source, repertoire), repertoire)
+
+
+# Empreinte du contenu d'un jeu (utile pour les caches en aval)
+def empreinte(nom, source=None, repertoire=REPERTOIRE_MAGASIN):
+    return entree_magasin(nom, source, repertoire)["sha256"]
+
+
+# Les pages et les sessions partagent le même DataFrame (gestionnaire de ressources du processus) :
+# il ne doit pas être modifié en place
+def charger_donnees_brutes():
+    return gestionnaire.obtenir(("donnees", "brutes"), lambda: charger_jeu("brutes"), "donnees")
+
+
+def charger_donnees_nettoyees():
+    return gestionnaire.obtenir(("donnees", "nettoyees"), lambda: charger_jeu("nettoyees"), "donnees")
+
+
+# Colonnes des données brutes, lues dans le schéma Parquet sans charger les données
+@st.cache_resource(show_spinner=False)
+def colonnes_donnees_brutes():
+    entree = entree_magasin("brutes")
+    return pq.read_schema(os.path.join(REPERTOIRE_MAGASIN, entree["fichier"])).names
+
+
+# Ingestion en ligne de commande, par exemple avant un déploiement hors ligne :
+#   python donnees.py --source /chemin/vers/les/csv
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestion des données étudiantes dans le magasin Parquet local")
+    parser.add_argument("--source", help="Répertoire contenant les CSV (par défaut : GitHub)")
+    parser.add_argument("--magasin", default=REPERTOIRE_MAGASIN, help="Répertoire du magasin Parquet")
+    args = parser.parse_args()
+
+    for nom in FICHIERS_SOURCES:
+        entree = ingerer(nom, args.source, args.magasin)
+        print(f"{nom} : {entree['fichier']} (source : {entree['source']})")
@@ -0,0 +1,166 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.linear_model import PassiveAggressiveRegressor, SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from donnees import REPERTOIRE_MAGASIN, entree_magasin
+from evaluation import MetriquesFlux, ResultatEvaluation, metriques_flux
+from pretraitement import Pretraitement
+from score_lot import lire_par_morceaux, taille_morceau
+from statistiques_flux import MesureMemoire
+
+# Entraînement incrémental, pour des données d'entraînement plus grandes que la mémoire :
+# les données nettoyées sont relues par morceaux à chaque époque, le scaler est ajusté par
+# partial_fit puis les régresseurs linéaires compatibles (variantes SGD, Passive Aggressive)
+# sont entraînés époque par époque, un morceau mélangé servant de mini-lot. La mémoire dépend de la taille des morceaux, pas du jeu.
+#
+# Le découpage entraînement/test est fixé ligne par ligne par un hachage de l'indice de la ligne
+# et de la graine : il ne dépend ni de la taille des morceaux ni de l'ordre de lecture, et ne coûte
+# rien en mémoire. Ce n'est pas le découpage de train_test_split du mode standard : la part de test
+# est la même (PART_TEST, en espérance), mais pas les lignes. Reproduire train_test_split demanderait
+# une permutation de tous les indices, donc une mémoire proportionnelle au jeu.
+# Les métriques ont les mêmes colonnes que le tableau de comparaison ; la colonne
+# "Validation R² (CV)" y est une validation progressive : le R² de chaque morceau d'entraînement
+# de la dernière époque, mesuré avant que le modèle ne l'apprenne.
+
+PART_TEST = 0.2
+TAILLE_ECHANTILLON = 5000  # Prédictions de test conservées pour le graphique
+EPOQUES_DEFAUT = 5
+
+MODELES_INCREMENTAUX = {
+    "SGD Regressor (incrémental)": SGDRegressor(random_state=0),
+    "SGD ElasticNet (incrémental)": SGDRegressor(penalty="elasticnet", random_state=0),
+    "Passive Aggressive Regressor (incrémental)": PassiveAggressiveRegressor(random_state=0),
+}
+
+
+# Résultat d'un entraînement incrémental : en plus de l'évaluation, le prétraitement ajusté
+# par partial_fit, un échantillon des valeurs de test et le pic mémoire observé
+class ResultatIncremental(ResultatEvaluation):
+    def __init__(self, modele, y_test_pred, scores_cv, resultats, y_test, pretraitement, memoire):
+        super().__init__(modele, None, y_test_pred, scores_cv, resultats)
+        self.y_test = y_test
+        self.pretraitement = pretraitement
+        self.memoire = memoire
+
+
+# Appartenance au jeu de test d'après l'indice global des lignes (hachage splitmix64)
+def est_test(indices, graine, part_test=PART_TEST):
+    with np.errstate(over="ignore"):
+        z = np.asarray(indices, dtype=np.uint64) + np.uint64(graine) * np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / 2.0 ** 53 < part_test
+
+
+# Morceaux (X, y, masque de test) du fichier, avec l'indice global de leurs lignes
+def _morceaux(source, features, cible, taille, graine):
+    debut = 0
+    for morceau in lire_par_morceaux(source, taille):
+        X = morceau[features].to_numpy(dtype=np.float64)
+        y = morceau[cible].to_numpy(dtype=np.float64)
+        test = est_test(np.arange(debut, debut + len(morceau)), graine)
+        debut += len(morceau)
+        yield X, y, test
+
+
+# Fichier Parquet des données nettoyées dans le magasin local
+def source_nettoyees():
+    entree = entree_magasin("nettoyees")
+    return os.path.join(REPERTOIRE_MAGASIN, entree["fichier"]), entree["sha256"]
+
+
+def entrainer_incremental(source, modeles, features, cible, epoques=EPOQUES_DEFAUT, budget_octets=64 * 1024 ** 2,
+                          graine=42, progression=None):
+    taille = taille_morceau(budget_octets, len(features) + 1)
+    modeles = {nom: clone(modele) for nom, modele in modeles.items()}
+    alea = np.random.default_rng(graine)
+
+    with MesureMemoire() as memoire:
+        # Passage 0 : statistiques de standardisation, sur les lignes d'entraînement uniquement
+        scaler = StandardScaler()
+        for X, y, test in _morceaux(source, features, cible, taille, graine):
+            if (~test).any():
+                scaler.partial_fit(X[~test])
+            memoire.echantillonner()
+
+        # Époques : chaque morceau est mélangé puis appris par tous les modèles, en une seule lecture
+        progressif = {nom: MetriquesFlux() for nom in modeles}
+        ajustes = set()
+        for epoque in range(epoques):
+            lignes = 0
+            for X, y, test in _morceaux(source, features, cible, taille, graine):
+                ordre = alea.permutation(np.flatnonzero(~test))
+                X_train, y_train = scaler.transform(X[ordre]), y[ordre]
+                for nom, modele in modeles.items():
+                    if len(y_train) == 0:
+                        continue
+                    # Validation progressive : le morceau est évalué avant d'être appris
+                    if epoque == epoques - 1 and nom in ajustes:
+                        progressif[nom].mettre_a_jour(y_train, modele.predict(X_train))
+                    modele.partial_fit(X_train, y_train)
+                    ajustes.add(nom)
+                lignes += len(y)
+                memoire.echantillonner()
+                if progression is not None:
+                    progression(epoque, lignes)
+
+        # Passage final : métriques d'entraînement et de test, échantillon des prédictions de test
+        train = {nom: MetriquesFlux() for nom in modeles}
+        tests = {nom: MetriquesFlux() for nom in modeles}
+        echantillon_y, echantillon_pred = [], {nom: [] for nom in modeles}
+        nb_echantillon = 0
+        for X, y, test in _morceaux(source, features, cible, taille, graine):
+            X = scaler.transform(X)
+            garder = min(int(test.sum()), TAILLE_ECHANTILLON - nb_echantillon)
+            if garder > 0:
+                echantillon_y.append(y[test][:garder])
+            for nom, modele in modeles.items():
+                y_pred = modele.predict(X)
+                train[nom].mettre_a_jour(y[~test], y_pred[~test])
+                tests[nom].mettre_a_jour(y[test], y_pred[test])
+                if garder > 0:
+                    echantillon_pred[nom].append(y_pred[test][:garder])
+            nb_echantillon += max(garder, 0)
+            memoire.echantillonner()
+
+    pretraitement = Pretraitement(features=features, moyennes=scaler.mean_, echelles=scaler.scale_)
+    y_test = np.concatenate(echantillon_y) if echantillon_y else np.empty(0)
+    resultats = {}
+    for nom, modele in modeles.items():
+        cv_r2 = progressif[nom].r2 if progressif[nom].n else float("nan")
+        resultats[nom] = ResultatIncremental(
+            modele, np.concatenate(echantillon_pred[nom]) if echantillon_pred[nom] else np.empty(0),
+            np.array([cv_r2]), metriques_flux(train[nom], tests[nom], cv_r2), y_test, pretraitement,
+            memoire.rapport())
+    return resultats
+
+
+# Entraînement incrémental en ligne de commande (par défaut sur les données nettoyées du magasin) :
+#   python entrainement_incremental.py --epoques 5 --budget-mo 16
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entraînement incrémental, par morceaux, des modèles de régression")
+    parser.add_argument("--source", help="Fichier CSV ou Parquet de données nettoyées (par défaut : le magasin)")
+    parser.add_argument("--cible", default="Exam_Score")
+    parser.add_argument("--epoques", type=int, default=EPOQUES_DEFAUT)
+    parser.add_argument("--budget-mo", type=int, default=64, help="Budget mémoire par morceau, en Mo")
+    args = parser.parse_args()
+
+    source = args.source or source_nettoyees()[0]
+    colonnes = next(lire_par_morceaux(source, 1)).columns
+    features = [colonne for colonne in colonnes if colonne != args.cible]
+    resultats = entrainer_incremental(
+        source, MODELES_INCREMENTAUX, features, args.cible, args.epoques, args.budget_mo * 1024 ** 2,
+        progression=lambda epoque, lignes: print(f"\rÉpoque {epoque + 1} : {lignes} lignes", end=""))
+    print()
+    with pd.option_context("display.width", 200):
+        print(pd.DataFrame({nom: r.resultats for nom, r in resultats.items()}).T.sort_values(by="Test R²",
+                                                                                             ascending=False))
+    memoire = next(iter(resultats.values())).memoire
+    print(f"Pic mémoire : Python/NumPy {memoire['pic_python_octets'] / 1024 ** 2:.1f} Mo, "
+          f"hausse RSS {memoire['hausse_rss_octets'] / 1024 ** 2:.1f} Mo")
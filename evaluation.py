@@ -0,0 +1,114 @@
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+
+# Résultat de l'évaluation d'un modèle : l'estimateur entraîné une seule fois sur
+# l'ensemble d'entraînement, ses prédictions et ses scores de validation croisée.
+# Le tableau de comparaison, l'artefact sauvegardé, l'export JSON et le graphique
+# sont tous construits à partir de cet objet, sans nouvel entraînement.
+class ResultatEvaluation:
+    def __init__(self, modele, y_train_pred, y_test_pred, scores_cv, resultats):
+        self.modele = modele
+        self.y_train_pred = y_train_pred
+        self.y_test_pred = y_test_pred
+        self.scores_cv = scores_cv
+        self.resultats = resultats
+
+
+# Plis de validation croisée : identiques à cross_val_score(cv=nb_plis) pour un régresseur
+def plis_validation(nb_lignes, nb_plis):
+    return list(KFold(n_splits=nb_plis).split(np.empty((nb_lignes, 1))))
+
+
+# Entraînement sur un pli : une copie non entraînée du modèle est ajustée une seule fois
+def evaluer_pli(modele, X_train, y_train, pli, nb_plis):
+    indices_train, indices_val = plis_validation(len(y_train), nb_plis)[pli]
+    modele = clone(modele)
+    modele.fit(X_train[indices_train], y_train[indices_train])
+    return r2_score(y_train[indices_val], modele.predict(X_train[indices_val]))
+
+
+# Entraînement complet : ajustement unique sur l'ensemble d'entraînement et prédictions conservées
+def ajuster_complet(modele, X_train, y_train, X_test):
+    modele.fit(X_train, y_train)
+    return modele, modele.predict(X_train), modele.predict(X_test)
+
+
+# Calcul de la ligne de résultats affichée dans la comparaison des modèles
+def calculer_metriques(y_train, y_train_pred, y_test, y_test_pred, cv_r2):
+    mse_test = mean_squared_error(y_test, y_test_pred)
+    return {
+        "MAE": mean_absolute_error(y_test, y_test_pred),
+        "MSE Entraînement": mean_squared_error(y_train, y_train_pred),  # MSE pour l'entraînement
+        "MSE Test": mse_test,                                           # MSE pour le test
+        "RMSE": mse_test ** 0.5,
+        "Validation R² (CV)": cv_r2,                                    # R² de la validation croisée
+        "Test R²": r2_score(y_test, y_test_pred)
+    }
+
+
+# Métriques de régression accumulées morceau par morceau (entraînement incrémental) :
+# erreurs absolues et quadratiques sommées, variance de la cible par Welford pour le R²
+class MetriquesFlux:
+    def __init__(self):
+        self.n = 0
+        self.somme_abs = 0.0
+        self.somme_carres = 0.0
+        self.moyenne = 0.0
+        self.m2 = 0.0
+
+    def mettre_a_jour(self, y, y_pred):
+        y = np.asarray(y, dtype=float)
+        if y.size == 0:
+            return
+        erreurs = y - np.asarray(y_pred, dtype=float)
+        self.somme_abs += np.abs(erreurs).sum()
+        self.somme_carres += (erreurs ** 2).sum()
+        n, moyenne = y.size, y.mean()
+        total = self.n + n
+        delta = moyenne - self.moyenne
+        self.m2 += ((y - moyenne) ** 2).sum() + delta ** 2 * self.n * n / total
+        self.moyenne += delta * n / total
+        self.n = total
+
+    @property
+    def mae(self):
+        return self.somme_abs / self.n
+
+    @property
+    def mse(self):
+        return self.somme_carres / self.n
+
+    @property
+    def r2(self):
+        return 1 - self.somme_carres / self.m2
+
+
+# Ligne de résultats (mêmes colonnes que calculer_metriques) à partir de métriques accumulées
+def metriques_flux(train, test, cv_r2):
+    return {
+        "MAE": test.mae,
+        "MSE Entraînement": train.mse,
+        "MSE Test": test.mse,
+        "RMSE": test.mse ** 0.5,
+        "Validation R² (CV)": cv_r2,
+        "Test R²": test.r2
+    }
+
+
+# Assemblage du résultat à partir de l'entraînement complet et des scores des plis
+def assembler_resultat(complet, scores_cv, y_train, y_test):
+    modele, y_train_pred, y_test_pred = complet
+    scores_cv = np.asarray(scores_cv, dtype=float)
+    resultats = calculer_metriques(y_train, y_train_pred, y_test, y_test_pred, float(scores_cv.mean()))
+    return ResultatEvaluation(modele, y_train_pred, y_test_pred, scores_cv, resultats)
+
+
+# Évaluation séquentielle d'un modèle dans le processus courant
+def evaluer_modele(modele, X_train, y_train, X_test, y_test, nb_plis=5):
+    y_train = np.asarray(y_train)
+    y_test = np.asarray(y_test)
+    scores_cv = [evaluer_pli(modele, X_train, y_train, pli, nb_plis) for pli in range(nb_plis)]
+    return assembler_resultat(ajuster_complet(modele, X_train, y_train, X_test), scores_cv, y_train, y_test)
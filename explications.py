@@ -0,0 +1,215 @@
+import argparse
+import functools
+import hashlib
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.pipeline import Pipeline
+
+from arbres_compiles import _transformer_numpy, compiler
+from pretraitement import COLONNES_BRUTES, Pretraitement
+
+try:
+    import shap
+except ImportError:  # shap est optionnel : les contributions de chemin prennent le relais
+    shap = None
+
+# Explications des prédictions des modèles à arbres (Gradient Boosting, arbre de décision, pipelines
+# de ces modèles) : attribution de chaque prédiction aux 19 variables d'origine.
+#   - avec shap : valeurs TreeSHAP (TreeExplainer) calculées sur les variables vues par les arbres ;
+#   - sans shap : contributions de chemin (Saabas) : chaque séparation traversée attribue à sa variable
+#     la variation de la valeur du noeud. Calcul exact et vectorisé, mais approximation des valeurs
+#     de Shapley (l'ordre des séparations compte).
+# Dans les deux cas, base + somme des attributions = prédiction. Les variables d'un pipeline (indicatrices
+# du one-hot, variables standardisées) sont regroupées sur leur colonne d'origine grâce à la description
+# de arbres_compiles.py ; la standardisation d'un modèle de la page de modélisation y est repliée de même.
+# Seuls les artefacts dont l'espace d'entrée est connu (voir arbres_compiles.compiler) sont expliqués.
+# Les attributions de tout le jeu de données sont précalculées par blocs (éventuellement en parallèle),
+# puis enregistrées en Parquet, nommé d'après l'empreinte du modèle et celle des données ; l'importance
+# globale et les attributions d'un étudiant sont lues dans ce fichier. Une saisie nouvelle est expliquée
+# à la volée (une ligne).
+#   python explications.py "Gradient Boosting Regressor.joblib" --processus 2
+
+REPERTOIRE_EXPLICATIONS = os.environ.get("STUDENT_EXPLICATIONS", "explications")
+LIGNES_BLOC_EXPLICATIONS = 8192
+LIGNES_CONTROLE_ADDITIVITE = 1000
+TOLERANCE_ADDITIVITE = 1e-6
+# Version du format des fichiers d'attributions : l'incrémenter écarte les fichiers déjà calculés
+# (la version 1 expliquait les modèles standardisés dans le mauvais espace d'entrée)
+VERSION_EXPLICATIONS = 2
+
+METHODE = "treeshap" if shap is not None else "chemins"
+
+
+# Empreinte du contenu d'un artefact, calculée une fois par (fichier, date de modification)
+@functools.lru_cache(maxsize=32)
+def _empreinte_fichier(chemin, date_modification):
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for morceau in iter(lambda: f.read(1 << 20), b""):
+            h.update(morceau)
+    return h.hexdigest()
+
+
+def empreinte_artefact(chemin):
+    return _empreinte_fichier(chemin, os.path.getmtime(chemin))
+
+
+def chemin_explications(empreinte_modele, empreinte_donnees, repertoire=REPERTOIRE_EXPLICATIONS, methode=METHODE):
+    nom = f"explications-v{VERSION_EXPLICATIONS}-{empreinte_modele[:16]}-{empreinte_donnees[:16]}-{methode}.parquet"
+    return os.path.join(repertoire, nom)
+
+
+# Matrice de regroupement : variable vue par les arbres -> colonne d'origine
+def _regroupement(foret):
+    matrice = np.zeros((len(foret.source), len(COLONNES_BRUTES)))
+    matrice[np.arange(len(foret.source)), foret.source] = 1.0
+    return matrice
+
+
+# Contributions de chemin : toutes les lignes descendent un arbre en même temps, niveau par niveau
+def _contributions_chemins(foret, Z):
+    contributions = np.zeros((Z.shape[0], len(COLONNES_BRUTES)))
+    for racine in foret.racines:
+        noeuds = np.full(Z.shape[0], racine, dtype=np.int64)
+        actives = np.flatnonzero(foret.gauche[noeuds] != -1)
+        while actives.size:
+            courants = noeuds[actives]
+            suivants = np.where(Z[actives, foret.variable[courants]] <= foret.seuil[courants],
+                                foret.gauche[courants], foret.droite[courants])
+            # Une ligne active n'apparaît qu'une fois : l'affectation indexée n'a pas de doublon
+            contributions[actives, foret.source[foret.variable[courants]]] += \
+                foret.taux * (foret.valeur[suivants] - foret.valeur[courants])
+            noeuds[actives] = suivants
+            actives = actives[foret.gauche[suivants] != -1]
+    base = foret.base + foret.taux * foret.valeur[foret.racines].sum()
+    return contributions, base
+
+
+# Attributions d'un bloc de lignes (matrice "codes") ; exécuté dans un processus de travail si parallèle
+def _attribuer_bloc(regresseur, foret, X_codes):
+    manquantes = np.isnan(X_codes)
+    if manquantes.any():
+        X_codes = np.where(manquantes, foret.remplissage, X_codes)
+    Z = _transformer_numpy(X_codes, foret.source, foret.nature, foret.a, foret.b)
+    if shap is None:
+        return _contributions_chemins(foret, Z)
+    explicateur = shap.TreeExplainer(regresseur)
+    valeurs = np.asarray(explicateur.shap_values(Z, check_additivity=False), dtype=np.float64)
+    return valeurs @ _regroupement(foret), float(np.ravel(explicateur.expected_value)[0])
+
+
+# Explicateur d'un artefact : forêt compilée (variables et arbres) et régresseur sklearn (pour shap)
+class Explicateur:
+    def __init__(self, modele, metadonnees=None, pretraitement=None):
+        # ValueError pour un modèle qui n'est pas à arbres ou dont l'espace d'entrée est inconnu
+        self.foret = compiler(modele, metadonnees, pretraitement)
+        self.modele = modele
+        self.metadonnees = metadonnees
+        self.pretraitement = pretraitement or Pretraitement()
+        self.regresseur = modele[-1] if isinstance(modele, Pipeline) else modele
+
+    # Attributions d'une matrice "codes" : (tableau n x 19, base)
+    def attribuer(self, X_codes, nb_processus=1, lignes_bloc=LIGNES_BLOC_EXPLICATIONS):
+        X_codes = np.ascontiguousarray(X_codes, dtype=np.float64)
+        if len(X_codes) <= lignes_bloc:
+            return _attribuer_bloc(self.regresseur, self.foret, X_codes)
+        blocs = [X_codes[debut:debut + lignes_bloc] for debut in range(0, len(X_codes), lignes_bloc)]
+        resultats = joblib.Parallel(n_jobs=nb_processus)(
+            joblib.delayed(_attribuer_bloc)(self.regresseur, self.foret, bloc) for bloc in blocs)
+        return np.concatenate([contributions for contributions, _ in resultats]), resultats[0][1]
+
+    # Explication d'une seule saisie, en Series triée par importance décroissante
+    def expliquer_ligne(self, X_codes):
+        contributions, base = self.attribuer(X_codes[:1])
+        serie = pd.Series(contributions[0], index=COLONNES_BRUTES)
+        return serie.reindex(serie.abs().sort_values(ascending=False).index), base
+
+    # Contrôle d'additivité sur un échantillon de lignes : base + somme des attributions doit redonner
+    # la prédiction de l'artefact lui-même (et non celle de la forêt compilée)
+    def verifier_additivite(self, X_codes, contributions, base, nb_lignes=LIGNES_CONTROLE_ADDITIVITE):
+        # Sans métadonnées, seuls un pipeline (données brutes) ou un modèle nommant ses variables sont compilés
+        metadonnees = self.metadonnees or {"format_entree": "brut" if isinstance(self.modele, Pipeline) else "codes",
+                                           "features": list(self.modele.feature_names_in_)}
+        echantillon = np.unique(np.linspace(0, len(X_codes) - 1, min(nb_lignes, len(X_codes))).astype(np.int64))
+        entree = self.pretraitement.pour_modele(X_codes[echantillon], metadonnees)
+        attendues = np.asarray(self.modele.predict(entree), dtype=np.float64)
+        obtenues = base + contributions[echantillon].sum(axis=1)
+        ecart = float(np.max(np.abs(obtenues - attendues), initial=0.0))
+        if ecart > TOLERANCE_ADDITIVITE * max(1.0, float(np.max(np.abs(attendues), initial=0.0))):
+            raise ValueError(f"Attributions non additives : écart de {ecart:.3g} avec les prédictions du modèle")
+
+
+# Explicateur d'un modèle, ou None si le modèle n'est pas à arbres (régression linéaire, SVR...) ou si
+# son espace d'entrée ne peut pas être décrit (régresseur nu sans métadonnées)
+def explicateur_si_possible(modele, metadonnees=None, pretraitement=None):
+    try:
+        return Explicateur(modele, metadonnees, pretraitement)
+    except (ValueError, KeyError, AttributeError):
+        return None
+
+
+# Précalcul des attributions de tout un jeu (DataFrame des données brutes) et enregistrement en Parquet
+# (attributions float32, une colonne par variable ; "ligne" renvoie à la ligne du jeu de données).
+# L'additivité est contrôlée sur un échantillon avant toute écriture.
+def precalculer(modele, metadonnees, donnees, chemin, pretraitement=None, nb_processus=1):
+    explicateur = Explicateur(modele, metadonnees, pretraitement)
+    X_codes, valides = explicateur.pretraitement.encoder(donnees)
+    X_codes = X_codes[valides]
+    lignes = np.flatnonzero(valides)
+    contributions, base = explicateur.attribuer(X_codes, nb_processus=nb_processus)
+    explicateur.verifier_additivite(X_codes, contributions, base)
+
+    colonnes = {"ligne": pa.array(lignes, type=pa.int32())}
+    colonnes.update({colonne: pa.array(contributions[:, j].astype(np.float32))
+                     for j, colonne in enumerate(COLONNES_BRUTES)})
+    colonnes["prediction"] = pa.array((base + contributions.sum(axis=1)).astype(np.float32))
+    table = pa.table(colonnes).replace_schema_metadata({"base": repr(float(base)), "methode": METHODE})
+
+    os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    pq.write_table(table, temporaire, compression="zstd")
+    os.replace(temporaire, chemin)
+    return chemin
+
+
+# Attributions enregistrées : tableau indexé par ligne du jeu, base, méthode et importance globale
+# (moyenne des valeurs absolues, triée par ordre décroissant)
+class MagasinExplications:
+    def __init__(self, chemin):
+        table = pq.read_table(chemin)
+        metadonnees = table.schema.metadata or {}
+        self.base = float(metadonnees.get(b"base", b"nan"))
+        self.methode = metadonnees.get(b"methode", b"").decode()
+        self.attributions = table.to_pandas().set_index("ligne")
+        self.importance = self.attributions[COLONNES_BRUTES].abs().mean().sort_values(ascending=False)
+
+    def etudiant(self, ligne):
+        serie = self.attributions.loc[ligne, COLONNES_BRUTES].astype(np.float64)
+        return serie.reindex(serie.abs().sort_values(ascending=False).index)
+
+
+if __name__ == "__main__":
+    from donnees import charger_donnees_brutes, empreinte
+    from registre_modeles import ARTEFACTS_FOURNIS, lire_metadonnees
+
+    parser = argparse.ArgumentParser(description="Précalcul des attributions d'un modèle à arbres sur tout le jeu")
+    parser.add_argument("artefact", help="Fichier .joblib du modèle")
+    parser.add_argument("--processus", type=int, default=1)
+    parser.add_argument("--pretraitement", help="Prétraitement enregistré avec le modèle (.pretraitement.joblib), "
+                                                "par défaut celui indiqué dans ses métadonnées")
+    args = parser.parse_args()
+
+    metadonnees = {**ARTEFACTS_FOURNIS.get(os.path.basename(args.artefact), {}), **lire_metadonnees(args.artefact)}
+    fichier_pretraitement = args.pretraitement or metadonnees.get("pretraitement")
+    pretraitement = Pretraitement.charger(fichier_pretraitement) if fichier_pretraitement else None
+    chemin = chemin_explications(empreinte_artefact(args.artefact), empreinte("brutes"))
+    precalculer(joblib.load(args.artefact), metadonnees or None, charger_donnees_brutes(), chemin, pretraitement,
+                args.processus)
+    magasin = MagasinExplications(chemin)
+    print(f"{len(magasin.attributions)} lignes ({magasin.methode}) enregistrées dans {chemin}")
+    print(magasin.importance.to_string())
@@ -0,0 +1,86 @@
+import hashlib
+import io
+import json
+import os
+
+import joblib
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Export des résultats d'entraînement (prédictions du jeu de test, modèle entraîné) directement
+# depuis les tableaux en mémoire, sans passer par un fichier intermédiaire :
+#   - prédictions en Parquet (compressé, typé), en .npz NumPy ou en JSON par ligne (ndjson) ;
+#   - modèle sérialisé par joblib, comme les artefacts de models/.
+# Les contenus ne sont construits qu'à la demande ; leur enregistrement sur disque est facultatif
+# et adressé par contenu : un fichier déjà présent pour la même clé n'est jamais réécrit.
+# Ce module n'importe pas Streamlit : les scripts peuvent l'utiliser aussi.
+
+REPERTOIRE_PREDICTIONS = "predictions"
+
+COLONNE_REELLE = "Valeurs Réelles"
+COLONNE_PREDITE = "Prédictions"
+
+# Format -> (extension, type MIME)
+FORMATS_PREDICTIONS = {
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "npz": ("npz", "application/octet-stream"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+}
+MIME_MODELE = "application/octet-stream"
+
+
+def _serialiser_parquet(y_reel, y_pred):
+    table = pa.table({COLONNE_REELLE: y_reel, COLONNE_PREDITE: y_pred})
+    flux = io.BytesIO()
+    pq.write_table(table, flux, compression="zstd")
+    return flux.getvalue()
+
+
+def _serialiser_npz(y_reel, y_pred):
+    flux = io.BytesIO()
+    np.savez_compressed(flux, valeurs_reelles=y_reel, predictions=y_pred)
+    return flux.getvalue()
+
+
+# Une ligne JSON par étudiant du jeu de test
+def _serialiser_ndjson(y_reel, y_pred):
+    return "".join(json.dumps({COLONNE_REELLE: reel, COLONNE_PREDITE: predit}, ensure_ascii=False) + "\n"
+                   for reel, predit in zip(y_reel.tolist(), y_pred.tolist())).encode("utf-8")
+
+
+_SERIALISEURS = {"parquet": _serialiser_parquet, "npz": _serialiser_npz, "ndjson": _serialiser_ndjson}
+
+
+# Contenu du fichier de prédictions, au format demandé
+def serialiser_predictions(y_reel, y_pred, format_export="parquet"):
+    if format_export not in _SERIALISEURS:
+        raise ValueError(f"Format d'export inconnu : {format_export} (formats : {', '.join(_SERIALISEURS)})")
+    return _SERIALISEURS[format_export](np.asarray(y_reel), np.asarray(y_pred))
+
+
+# Contenu d'un artefact de modèle, identique à un fichier écrit par joblib.dump
+def serialiser_modele(modele):
+    flux = io.BytesIO()
+    joblib.dump(modele, flux)
+    return flux.getvalue()
+
+
+def empreinte_contenu(contenu):
+    return hashlib.sha256(contenu).hexdigest()
+
+
+# Enregistrement adressé par contenu : le nom du fichier contient la clé (empreinte des entrées qui
+# déterminent le contenu, ou du contenu lui-même). Si le fichier existe déjà, rien n'est construit
+# ni réécrit ; sinon le contenu est produit par fabrique() puis écrit de façon atomique.
+# Retourne (chemin, écrit).
+def persister(repertoire, nom, cle, extension, fabrique):
+    chemin = os.path.join(repertoire, f"{nom}-{cle[:16]}.{extension}")
+    if os.path.exists(chemin):
+        return chemin, False
+    os.makedirs(repertoire, exist_ok=True)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "wb") as f:
+        f.write(fabrique())
+    os.replace(temporaire, chemin)
+    return chemin, True
@@ -0,0 +1,208 @@
+import bisect
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import psutil
+
+# Instrumentation légère des étapes coûteuses de l'application (lecture des CSV, chargement,
+# ajustement, validation croisée, prédiction, rendu matplotlib) : chaque mesure donne la durée
+# (horloge murale) et la variation de la mémoire résidente du processus pendant l'étape.
+# Les mesures alimentent :
+#   - le journal de l'exécution courante du script (un rerun Streamlit), affiché dans la barre latérale ;
+#   - des histogrammes glissants par étape, communs à tout le processus, exportables en JSON ou
+#     au format texte de Prometheus (collecteur "textfile" de node_exporter, par exemple).
+# Ce module n'importe pas Streamlit : il est aussi utilisable dans les scripts et les processus de travail.
+
+# Bornes (en secondes) des histogrammes de durée
+BORNES_SECONDES = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Nombre de mesures conservées par étape (fenêtre glissante des histogrammes)
+TAILLE_FENETRE = int(os.environ.get("STUDENT_FENETRE_METRIQUES", 1000))
+
+# Répertoire des exports de métriques et des profils
+REPERTOIRE_METRIQUES = os.environ.get("STUDENT_METRIQUES", "metriques")
+
+PREFIXE_PROMETHEUS = "student_performance"
+
+_processus = psutil.Process()
+
+# Journal de l'exécution courante, propre au thread (Streamlit exécute chaque session dans son propre thread)
+_local = threading.local()
+
+
+# Fenêtre glissante des dernières mesures d'une étape, et compteurs depuis le démarrage du processus
+class HistogrammeGlissant:
+    def __init__(self, taille=TAILLE_FENETRE):
+        self.durees = deque(maxlen=taille)
+        self.hausses_rss = deque(maxlen=taille)
+        self.nombre_total = 0
+        self.somme_totale = 0.0
+
+    def ajouter(self, secondes, hausse_rss=None):
+        self.durees.append(secondes)
+        if hausse_rss is not None:
+            self.hausses_rss.append(hausse_rss)
+        self.nombre_total += 1
+        self.somme_totale += secondes
+
+    # Effectifs cumulés de la fenêtre par borne (le dernier compte toutes les mesures, "+Inf")
+    def effectifs_cumules(self, bornes=BORNES_SECONDES):
+        durees = sorted(self.durees)
+        return [bisect.bisect_right(durees, borne) for borne in bornes] + [len(durees)]
+
+    def quantile(self, q):
+        durees = sorted(self.durees)
+        if not durees:
+            return None
+        return durees[min(len(durees) - 1, int(q * len(durees)))]
+
+    def resume(self):
+        return {
+            "nombre_total": self.nombre_total,
+            "somme_totale_s": self.somme_totale,
+            "fenetre": len(self.durees),
+            "somme_s": sum(self.durees),
+            "p50_s": self.quantile(0.5),
+            "p95_s": self.quantile(0.95),
+            "max_s": max(self.durees, default=None),
+            "hausse_rss_max_octets": max(self.hausses_rss, default=None),
+            "effectifs_cumules": self.effectifs_cumules(),
+        }
+
+
+# Histogrammes de toutes les étapes, partagés par les sessions du processus
+class RegistreMesures:
+    def __init__(self, taille_fenetre=TAILLE_FENETRE):
+        self.taille_fenetre = taille_fenetre
+        self._histogrammes = {}
+        self._verrou = threading.Lock()
+
+    def ajouter(self, etape, secondes, hausse_rss=None):
+        with self._verrou:
+            if etape not in self._histogrammes:
+                self._histogrammes[etape] = HistogrammeGlissant(self.taille_fenetre)
+            self._histogrammes[etape].ajouter(secondes, hausse_rss)
+
+    def resumes(self):
+        with self._verrou:
+            return {etape: histogramme.resume() for etape, histogramme in sorted(self._histogrammes.items())}
+
+
+registre = RegistreMesures()
+
+
+# Début d'une exécution du script : le journal de l'exécution précédente est remplacé
+def debut_execution():
+    _local.journal = []
+
+
+# Mesures de l'exécution courante : (étape, secondes, variation de la mémoire résidente en octets)
+def journal_execution():
+    return list(getattr(_local, "journal", []))
+
+
+# Enregistrement d'une mesure faite ailleurs (par exemple dans un processus de travail)
+def enregistrer(etape, secondes, hausse_rss=None):
+    registre.ajouter(etape, secondes, hausse_rss)
+    journal = getattr(_local, "journal", None)
+    if journal is not None:
+        journal.append((etape, secondes, hausse_rss))
+
+
+# Mesure d'une étape, en bloc "with" ou en décorateur : @mesurer("donnees.lecture")
+@contextmanager
+def mesurer(etape):
+    rss = _processus.memory_info().rss
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        enregistrer(etape, time.perf_counter() - debut, _processus.memory_info().rss - rss)
+
+
+# Écriture atomique d'un fichier d'export
+def _ecrire(chemin, contenu):
+    os.makedirs(os.path.dirname(chemin) or ".", exist_ok=True)
+    temporaire = chemin + ".tmp"
+    with open(temporaire, "w") as f:
+        f.write(contenu)
+    os.replace(temporaire, chemin)
+    return chemin
+
+
+def exporter_json(chemin=os.path.join(REPERTOIRE_METRIQUES, "metriques.json")):
+    contenu = {"date": datetime.now(timezone.utc).isoformat(), "pid": os.getpid(),
+               "taille_fenetre": registre.taille_fenetre, "bornes_s": list(BORNES_SECONDES),
+               "etapes": registre.resumes()}
+    return _ecrire(chemin, json.dumps(contenu, indent=4))
+
+
+def _etiquette(valeur):
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Format texte d'exposition de Prometheus : histogramme des durées sur la fenêtre glissante,
+# compteur des appels depuis le démarrage et plus forte hausse de mémoire résidente de la fenêtre
+def texte_prometheus():
+    duree = f"{PREFIXE_PROMETHEUS}_etape_duree_secondes"
+    appels = f"{PREFIXE_PROMETHEUS}_etape_appels_total"
+    memoire = f"{PREFIXE_PROMETHEUS}_etape_hausse_rss_max_octets"
+    lignes = [f"# HELP {duree} Durée des étapes instrumentées (dernières {registre.taille_fenetre} mesures)",
+              f"# TYPE {duree} histogram"]
+    resumes = registre.resumes()
+    for etape, resume in resumes.items():
+        etiquette = f'etape="{_etiquette(etape)}"'
+        for borne, effectif in zip(list(BORNES_SECONDES) + ["+Inf"], resume["effectifs_cumules"]):
+            lignes.append(f'{duree}_bucket{{{etiquette},le="{borne}"}} {effectif}')
+        lignes.append(f"{duree}_sum{{{etiquette}}} {resume['somme_s']}")
+        lignes.append(f"{duree}_count{{{etiquette}}} {resume['fenetre']}")
+
+    lignes += [f"# HELP {appels} Nombre d'exécutions de l'étape depuis le démarrage du processus",
+               f"# TYPE {appels} counter"]
+    lignes += [f'{appels}{{etape="{_etiquette(etape)}"}} {resume["nombre_total"]}' for etape, resume in resumes.items()]
+
+    lignes += [f"# HELP {memoire} Plus forte hausse de la mémoire résidente pendant l'étape, sur la fenêtre",
+               f"# TYPE {memoire} gauge"]
+    lignes += [f'{memoire}{{etape="{_etiquette(etape)}"}} {resume["hausse_rss_max_octets"]}'
+               for etape, resume in resumes.items() if resume["hausse_rss_max_octets"] is not None]
+    return "\n".join(lignes) + "\n"
+
+
+def exporter_prometheus(chemin=os.path.join(REPERTOIRE_METRIQUES, "metriques.prom")):
+    return _ecrire(chemin, texte_prometheus())
+
+
+# Profilage cProfile d'un bloc (sans effet si actif est faux) ; le profil est produit à la sortie
+@contextmanager
+def profiler(actif=True):
+    if not actif:
+        yield None
+        return
+    profil = cProfile.Profile()
+    profil.enable()
+    try:
+        yield profil
+    finally:
+        profil.disable()
+
+
+# Fonctions les plus coûteuses d'un profil, en texte (tri par temps cumulé)
+def rapport_profil(profil, nb_lignes=30, tri="cumulative"):
+    flux = io.StringIO()
+    pstats.Stats(profil, stream=flux).strip_dirs().sort_stats(tri).print_stats(nb_lignes)
+    return flux.getvalue()
+
+
+# Contenu d'un fichier .prof (lisible par pstats, snakeviz, etc.)
+def octets_profil(profil):
+    profil.create_stats()
+    return marshal.dumps(profil.stats)
@@ -1,173 +1,378 @@
 import streamlit as st
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.linear_model import Ridge, Lasso, ElasticNet
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.neighbors import KNeighborsRegressor
-from sklearn.svm import SVR
-from sklearn.tree import DecisionTreeRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
 import matplotlib.pyplot as plt
-import json
 import os
-import joblib
-from sklearn.preprocessing import StandardScaler
+from donnees import charger_donnees_nettoyees
+from catalogue_modeles import FEATURES, CIBLE, MODELES_NON_SELECTIONNES, modeles_standard
+from modeles_approches import COMPOSANTES_NOYAU
+from cache_modeles import CacheModeles, empreinte_tableaux
+from registre_modeles import enregistrer_artefact
+from pretraitement import Pretraitement, codes_depuis_nettoyees
+from schema_donnees import TYPE_MATRICE
+from moteur_entrainement import NB_PROCESSUS_DEFAUT
+from taches_entrainement import FileTaches, ETATS_ACTIFS, ANNULEE, ERREUR
+from entrainement_incremental import (entrainer_incremental, source_nettoyees, MODELES_INCREMENTAUX,
+                                      EPOQUES_DEFAUT)
+from recherche_hyperparametres import rechercher, ResultatRecherche, BUDGET_SECONDES_DEFAUT
+from instrumentation import mesurer
+from rendu_figures import figure_png
+from ressources import gestionnaire
+from export_resultats import (FORMATS_PREDICTIONS, MIME_MODELE, REPERTOIRE_PREDICTIONS, serialiser_predictions,
+                              serialiser_modele, persister)
 
 # Liste des variables explicatives et cible
-features = [
-    'Hours_Studied', 'Attendance', 'Sleep_Hours', 'Previous_Scores', 'Tutoring_Sessions',
-    'Physical_Activity', 'Parental_Involvement_Encoded', 'Access_to_Resources_Encoded',
-    'Motivation_Level_Encoded', 'Family_Income_Encoded', 'Teacher_Quality_Encoded',
-    'Extracurricular_Activities_Encoded', 'Internet_Access_Encoded', 'Learning_Disabilities_Encoded',
-    'School_Type_Encoded', 'Peer_Influence_Encoded', 'Parental_Education_Level_Encoded',
-    'Distance_from_Home_Encoded', 'Gender_Encoded'
-]
-target = 'Exam_Score'
-
-# Chargement des données
-data = pd.read_csv("https://raw.githubusercontent.com/OusseynouDIOP16/IML_STUDENT_PERFORMANCE/main/data_clean.csv")
-
-# Préparation des données
-X = data[features]
-y = data[target]
-
-# Normalisation des données
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-# Fonction pour enregistrer le modèle avec joblib
-def save_model(model, model_name):
+features = FEATURES
+target = CIBLE
+
+# Graine du découpage entraînement/test
+GRAINE_SPLIT = 42
+
+# Intervalle (en secondes) de rafraîchissement du suivi des entraînements en arrière-plan
+INTERVALLE_SUIVI = float(os.environ.get("STUDENT_INTERVALLE_SUIVI", "1.5"))
+
+# Données de modélisation : matrice standardisée, cible, prétraitement ajusté (enregistré avec
+# chaque modèle) et empreinte des données (clé du cache des modèles)
+class DonneesModelisation:
+    def __init__(self, X_scaled, y, pretraitement, empreinte):
+        self.X_scaled = X_scaled
+        self.y = y
+        self.pretraitement = pretraitement
+        self.empreinte = empreinte
+
+# Chargement et normalisation des données de modélisation
+@mesurer("modelisation.preparation")
+def _preparer_donnees():
+    data = charger_donnees_nettoyees()
+    X = data[features]
+    y = data[target]
+    pretraitement = Pretraitement().ajuster(X)
+    # Matrice float32 contiguë : la moitié de la mémoire, et aucune conversion dans les arbres de scikit-learn
+    X_scaled = pretraitement.standardiser(codes_depuis_nettoyees(X), dtype=TYPE_MATRICE)
+    return DonneesModelisation(X_scaled, y, pretraitement, empreinte_tableaux(X_scaled, y.to_numpy()))
+
+# Préparation à la première ouverture de la page (jamais à l'import du module), puis partage
+# entre les sessions et les reruns par le gestionnaire de ressources du processus
+def preparer_donnees():
+    return gestionnaire.obtenir(("modelisation", "preparation"), _preparer_donnees, "donnees")
+
+# Cache des modèles entraînés, partagé entre les sessions et les reruns
+@st.cache_resource
+def obtenir_cache_modeles():
+    return CacheModeles()
+
+# File des entraînements en arrière-plan, commune à toutes les sessions : un entraînement
+# continue pendant les reruns et ses résultats arrivent dans le cache des modèles
+@st.cache_resource
+def obtenir_file_taches():
+    return FileTaches(obtenir_cache_modeles())
+
+# Suivi des entraînements de la page : avancement, score de validation croisée partiel, annulation,
+# priorité. Le fragment est réexécuté seul toutes les INTERVALLE_SUIVI secondes tant qu'un entraînement
+# est actif ; la page entière est réexécutée à chaque modèle terminé pour mettre à jour la comparaison.
+def suivre_entrainements(cles, nb_termines):
+    file_taches = obtenir_file_taches()
+    resumes = file_taches.resumes(list(cles.values()))
+    if not resumes:
+        return
+
+    st.subheader("Entraînements en arrière-plan")
+    for resume in resumes:
+        col_nom, col_avancement, col_action, col_priorite = st.columns([3, 4, 1, 1])
+        col_nom.write(f"**{resume['nom']}** — {resume['etat']}")
+        texte = f"{resume['plis_termines']}/{resume['nb_plis']} plis"
+        if resume["r2_cv_partiel"] is not None:
+            texte += f", R² CV partiel {resume['r2_cv_partiel']:.4f}"
+        if resume["duree_s"] is not None:
+            texte += f", {resume['duree_s']:.1f} s"
+        col_avancement.progress(resume["avancement"], text=texte)
+        if resume["etat"] in ETATS_ACTIFS:
+            col_action.button("Annuler", key=f"annuler_{resume['cle']}", on_click=file_taches.annuler,
+                              args=(resume["cle"],))
+            col_priorite.button("Prioriser", key=f"prioriser_{resume['cle']}", on_click=file_taches.prioriser,
+                                args=(resume["cle"],))
+        elif resume["etat"] in (ANNULEE, ERREUR):
+            col_action.button("Relancer", key=f"relancer_{resume['cle']}", on_click=file_taches.relancer,
+                              args=(resume["cle"],))
+        if resume["erreur"]:
+            st.error(f"{resume['nom']} : {resume['erreur']}")
+
+    cache = obtenir_cache_modeles()
+    if sum(cache.obtenir(cle) is not None for cle in cles.values()) != nb_termines:
+        st.rerun()
+
+# Fonction pour enregistrer le modèle avec joblib (et ses métadonnées pour le registre des modèles).
+# La clé d'entraînement identifie le modèle : s'il est déjà enregistré, le fichier n'est pas réécrit.
+def save_model(model, model_name, resultats=None, pretraitement_modele=None, cle=None):
     model_filename = os.path.join("models", f"{model_name}_model.pkl")
     
-    # Créer le répertoire 'models' s'il n'existe pas
-    os.makedirs(os.path.dirname(model_filename), exist_ok=True)
-    
     try:
-        # Enregistrer le modèle avec joblib
-        joblib.dump(model, model_filename)
+        # Enregistrer le modèle avec joblib (le répertoire 'models' est créé s'il n'existe pas)
+        donnees = preparer_donnees()
+        ecrit = enregistrer_artefact(model, model_filename, "standardise", features,
+                                     pretraitement=pretraitement_modele or donnees.pretraitement, metriques=resultats,
+                                     empreinte_donnees=donnees.empreinte, cle_entrainement=cle)
+        if not ecrit:
+            st.write(f"Le modèle est déjà enregistré dans le fichier : `{model_filename}`")
+            return
         st.write(f"Le modèle a été enregistré avec succès dans le fichier : `{model_filename}`")
     except Exception as e:
         st.error(f"Erreur lors de l'enregistrement du modèle : {e}")
 
+# Nuage prédictions / valeurs réelles. L'image est mise en cache par la clé du modèle (données, graine
+# du découpage et hyperparamètres) : elle n'est retracée que pour un autre modèle ou d'autres données.
+def afficher_predictions_reelles(cle, y_reel, y_pred):
+    def tracer():
+        fig, ax = plt.subplots(figsize=(10, 6))  # Explicitement créer la figure et les axes
+        ax.scatter(y_reel, y_pred, color="blue", alpha=0.6)
+        ax.plot([min(y_reel), max(y_reel)], [min(y_reel), max(y_reel)], color="red", linestyle="--")
+        ax.set_xlabel("Valeurs Réelles")
+        ax.set_ylabel("Prédictions")
+        return fig
+    with mesurer("modelisation.rendu_graphique"):
+        st.image(figure_png((cle, "predictions_reelles"), tracer), use_container_width=True)
+
+# Contenu à télécharger, construit une seule fois par clé et partagé par le gestionnaire de ressources
+def contenu_export(cle, format_export, fabrique):
+    return gestionnaire.obtenir(("export", cle, format_export), fabrique, "exports")
+
+# Exports du meilleur modèle. Les contenus ne sont construits qu'à la demande (bouton « Préparer »),
+# puis restent disponibles pour les reruns suivants ; l'enregistrement sur disque est facultatif.
+def afficher_exports(model_name, cle, model, y_test, y_pred):
+    st.subheader("Export des résultats")
+    demandes = st.session_state.setdefault("exports_demandes", set())
+    col1, col2 = st.columns(2)
+
+    format_export = col1.selectbox("Format des prédictions", list(FORMATS_PREDICTIONS))
+    extension, mime = FORMATS_PREDICTIONS[format_export]
+    predictions = lambda: serialiser_predictions(y_test, y_pred, format_export)
+    if col1.button("Préparer les prédictions"):
+        demandes.add((cle, format_export))
+    if (cle, format_export) in demandes:
+        col1.download_button(
+            label=f"Télécharger les prédictions du meilleur modèle ({extension})",
+            data=contenu_export(cle, format_export, predictions),
+            file_name=f"{model_name}_predictions.{extension}",
+            mime=mime
+        )
+    if col1.checkbox("Enregistrer les prédictions sur disque"):
+        # Adressage par la clé d'entraînement : des prédictions inchangées ne sont jamais réécrites
+        chemin, ecrit = persister(REPERTOIRE_PREDICTIONS, f"{model_name}_predictions", cle, extension,
+                                  lambda: contenu_export(cle, format_export, predictions))
+        col1.caption(f"Prédictions {'enregistrées' if ecrit else 'déjà enregistrées'} dans `{chemin}`")
+
+    if col2.button("Préparer le modèle"):
+        demandes.add((cle, "modele"))
+    if (cle, "modele") in demandes:
+        col2.download_button(
+            label="Télécharger le modèle entraîné",
+            data=contenu_export(cle, "modele", lambda: serialiser_modele(model)),
+            file_name=f"{model_name}_model.pkl",
+            mime=MIME_MODELE
+        )
+
+# Recherche d'hyperparamètres sous budget : la meilleure configuration de chaque modèle remplace
+# ses hyperparamètres par défaut. Le résultat est mis en cache par modèle et par budget.
+def optimiser_modeles(models, X_train, y_train, budget, nb_processus):
+    cache = obtenir_cache_modeles()
+    graine = f"{GRAINE_SPLIT}-recherche-{budget}"
+    empreinte_donnees = preparer_donnees().empreinte
+    cles = {name: cache.cle(empreinte_donnees, graine, model) for name, model in models.items()}
+    recherches = {name: cache.obtenir(cle) for name, cle in cles.items()}
+    a_chercher = {name: models[name] for name, entree in recherches.items() if entree is None}
+
+    if a_chercher:
+        barre = st.progress(0.0, text="Recherche d'hyperparamètres...")
+        resultat = rechercher(a_chercher, X_train, y_train, budget, nb_processus=nb_processus, graine=GRAINE_SPLIT,
+                              progression=lambda part, nb: barre.progress(
+                                  min(part, 1.0), text=f"Recherche d'hyperparamètres : {nb} évaluations"))
+        barre.empty()
+        for name in a_chercher:
+            # Un modèle que le budget n'a pas permis d'évaluer garde ses hyperparamètres par défaut
+            if name not in resultat.meilleurs:
+                continue
+            entree = ResultatRecherche(resultat.classement[resultat.classement["Modèle"] == name],
+                                       {name: resultat.meilleurs[name]}, resultat.budget_epuise)
+            cache.stocker(cles[name], entree)
+            recherches[name] = entree
+
+    trouvees = [entree for entree in recherches.values() if entree is not None]
+    optimises = {name: entree.meilleurs[name] if entree is not None else models[name]
+                 for name, entree in recherches.items()}
+    classement = pd.concat([entree.classement for entree in trouvees], ignore_index=True) if trouvees else pd.DataFrame()
+    return optimises, classement
+
+# Entraînement incrémental : les données nettoyées sont lues par morceaux depuis le magasin,
+# la mémoire utilisée dépend de la taille des morceaux et non de celle du jeu
+def page_modelisation_incrementale():
+    st.sidebar.header("Choisissez les modèles à inclure")
+    selected_models = {model_name: st.sidebar.checkbox(model_name, value=True) for model_name in MODELES_INCREMENTAUX}
+    epoques = st.sidebar.number_input("Époques", min_value=1, max_value=100, value=EPOQUES_DEFAUT)
+    budget_mo = st.sidebar.number_input("Budget mémoire par morceau (Mo)", min_value=1, max_value=4096, value=64)
+
+    models = {name: model for name, model in MODELES_INCREMENTAUX.items() if selected_models[name]}
+    if not models:
+        st.warning("Sélectionnez au moins un modèle.")
+        return
+
+    try:
+        source, empreinte_nettoyees = source_nettoyees()
+
+        # Le résultat dépend aussi du nombre d'époques et de la taille des morceaux
+        graine = f"{GRAINE_SPLIT}-incremental-{epoques}-{budget_mo}"
+        cache = obtenir_cache_modeles()
+        cles = {name: cache.cle(empreinte_nettoyees, graine, model) for name, model in models.items()}
+        evaluations = {name: cache.obtenir(cle) for name, cle in cles.items()}
+        a_entrainer = {name: models[name] for name, entree in evaluations.items() if entree is None}
+
+        # Tous les modèles à entraîner partagent la même lecture des morceaux à chaque époque
+        if a_entrainer:
+            barre = st.progress(0.0, text="Entraînement incrémental...")
+            with mesurer("modelisation.entrainement_incremental"):
+                nouveaux = entrainer_incremental(
+                    source, a_entrainer, features, target, epoques, budget_mo * 1024 ** 2, graine=GRAINE_SPLIT,
+                    progression=lambda epoque, lignes: barre.progress(
+                        (epoque + 1) / epoques, text=f"Époque {epoque + 1}/{epoques} : {lignes} lignes"))
+            barre.empty()
+            for name, entree in nouveaux.items():
+                cache.stocker(cles[name], entree)
+                evaluations[name] = entree
+
+        st.subheader("Comparaison des Modèles")
+        results_df = pd.DataFrame({name: entree.resultats for name, entree in evaluations.items()}).T
+        results_df = results_df.sort_values(by="Test R²", ascending=False)
+        st.dataframe(results_df)
+        st.caption("Validation R² (CV) : validation progressive, chaque morceau étant évalué avant d'être appris. "
+                   "Le jeu de test (20 % des lignes, tirées par hachage de leur indice) n'est pas celui du mode "
+                   "standard : les scores des deux modes ne sont pas directement comparables.")
+
+        memoire = next(iter(evaluations.values())).memoire
+        col1, col2 = st.columns(2)
+        col1.metric("Pic mémoire Python/NumPy (Mo)", f"{memoire['pic_python_octets'] / 1024 ** 2:.1f}")
+        col2.metric("Hausse de la mémoire résidente (Mo)", f"{memoire['hausse_rss_octets'] / 1024 ** 2:.1f}")
+
+        # Enregistrement du meilleur modèle avec le prétraitement ajusté par partial_fit
+        best_model_name = results_df.index[0]
+        st.write(f"**Modèle avec le meilleur R² sur le test**: {best_model_name}")
+        best_evaluation = evaluations[best_model_name]
+        save_model(best_evaluation.modele, best_model_name, best_evaluation.resultats, best_evaluation.pretraitement,
+                   cle=cles[best_model_name])
+
+        # Prédictions vs valeurs réelles sur un échantillon du jeu de test
+        selected_model_name = st.selectbox("Choisissez un modèle pour l'analyse", list(results_df.index))
+        evaluation = evaluations[selected_model_name]
+        st.write(f"**→ Prédictions vs Valeurs Réelles : {selected_model_name}** ({len(evaluation.y_test)} lignes de test)")
+        afficher_predictions_reelles(cles[selected_model_name], evaluation.y_test, evaluation.y_test_pred)
+
+    except Exception as e:
+        st.error(f"Erreur : {e}")
+
 # Fonction principale de la page de modélisation
-def page_modelisation(data):
+def page_modelisation():
     st.title("Page de Modélisation des Performances Étudiantes")
 
+    # Mode d'entraînement : tous les modèles en mémoire, ou modèles incrémentaux sur des données lues par morceaux
+    mode = st.sidebar.radio("Mode d'entraînement", ["Standard (en mémoire)", "Incrémental (par morceaux)"])
+    if mode == "Incrémental (par morceaux)":
+        page_modelisation_incrementale()
+        return
+
     try:
         # Division des données en ensembles d'entraînement et de test
-        X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-
-        # Liste des modèles disponibles
-        models = {
-            "Régression Ridge": Ridge(),
-            "Régression Lasso": Lasso(),
-            "Régression ElasticNet": ElasticNet(),
-            "Random Forest Regressor": RandomForestRegressor(),
-            "Gradient Boosting Regressor": GradientBoostingRegressor(),
-            "K-Nearest Neighbors (KNN)": KNeighborsRegressor(),
-            "Support Vector Regressor (SVR)": SVR(),
-            "Decision Tree Regressor": DecisionTreeRegressor()
-        }
+        donnees = preparer_donnees()
+        X_train, X_test, y_train, y_test = train_test_split(donnees.X_scaled, donnees.y, test_size=0.2,
+                                                            random_state=GRAINE_SPLIT)
+
+        # Liste des modèles disponibles (nombre de composantes de l'approximation du noyau du SVR approché)
+        composantes_noyau = st.sidebar.number_input("Composantes du SVR approché (Nystroem)", min_value=10,
+                                                    max_value=5000, value=COMPOSANTES_NOYAU, step=50)
+        models = modeles_standard(composantes_noyau)
 
         # Choix des modèles à inclure
         st.sidebar.header("Choisissez les modèles à inclure")
-        selected_models = {model_name: st.sidebar.checkbox(model_name, value=True) for model_name in models.keys()}
+        selected_models = {model_name: st.sidebar.checkbox(model_name, value=model_name not in MODELES_NON_SELECTIONNES)
+                           for model_name in models.keys()}
+
+        # Nombre de processus utilisés pour l'entraînement
+        nb_processus = st.sidebar.number_input(
+            "Processus d'entraînement", min_value=1, max_value=os.cpu_count() or 1,
+            value=min(NB_PROCESSUS_DEFAUT, os.cpu_count() or 1)
+        )
+
+        # Recherche d'hyperparamètres (Hyperband) limitée par un budget de temps
+        recherche = st.sidebar.checkbox("Recherche d'hyperparamètres", value=False)
+        if recherche:
+            budget_recherche = st.sidebar.number_input("Budget de recherche (s)", min_value=5, max_value=3600,
+                                                       value=BUDGET_SECONDES_DEFAUT)
+            selection = {name: model for name, model in models.items() if selected_models[name]}
+            with mesurer("modelisation.recherche"):
+                optimises, classement = optimiser_modeles(selection, X_train, y_train, budget_recherche, nb_processus)
+            models.update(optimises)
 
-        # Dictionnaire pour stocker les résultats
+        # Dictionnaires des résultats et des évaluations (modèle entraîné et prédictions)
         results = {}
+        evaluations = {}
+        cache = obtenir_cache_modeles()
+        file_taches = obtenir_file_taches()
+        file_taches.nb_processus = nb_processus  # Pris en compte au prochain lot de tâches
 
-        # Entraînement et évaluation
+        # Les modèles déjà présents dans le cache ne sont pas réentraînés ; les autres sont confiés
+        # à la file des entraînements en arrière-plan (une tâche déjà soumise n'est pas dupliquée)
+        cles = {}
+        lot = (donnees.empreinte, GRAINE_SPLIT)
+        tableaux = {"X_train": X_train, "y_train": y_train, "X_test": X_test, "y_test": y_test}
         for model_name, model in models.items():
             if selected_models[model_name]:
-                model.fit(X_train, y_train)
-                y_train_pred = model.predict(X_train)  # Prédictions pour l'ensemble d'entraînement
-                y_test_pred = model.predict(X_test)    # Prédictions pour l'ensemble de test
-
-                # Validation croisée pour le R²
-                cv_r2 = cross_val_score(model, X_train, y_train, cv=5, scoring="r2").mean()
-
-                # Calcul des métriques
-                mae = mean_absolute_error(y_test, y_test_pred)
-                mse_train = mean_squared_error(y_train, y_train_pred)  # MSE pour l'entraînement
-                mse_test = mean_squared_error(y_test, y_test_pred)     # MSE pour le test
-                rmse = mse_test ** 0.5
-                r2 = r2_score(y_test, y_test_pred)
-
-                # Stockage des résultats
-                results[model_name] = {
-                    "MAE": mae,
-                    "MSE Entraînement": mse_train,  # MSE pour l'entraînement
-                    "MSE Test": mse_test,            # MSE pour le test
-                    "RMSE": rmse,
-                    "Validation R² (CV)": cv_r2,     # R² de la validation croisée
-                    "Test R²": r2
-                }
-
-        # Affichage des résultats sous forme de tableau
+                cles[model_name] = cache.cle(donnees.empreinte, GRAINE_SPLIT, model)
+                entree = cache.obtenir(cles[model_name])
+                if entree is None:
+                    file_taches.soumettre(cles[model_name], model_name, model, lot, tableaux)
+                else:
+                    file_taches.oublier(cles[model_name])
+                    results[model_name] = entree.resultats
+                    evaluations[model_name] = entree
+
+        # Suivi des entraînements, rafraîchi seul tant qu'au moins l'un d'eux est actif
+        actifs = any(resume["etat"] in ETATS_ACTIFS for resume in file_taches.resumes(list(cles.values())))
+        st.fragment(suivre_entrainements, run_every=INTERVALLE_SUIVI if actifs else None)(cles, len(results))
+
+        # Affichage des résultats des modèles terminés sous forme de tableau
         st.subheader("Comparaison des Modèles")
+        if not results:
+            st.info("Aucun modèle terminé pour l'instant : les résultats s'afficheront au fil des entraînements.")
+            return
         results_df = pd.DataFrame(results).T.sort_values(by="Test R²", ascending=False)
         st.dataframe(results_df)
 
+        # Classement de toutes les configurations évaluées, de la plus haute fidélité à la plus basse
+        if recherche and not classement.empty:
+            st.caption("Modèles entraînés avec la meilleure configuration trouvée par la recherche d'hyperparamètres.")
+            with st.expander("Classement de la recherche d'hyperparamètres"):
+                st.dataframe(classement)
+
         # Sélection du meilleur modèle basé sur le Test R²
         best_model_name = results_df.index[0]
         st.write(f"**Modèle avec le meilleur R² sur le test**: {best_model_name}")
-        best_model = models[best_model_name]
-
-        # Entraînement du meilleur modèle
-        best_model.fit(X_train, y_train)
-        y_best_pred = best_model.predict(X_test)
+        best_evaluation = evaluations[best_model_name]
 
-        # Enregistrement du meilleur modèle
-        save_model(best_model, best_model_name)
+        # Le meilleur modèle et ses prédictions proviennent de l'évaluation : ni réentraînement ni nouvelle prédiction
+        best_model = best_evaluation.modele
+        y_best_pred = best_evaluation.y_test_pred
 
-        # Enregistrement des prédictions du meilleur modèle dans un fichier local
-        predictions_dict = {
-            "Valeurs Réelles": y_test.tolist(),
-            "Prédictions": y_best_pred.tolist()
-        }
+        # Enregistrement du meilleur modèle (sauf s'il est déjà enregistré)
+        save_model(best_model, best_model_name, best_evaluation.resultats, cle=cles[best_model_name])
 
-        file_path = os.path.join("predictions", f"{best_model_name}_predictions.json")
-
-        # Créer le répertoire 'predictions' s'il n'existe pas
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-        # Sauvegarder les prédictions dans un fichier JSON
-        with open(file_path, "w") as f:
-            json.dump(predictions_dict, f, indent=4)
-
-        st.write(f"Les prédictions ont été enregistrées dans le fichier : `{file_path}`")
-
-        # Proposer le téléchargement du fichier JSON
-        st.download_button(
-            label="Télécharger les prédictions du meilleur modèle en JSON",
-            data=open(file_path, "r").read(),  # Lire le contenu du fichier pour le téléchargement
-            file_name=f"{best_model_name}_predictions.json",
-            mime="application/json"
-        )
-
-        # Optionnel: Vous pouvez également permettre à l'utilisateur de télécharger le modèle
-        st.download_button(
-            label="Télécharger le modèle entraîné",
-            data=open(os.path.join("models", f"{best_model_name}_model.pkl"), "rb").read(),  # Lire le modèle binaire pour le téléchargement
-            file_name=f"{best_model_name}_model.pkl",
-            mime="application/octet-stream"
-        )
+        # Export des prédictions et du modèle, sérialisés depuis la mémoire
+        afficher_exports(best_model_name, cles[best_model_name], best_model, y_test.to_numpy(), y_best_pred)
 
         # Sélection d'un modèle pour l'analyse détaillée
         st.subheader("Analyse d'un modèle spécifique")
         selected_model_name = st.selectbox("Choisissez un modèle pour l'analyse", list(results.keys()))
-        selected_model = models[selected_model_name]
-        selected_model.fit(X_train, y_train)
-        y_pred = selected_model.predict(X_test)
+        y_pred = evaluations[selected_model_name].y_test_pred
 
         # Visualisation des prédictions vs valeurs réelles
         st.write(f"**→ Prédictions vs Valeurs Réelles : {selected_model_name}**")
-        fig, ax = plt.subplots(figsize=(10, 6))  # Explicitement créer la figure et les axes
-        ax.scatter(y_test, y_pred, color="blue", alpha=0.6)
-        ax.plot([min(y_test), max(y_test)], [min(y_test), max(y_test)], color="red", linestyle="--")
-        ax.set_xlabel("Valeurs Réelles")
-        ax.set_ylabel("Prédictions")
-        st.pyplot(fig)  # Passer explicitement la figure
+        afficher_predictions_reelles(cles[selected_model_name], y_test, y_pred)
 
     except Exception as e:
         st.error(f"Erreur : {e}")
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_context
+
+import numpy as np
+
+from evaluation import ajuster_complet, evaluer_pli
+
+# Nombre de processus par défaut (surchargeable par variable d'environnement)
+NB_PROCESSUS_DEFAUT = int(os.environ.get("STUDENT_N_WORKERS", os.cpu_count() or 1))
+
+# Tableaux mappés en mémoire, propres à chaque processus de travail
+_tableaux = {}
+
+
+# Initialisation d'un processus : ouverture des tableaux en lecture seule, sans copie
+def _initialiser_processus(chemins):
+    for nom, chemin in chemins.items():
+        _tableaux[nom] = np.load(chemin, mmap_mode="r")
+
+
+# Tableau partagé du processus courant (dans un processus de travail du pool)
+def tableau_partage(nom):
+    return _tableaux[nom]
+
+
+# Pool de processus partageant des tableaux : ils sont écrits une seule fois sur disque
+# puis mappés en mémoire, en lecture seule, par chaque processus
+@contextmanager
+def pool_partage(tableaux, nb_processus):
+    with tempfile.TemporaryDirectory(prefix="entrainement-") as repertoire:
+        chemins = {}
+        for nom, tableau in tableaux.items():
+            chemins[nom] = os.path.join(repertoire, f"{nom}.npy")
+            np.save(chemins[nom], np.ascontiguousarray(tableau))
+
+        contexte = get_context("spawn")
+        with ProcessPoolExecutor(max_workers=nb_processus, mp_context=contexte,
+                                 initializer=_initialiser_processus, initargs=(chemins,)) as pool:
+            yield pool
+
+
+# Étape instrumentée correspondant à une unité de travail
+def etape_unite(pli):
+    return "modelisation.ajustement" if pli is None else "modelisation.validation_croisee"
+
+
+# Unité de travail : un pli de validation croisée (pli >= 0) ou l'entraînement complet (pli = None).
+# Sa durée est mesurée là où elle s'exécute et renvoyée avec le résultat.
+def executer_unite(modele, pli, nb_plis, tableaux):
+    X_train, y_train = tableaux["X_train"], tableaux["y_train"]
+    debut = time.perf_counter()
+    if pli is None:
+        resultat = ajuster_complet(modele, X_train, y_train, tableaux["X_test"])
+    else:
+        resultat = evaluer_pli(modele, X_train, y_train, pli, nb_plis)
+    return resultat, time.perf_counter() - debut
+
+
+# Unité de travail dans un processus du pool partagé
+def _executer_unite(modele, pli, nb_plis):
+    return executer_unite(modele, pli, nb_plis, _tableaux)
@@ -0,0 +1,90 @@
+import streamlit as st
+
+from instrumentation import (journal_execution, registre, exporter_json, exporter_prometheus, rapport_profil,
+                             octets_profil)
+from ressources import gestionnaire
+
+# Panneau d'instrumentation de la barre latérale : temps par étape de l'exécution courante,
+# histogrammes glissants du processus (export JSON / Prometheus) et profilage cProfile d'une exécution.
+
+
+# Options lues avant l'affichage de la page. Le profilage est demandé par un bouton et
+# s'applique à l'exécution suivante (celle déclenchée par la prochaine interaction).
+def options_instrumentation():
+    profil_demande = st.session_state.pop("instrumentation_profil_demande", False)
+    with st.sidebar.expander("Instrumentation"):
+        afficher = st.checkbox("Afficher les temps par étape", key="instrumentation_panneau")
+        if st.button("Profiler la prochaine exécution (cProfile)"):
+            st.session_state["instrumentation_profil_demande"] = True
+            st.caption("Le profil sera capturé à la prochaine interaction avec la page.")
+    return afficher, profil_demande
+
+
+# Temps de l'exécution courante, regroupés par étape (sans pandas : le panneau n'alourdit pas le démarrage)
+def lignes_execution():
+    etapes = {}
+    for etape, secondes, hausse_rss in journal_execution():
+        ligne = etapes.setdefault(etape, {"Étape": etape, "Appels": 0, "Durée (ms)": 0.0, "Hausse RSS (Mo)": 0.0})
+        ligne["Appels"] += 1
+        ligne["Durée (ms)"] += secondes * 1000
+        ligne["Hausse RSS (Mo)"] += (hausse_rss or 0) / 1024 ** 2
+    return list(etapes.values())
+
+
+# Histogrammes glissants du processus, résumés par étape
+def lignes_processus():
+    return [{"Étape": etape, "Appels": resume["nombre_total"], "Fenêtre": resume["fenetre"],
+             "p50 (ms)": resume["p50_s"] * 1000, "p95 (ms)": resume["p95_s"] * 1000, "Max (ms)": resume["max_s"] * 1000}
+            for etape, resume in registre.resumes().items()]
+
+
+# Ressources partagées par les sessions du processus, par catégorie
+def lignes_ressources(statistiques):
+    return [{"Catégorie": categorie, "Entrées": ligne["entrees"], "Retenues": ligne["retenues"],
+             "Taille (Mo)": ligne["taille_octets"] / 1024 ** 2,
+             "Plafond (Mo)": ligne["plafond_octets"] / 1024 ** 2 if ligne["plafond_octets"] is not None else None,
+             "Taux de succès": ligne["taux_succes"] * 100 if ligne["taux_succes"] is not None else None,
+             "Évictions": ligne["evictions"]}
+            for categorie, ligne in statistiques["categories"].items()]
+
+
+# Affichage du panneau après la page : les étapes de l'exécution sont alors toutes mesurées
+def afficher_panneau(afficher, profil, duree_totale):
+    if profil is not None:
+        with st.sidebar.expander("Profil cProfile de cette exécution", expanded=True):
+            st.code(rapport_profil(profil), language="text")
+            st.download_button("Télécharger le profil (.prof)", data=octets_profil(profil),
+                               file_name="execution.prof", mime="application/octet-stream")
+
+    if not afficher:
+        return
+    with st.sidebar.expander("Temps par étape", expanded=True):
+        st.caption(f"Exécution du script : {duree_totale * 1000:.0f} ms")
+        execution = lignes_execution()
+        if execution:
+            st.dataframe(execution, hide_index=True,
+                         column_config={"Durée (ms)": st.column_config.NumberColumn(format="%.1f"),
+                                        "Hausse RSS (Mo)": st.column_config.NumberColumn(format="%.1f")})
+        else:
+            st.caption("Aucune étape instrumentée dans cette exécution.")
+
+        st.caption("Histogrammes glissants du processus (toutes sessions)")
+        processus = lignes_processus()
+        if processus:
+            st.dataframe(processus, hide_index=True,
+                         column_config={colonne: st.column_config.NumberColumn(format="%.1f")
+                                        for colonne in ("p50 (ms)", "p95 (ms)", "Max (ms)")})
+
+        statistiques = gestionnaire.statistiques()
+        st.caption(f"Ressources partagées : {statistiques['taille_octets'] / 1024 ** 2:.1f} Mo "
+                   f"sur {statistiques['plafond_octets'] / 1024 ** 2:.0f} Mo")
+        st.dataframe(lignes_ressources(statistiques), hide_index=True,
+                     column_config={"Taille (Mo)": st.column_config.NumberColumn(format="%.1f"),
+                                    "Plafond (Mo)": st.column_config.NumberColumn(format="%.0f"),
+                                    "Taux de succès": st.column_config.NumberColumn(format="%.0f %%")})
+
+        col1, col2 = st.columns(2)
+        if col1.button("Exporter (JSON)"):
+            st.caption(f"Métriques écrites dans `{exporter_json()}`")
+        if col2.button("Exporter (Prometheus)"):
+            st.caption(f"Métriques écrites dans `{exporter_prometheus()}`")
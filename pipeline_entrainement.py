@@ -0,0 +1,283 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+
+import joblib
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split
+
+from cache_modeles import CacheModeles, empreinte_tableaux
+from catalogue_modeles import CIBLE, FEATURES, MODELES_NON_SELECTIONNES, modeles_standard
+from donnees import entree_magasin, lire_jeu
+from evaluation import evaluer_modele
+from export_resultats import FORMATS_PREDICTIONS, REPERTOIRE_PREDICTIONS, persister, serialiser_predictions
+from modeles_approches import COMPOSANTES_NOYAU
+from moteur_entrainement import NB_PROCESSUS_DEFAUT
+from pretraitement import Pretraitement, codes_depuis_nettoyees
+from registre_modeles import enregistrer_artefact
+from schema_donnees import TYPE_MATRICE
+
+# Pipeline d'entraînement hors application, sans Streamlit : les étapes de la page de modélisation
+# (chargement des données nettoyées -> encodage -> standardisation -> découpage -> entraînement et
+# validation croisée de chaque modèle -> sélection -> export) forment un graphe orienté sans cycle.
+# Les données sont celles de la page : le jeu "nettoyees" du magasin (data_clean.csv), dont le nettoyage
+# (traitement des valeurs manquantes comprises) a été fait en amont du dépôt.
+#   - la clé d'une étape est l'empreinte de sa fonction, de sa version, de ses paramètres et des clés de
+#     ses entrées ; la clé du chargement est l'empreinte du contenu du fichier source. Une clé ne dépend
+#     donc que de ce qui détermine le résultat ;
+#   - le résultat de chaque étape est enregistré sous sa clé (REPERTOIRE_PIPELINE) : une nouvelle exécution
+#     ne recalcule que les étapes dont une entrée ou un paramètre a changé, et ne relit que les résultats
+#     dont une étape recalculée a besoin ;
+#   - les étapes indépendantes (un entraînement par modèle) s'exécutent en parallèle sur un pool de processus ;
+#   - l'export écrit les mêmes artefacts que la page : models/<modèle>_model.pkl avec ses métadonnées et son
+#     prétraitement (lus par le registre des modèles), et predictions/<modèle>_predictions-<clé>.<format>.
+#     La clé d'entraînement est celle du cache des modèles de la page : un modèle inchangé n'est pas réécrit.
+#     L'export vérifie d'abord que l'empreinte des données est celle de la page de modélisation.
+#   python pipeline_entrainement.py --source data_clean.csv --processus 4
+#   python pipeline_entrainement.py --modeles "Régression Ridge" "Gradient Boosting Regressor" --plis 10
+
+REPERTOIRE_PIPELINE = os.environ.get("STUDENT_PIPELINE_CACHE", "pipeline_cache")
+
+# Mêmes valeurs que la page de modélisation
+GRAINE_SPLIT = 42
+PART_TEST = 0.2
+NB_PLIS = 5
+
+EN_CACHE = "en cache"
+CALCULEE = "calculée"
+
+
+# Description stable d'un paramètre pour la clé : un estimateur est décrit par sa classe et ses
+# hyperparamètres, comme dans la clé du cache des modèles
+def _decrire(valeur):
+    if hasattr(valeur, "get_params"):
+        classe = type(valeur)
+        return f"{classe.__module__}.{classe.__qualname__}{sorted(valeur.get_params().items())!r}"
+    return repr(valeur)
+
+
+class Etape:
+    def __init__(self, nom, fonction, entrees, parametres, version, en_cache):
+        self.nom = nom
+        self.fonction = fonction
+        self.entrees = entrees
+        self.parametres = parametres
+        self.version = version
+        self.en_cache = en_cache  # Une étape à effets de bord (export) est exécutée à chaque fois
+
+
+# Exécution d'une étape (dans le processus courant ou dans un processus du pool) : (résultat, secondes)
+def _executer_etape(fonction, entrees, parametres):
+    debut = time.perf_counter()
+    resultat = fonction(*entrees, **parametres)
+    return resultat, time.perf_counter() - debut
+
+
+class GrapheEtapes:
+    def __init__(self, repertoire=REPERTOIRE_PIPELINE):
+        self.repertoire = repertoire
+        self.etapes = {}  # Ordre d'ajout : une étape ne dépend que d'étapes déjà ajoutées
+
+    def ajouter(self, nom, fonction, entrees=(), version=1, en_cache=True, **parametres):
+        inconnues = [entree for entree in entrees if entree not in self.etapes]
+        if inconnues:
+            raise ValueError(f"Étape {nom} : entrées inconnues ({', '.join(inconnues)})")
+        self.etapes[nom] = Etape(nom, fonction, list(entrees), parametres, version, en_cache)
+
+    # Clés de toutes les étapes, calculées avant toute exécution (elles ne dépendent pas des résultats)
+    def cles(self):
+        cles = {}
+        for nom, etape in self.etapes.items():
+            description = {
+                "etape": nom,
+                "fonction": etape.fonction.__qualname__,  # Sans le module : "__main__" en ligne de commande
+                "version": etape.version,
+                "parametres": {parametre: _decrire(valeur) for parametre, valeur in etape.parametres.items()},
+                "entrees": [cles[entree] for entree in etape.entrees],
+            }
+            cles[nom] = hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+        return cles
+
+    def _chemin(self, nom, cle):
+        return os.path.join(self.repertoire, f"{nom.split(':')[0]}-{cle}.joblib")
+
+    def _enregistrer(self, chemin, resultat):
+        os.makedirs(self.repertoire, exist_ok=True)
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        joblib.dump(resultat, temporaire)
+        os.replace(temporaire, chemin)
+
+    # Exécution du graphe : les étapes dont le résultat est enregistré ne sont pas recalculées (sauf
+    # celles de forcer) ; les autres sont lancées dès que leurs entrées sont disponibles, jusqu'à
+    # nb_processus à la fois. Retourne (résultats des étapes calculées ou relues, rapport par étape).
+    def executer(self, nb_processus=1, forcer=(), journal=print):
+        cles = self.cles()
+        chemins = {nom: self._chemin(nom, cle) for nom, cle in cles.items()}
+        a_calculer = [nom for nom, etape in self.etapes.items()
+                      if not etape.en_cache or nom in forcer or not os.path.exists(chemins[nom])]
+        rapport = {nom: {"etat": EN_CACHE, "secondes": 0.0, "cle": cles[nom]}
+                   for nom in self.etapes if nom not in a_calculer}
+
+        # Seuls les résultats enregistrés dont une étape à calculer a besoin sont relus
+        resultats = {}
+        for nom in dict.fromkeys(entree for etape in a_calculer for entree in self.etapes[etape].entrees):
+            if nom not in a_calculer:
+                resultats[nom] = joblib.load(chemins[nom])
+        for nom, ligne in rapport.items():
+            journal(f"  {nom:45s} {ligne['etat']:9s} {ligne['cle'][:12]}")
+
+        contexte = get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=nb_processus, mp_context=contexte) if nb_processus > 1 else None
+        en_vol = {}
+        restantes = list(a_calculer)
+        try:
+            while restantes or en_vol:
+                pretes = [nom for nom in restantes if all(entree in resultats for entree in self.etapes[nom].entrees)]
+                for nom in pretes:
+                    restantes.remove(nom)
+                    etape = self.etapes[nom]
+                    arguments = (etape.fonction, [resultats[entree] for entree in etape.entrees], etape.parametres)
+                    if pool is None:
+                        self._terminer(nom, _executer_etape(*arguments), resultats, rapport, chemins, cles, journal)
+                    else:
+                        en_vol[pool.submit(_executer_etape, *arguments)] = nom
+                if not en_vol:
+                    continue
+                terminees, _ = wait(en_vol, return_when=FIRST_COMPLETED)
+                for future in terminees:
+                    self._terminer(en_vol.pop(future), future.result(), resultats, rapport, chemins, cles, journal)
+        finally:
+            if pool is not None:
+                for future in en_vol:
+                    future.cancel()
+                pool.shutdown()
+        return resultats, rapport
+
+    def _terminer(self, nom, execution, resultats, rapport, chemins, cles, journal):
+        resultat, secondes = execution
+        resultats[nom] = resultat
+        if self.etapes[nom].en_cache:
+            self._enregistrer(chemins[nom], resultat)
+        rapport[nom] = {"etat": CALCULEE, "secondes": secondes, "cle": cles[nom]}
+        journal(f"  {nom:45s} {CALCULEE:9s} {cles[nom][:12]}  {secondes:8.3f} s")
+
+
+# Étapes du pipeline
+
+# Données nettoyées du magasin Parquet (le nom du fichier contient l'empreinte de son contenu)
+def charger(fichier, sha256):
+    return lire_jeu({"fichier": fichier, "sha256": sha256})
+
+
+# Matrice "codes" et cible
+def encoder(nettoyees):
+    return codes_depuis_nettoyees(nettoyees[FEATURES]), nettoyees[CIBLE].to_numpy()
+
+
+# Prétraitement ajusté, matrice standardisée et empreinte des données (celle de la page de modélisation)
+def standardiser(nettoyees, encodees):
+    X_codes, y = encodees
+    pretraitement = Pretraitement().ajuster(nettoyees[FEATURES])
+    X_scaled = pretraitement.standardiser(X_codes, dtype=TYPE_MATRICE)
+    return {"pretraitement": pretraitement, "X_scaled": X_scaled, "empreinte": empreinte_tableaux(X_scaled, y)}
+
+
+def decouper(standardisees, encodees, part_test, graine):
+    X_train, X_test, y_train, y_test = train_test_split(standardisees["X_scaled"], encodees[1], test_size=part_test,
+                                                        random_state=graine)
+    return {"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test}
+
+
+# Validation croisée et entraînement complet d'un modèle (ResultatEvaluation)
+def entrainer(decoupage, modele, nb_plis):
+    return evaluer_modele(clone(modele), decoupage["X_train"], decoupage["y_train"], decoupage["X_test"],
+                          decoupage["y_test"], nb_plis)
+
+
+# Meilleur modèle sur le R² de test : (nom, tableau de comparaison, évaluation du meilleur)
+def selectionner(*evaluations, noms):
+    tableau = pd.DataFrame({nom: evaluation.resultats for nom, evaluation in zip(noms, evaluations)}).T
+    tableau = tableau.sort_values(by="Test R²", ascending=False)
+    meilleur = tableau.index[0]
+    return meilleur, tableau, evaluations[noms.index(meilleur)]
+
+
+# Artefacts lus par l'application : modèle et métadonnées dans models/, prédictions du test dans predictions/.
+# Rien n'est écrit si les données ne sont pas celles de la page (empreinte_attendue)
+def exporter(selection, standardisees, decoupage, graine, format_predictions, empreinte_attendue=None):
+    if empreinte_attendue is not None and standardisees["empreinte"] != empreinte_attendue:
+        raise ValueError(f"Empreinte des données ({standardisees['empreinte'][:12]}) différente de celle de la page "
+                         f"de modélisation ({empreinte_attendue[:12]}) : export annulé")
+    nom, _, evaluation = selection
+    cle = CacheModeles.cle(standardisees["empreinte"], graine, evaluation.modele)
+    chemin_modele = os.path.join("models", f"{nom}_model.pkl")
+    modele_ecrit = enregistrer_artefact(evaluation.modele, chemin_modele, "standardise", FEATURES,
+                                        pretraitement=standardisees["pretraitement"], metriques=evaluation.resultats,
+                                        empreinte_donnees=standardisees["empreinte"], cle_entrainement=cle)
+    extension, _ = FORMATS_PREDICTIONS[format_predictions]
+    chemin_predictions, predictions_ecrites = persister(
+        REPERTOIRE_PREDICTIONS, f"{nom}_predictions", cle, extension,
+        lambda: serialiser_predictions(decoupage["y_test"], evaluation.y_test_pred, format_predictions))
+    return {"modele": chemin_modele, "modele_ecrit": modele_ecrit,
+            "predictions": chemin_predictions, "predictions_ecrites": predictions_ecrites}
+
+
+# Graphe complet pour une entrée "nettoyees" du magasin et une sélection de modèles
+def construire_pipeline(entree_nettoyees, modeles, nb_plis=NB_PLIS, graine=GRAINE_SPLIT, part_test=PART_TEST,
+                        format_predictions="parquet", repertoire=REPERTOIRE_PIPELINE, empreinte_attendue=None):
+    graphe = GrapheEtapes(repertoire)
+    graphe.ajouter("charger", charger, fichier=entree_nettoyees["fichier"], sha256=entree_nettoyees["sha256"])
+    graphe.ajouter("encoder", encoder, ["charger"])
+    graphe.ajouter("standardiser", standardiser, ["charger", "encoder"])
+    graphe.ajouter("decouper", decouper, ["standardiser", "encoder"], part_test=part_test, graine=graine)
+    for nom, modele in modeles.items():
+        graphe.ajouter(f"entrainer:{nom}", entrainer, ["decouper"], modele=modele, nb_plis=nb_plis)
+    graphe.ajouter("selectionner", selectionner, [f"entrainer:{nom}" for nom in modeles], noms=list(modeles))
+    graphe.ajouter("exporter", exporter, ["selectionner", "standardiser", "decouper"], en_cache=False,
+                   graine=graine, format_predictions=format_predictions, empreinte_attendue=empreinte_attendue)
+    return graphe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline d'entraînement hors application, avec cache par étape")
+    parser.add_argument("--source", help="Répertoire des CSV ou fichier data_clean.csv "
+                                         "(par défaut : STUDENT_DATA_SOURCE, sinon le dépôt distant)")
+    parser.add_argument("--modeles", nargs="+", help="Modèles à entraîner (par défaut : ceux cochés sur la page)")
+    parser.add_argument("--composantes", type=int, default=COMPOSANTES_NOYAU,
+                        help="Composantes de l'approximation du noyau du SVR approché")
+    parser.add_argument("--plis", type=int, default=NB_PLIS)
+    parser.add_argument("--processus", type=int, default=NB_PROCESSUS_DEFAUT)
+    parser.add_argument("--format", choices=list(FORMATS_PREDICTIONS), default="parquet")
+    parser.add_argument("--forcer", nargs="+", default=[], help="Étapes à recalculer même si elles sont en cache")
+    parser.add_argument("--cache", default=REPERTOIRE_PIPELINE, help="Répertoire des résultats des étapes")
+    args = parser.parse_args()
+
+    catalogue = modeles_standard(args.composantes)
+    noms = args.modeles or [nom for nom in catalogue if nom not in MODELES_NON_SELECTIONNES]
+    inconnus = [nom for nom in noms if nom not in catalogue]
+    if inconnus:
+        parser.error(f"modèles inconnus : {', '.join(inconnus)} (disponibles : {', '.join(catalogue)})")
+
+    debut = time.perf_counter()
+    entree_nettoyees = entree_magasin("nettoyees", args.source)
+    # Empreinte des données de la page de modélisation (même magasin, même préparation) : l'export la vérifie
+    from modelisation import preparer_donnees
+    graphe = construire_pipeline(entree_nettoyees, {nom: catalogue[nom] for nom in noms},
+                                 nb_plis=args.plis, format_predictions=args.format, repertoire=args.cache,
+                                 empreinte_attendue=preparer_donnees().empreinte)
+    resultats, rapport = graphe.executer(nb_processus=max(1, args.processus), forcer=set(args.forcer))
+
+    meilleur, tableau, _ = resultats["selectionner"]
+    export = resultats["exporter"]
+    calculees = sum(ligne["etat"] == CALCULEE for ligne in rapport.values())
+    print(f"\n{calculees}/{len(rapport)} étapes calculées en {time.perf_counter() - debut:.1f} s\n")
+    print(tableau.to_string(float_format=lambda valeur: f"{valeur:.4f}"))
+    print(f"\nMeilleur modèle : {meilleur}")
+    print(f"Modèle {'enregistré' if export['modele_ecrit'] else 'déjà enregistré'} : {export['modele']}")
+    print(f"Prédictions {'enregistrées' if export['predictions_ecrites'] else 'déjà enregistrées'} : "
+          f"{export['predictions']}")
@@ -1,48 +1,278 @@
 import streamlit as st
-import joblib
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder
+import numpy as np
+import matplotlib.pyplot as plt
 import os
+import tempfile
+from score_lot import scorer_fichier, BUDGET_MEMOIRE_DEFAUT
+from registre_modeles import obtenir_registre
+from instrumentation import mesurer
+from pretraitement import BORNES_SAISIE, COLONNES_BRUTES
+from simulation import balayer, cle_artefact, predire_memoise
+from rendu_figures import figure_png
+from donnees import charger_donnees_brutes, empreinte
+from explications import MagasinExplications, chemin_explications, empreinte_artefact, explicateur_si_possible, precalculer
+from ressources import gestionnaire
 
-# Chargement des données
-data = pd.read_csv("https://raw.githubusercontent.com/OusseynouDIOP16/IML_STUDENT_PERFORMANCE/main/StudentPerformanceFactors.csv", sep=",")
+# Libellés affichés pour les catégories (les valeurs transmises au modèle restent celles du jeu de données)
+LIBELLES_CATEGORIES = {
+    "Low": "Faible", "Medium": "Moyen", "High": "Élevé",
+    "No": "Non", "Yes": "Oui",
+    "Public": "Public", "Private": "Privé",
+    "Negative": "Négative", "Neutral": "Neutre", "Positive": "Positive",
+    "High School": "Lycée", "College": "Université", "Postgraduate": "Études supérieures",
+    "Near": "Proche", "Moderate": "Moyenne", "Far": "Éloignée",
+    "Male": "Masculin", "Female": "Féminin",
+}
+
+# Méthodes d'attribution (explications.py)
+LIBELLES_METHODES = {
+    "treeshap": "valeurs TreeSHAP",
+    "chemins": "contributions de chemin (shap n'est pas installé)",
+}
+
+# Liste déroulante des catégories d'une variable, dans l'ordre de ses codes
+def choix_categorie(label, colonne, pretraitement, index=0):
+    return st.selectbox(label, list(pretraitement.codes[colonne]), index=index,
+                        format_func=lambda categorie: LIBELLES_CATEGORIES.get(categorie, categorie))
+
+# Champ de saisie d'une variable numérique, borné par son domaine
+def champ_numerique(label, colonne, valeur):
+    minimum, maximum = BORNES_SAISIE[colonne]
+    return st.number_input(label, min_value=minimum, max_value=maximum, value=valeur)
+
+# Libellés des valeurs balayées d'une variable (catégories traduites)
+def libelles_axe(etiquettes):
+    return [LIBELLES_CATEGORIES.get(etiquette, etiquette) for etiquette in etiquettes]
+
+# Position de la valeur du profil saisi parmi les valeurs balayées
+def position_profil(X_codes, colonne, valeurs):
+    return int(np.argmin(np.abs(valeurs - X_codes[0, COLONNES_BRUTES.index(colonne)])))
+
+# Graduations d'un axe balayé : toutes les valeurs d'une catégorie, une sur dix au plus pour un domaine entier
+def graduer(axe_positions, etiquettes):
+    pas = max(1, len(etiquettes) // 10)
+    axe_positions(range(0, len(etiquettes), pas), libelles_axe(etiquettes)[::pas])
+
+# Simulation what-if : réponse du modèle quand une ou deux variables parcourent tout leur domaine,
+# les autres restant celles du profil saisi ; toute la grille est prédite en un seul appel
+def page_simulation(model, metadonnees, pretraitement, X_codes):
+    st.subheader("Simulation : variation d'une ou deux variables")
+    colonnes = st.multiselect("Variables à faire varier (une ou deux)", COLONNES_BRUTES, default=["Hours_Studied"],
+                              max_selections=2)
+    if not colonnes:
+        st.info("Choisissez au moins une variable à faire varier.")
+        return
+
+    with mesurer("prediction.simulation"):
+        predictions, axes = balayer(model, metadonnees, pretraitement, X_codes, colonnes)
+    positions = [position_profil(X_codes, colonne, valeurs) for colonne, (valeurs, _) in zip(colonnes, axes)]
+
+    def tracer():
+        fig, ax = plt.subplots(figsize=(10, 6))
+        if len(colonnes) == 1:
+            ax.plot(range(len(predictions)), predictions, color="#4CAF50", marker="o", markersize=3)
+            ax.scatter([positions[0]], [predictions[positions[0]]], color="red", zorder=3, label="Profil saisi")
+            graduer(ax.set_xticks, axes[0][1])
+            ax.set_xlabel(colonnes[0])
+            ax.set_ylabel("Score prédit")
+            ax.legend()
+        else:
+            image = ax.imshow(predictions.T, origin="lower", aspect="auto", cmap="viridis")
+            ax.scatter([positions[0]], [positions[1]], color="red", marker="x", s=80, label="Profil saisi")
+            graduer(ax.set_xticks, axes[0][1])
+            graduer(ax.set_yticks, axes[1][1])
+            ax.set_xlabel(colonnes[0])
+            ax.set_ylabel(colonnes[1])
+            fig.colorbar(image, ax=ax, label="Score prédit")
+            ax.legend()
+        plt.title("Score prédit en fonction de " + " et ".join(colonnes))
+        return fig
+
+    # Image mise en cache par artefact, profil et variables balayées
+    cle = (cle_artefact(metadonnees), X_codes[0].tobytes(), tuple(colonnes))
+    st.image(figure_png(cle, tracer), use_container_width=True)
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Score du profil saisi", f"{predictions[tuple(positions)]:.2f}")
+    col2.metric("Score minimal", f"{predictions.min():.2f}")
+    col3.metric("Score maximal", f"{predictions.max():.2f}")
+    st.caption(f"{predictions.size} profils évalués en un seul appel au modèle.")
+
+# Explicateur du modèle chargé (None s'il n'est pas à arbres ou si son espace d'entrée est inconnu),
+# gardé par le gestionnaire de ressources
+def obtenir_explicateur(model, metadonnees, pretraitement):
+    cle = ("explicateur", cle_artefact(metadonnees))
+    explicateur = gestionnaire.consulter(cle, "explications")
+    if explicateur is None:
+        explicateur = explicateur_si_possible(model, metadonnees, pretraitement)
+        if explicateur is not None:
+            gestionnaire.deposer(cle, explicateur, "explications")
+    return explicateur
+
+# Diagramme en barres d'attributions (Series triée par importance décroissante : la plus forte en haut)
+def tracer_attributions(attributions, titre, legende="Contribution au score prédit"):
+    def tracer():
+        valeurs = attributions.iloc[::-1]
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.barh(valeurs.index, valeurs.values, color=["#4CAF50" if valeur >= 0 else "#F44336" for valeur in valeurs])
+        ax.axvline(0, color="black", linewidth=0.8)
+        ax.set_xlabel(legende)
+        plt.title(titre)
+        return fig
+    return tracer
+
+# Explications sur tout le jeu de données : attributions précalculées une fois (fichier Parquet propre
+# au modèle et aux données), importance globale et détail d'un étudiant lus dans ce fichier
+def page_explications(model, metadonnees, pretraitement):
+    st.subheader("Explications du modèle sur le jeu de données")
+    if obtenir_explicateur(model, metadonnees, pretraitement) is None:
+        st.info("Les explications sont disponibles pour les modèles à arbres (Gradient Boosting, arbre de décision).")
+        return
+
+    chemin = chemin_explications(empreinte_artefact(metadonnees["fichier"]), empreinte("brutes"))
+    if not os.path.exists(chemin):
+        st.info("Les attributions de ce modèle n'ont pas encore été calculées sur ce jeu de données.")
+        if not st.button("Calculer les attributions"):
+            return
+        try:
+            with st.spinner("Calcul des attributions..."), mesurer("prediction.explications_precalcul"):
+                precalculer(model, metadonnees, charger_donnees_brutes(), chemin, pretraitement)
+        except ValueError as erreur:  # Attributions non additives : rien n'est enregistré
+            st.error(str(erreur))
+            return
+
+    magasin = gestionnaire.obtenir(("explications", chemin, os.path.getmtime(chemin)),
+                                   lambda: MagasinExplications(chemin), "explications")
+    st.caption(f"{len(magasin.attributions)} étudiants, {LIBELLES_METHODES.get(magasin.methode, magasin.methode)}.")
+    st.image(figure_png((chemin, "importance"), tracer_attributions(
+        magasin.importance, "Importance globale des variables", "Moyenne des contributions en valeur absolue")),
+        use_container_width=True)
+
+    lignes = magasin.attributions.index
+    ligne = st.number_input("Ligne du jeu de données (étudiant)", min_value=int(lignes.min()),
+                            max_value=int(lignes.max()), value=int(lignes.min()))
+    if ligne not in lignes:
+        st.warning("Cet étudiant n'a pas pu être encodé (catégorie inconnue ou valeur manquante).")
+        return
+    col1, col2 = st.columns(2)
+    col1.metric("Score de base", f"{magasin.base:.2f}")
+    col2.metric("Score prédit", f"{magasin.attributions.at[ligne, 'prediction']:.2f}")
+    st.image(figure_png((chemin, "etudiant", ligne), tracer_attributions(
+        magasin.etudiant(ligne), f"Contributions des variables pour l'étudiant n° {ligne}")),
+        use_container_width=True)
+
+# Scoring par lot d'un fichier (téléversé ou chemin local) avec le modèle chargé
+def page_prediction_lot(model, metadonnees, pretraitement):
+    st.subheader("Scoring d'une cohorte d'étudiants")
+
+    fichier = st.file_uploader("Fichier CSV ou Parquet à scorer", type=["csv", "parquet"])
+    chemin = st.text_input("... ou chemin d'un fichier local sur le serveur")
+    budget_mo = st.number_input("Budget mémoire par morceau (Mo)", min_value=1, max_value=4096,
+                                value=BUDGET_MEMOIRE_DEFAUT // 1024 ** 2)
+    format_sortie = st.selectbox("Format du fichier de résultats", ["csv", "parquet"])
+
+    if st.button("Lancer le scoring"):
+        if fichier is None and not chemin:
+            st.warning("Téléversez un fichier ou indiquez un chemin local.")
+            return
+        if fichier is None and not os.path.exists(chemin):
+            st.error(f"Le fichier '{chemin}' est introuvable.")
+            return
+
+        source = fichier if fichier is not None else chemin
+        descripteur, destination = tempfile.mkstemp(suffix=f".{format_sortie}", prefix="scores_")
+        os.close(descripteur)
+
+        barre = st.progress(0.0, text="Scoring en cours...")
+        try:
+            with mesurer("prediction.scoring_lot"):
+                stats = scorer_fichier(model, source, destination, budget_mo * 1024 ** 2,
+                                       progression=lambda lignes: barre.progress(1.0, text=f"{lignes} lignes scorées"),
+                                       metadonnees=metadonnees, pretraitement=pretraitement)
+        except ValueError as e:
+            os.remove(destination)
+            st.error(f"Fichier invalide : {e}")
+            return
+        except BaseException:
+            os.remove(destination)
+            raise
+        # Un seul fichier de résultats par session : celui du scoring précédent est supprimé
+        precedent = st.session_state.get("resultat_lot")
+        if precedent is not None and os.path.exists(precedent["chemin"]):
+            os.remove(precedent["chemin"])
+        st.session_state["resultat_lot"] = {"stats": stats, "chemin": destination, "format": format_sortie}
+
+    # Le résultat du dernier scoring reste disponible entre les reruns (téléchargement)
+    resultat = st.session_state.get("resultat_lot")
+    if resultat is not None and os.path.exists(resultat["chemin"]):
+        stats = resultat["stats"]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Lignes scorées", stats["lignes"])
+        col2.metric("Lignes invalides", stats["lignes_invalides"])
+        col3.metric("Débit (lignes/s)", f"{stats['lignes_par_seconde']:,.0f}")
+        with open(resultat["chemin"], "rb") as f:
+            st.download_button(
+                label="Télécharger les scores",
+                data=f,
+                file_name=f"scores.{resultat['format']}",
+                mime="text/csv" if resultat["format"] == "csv" else "application/octet-stream"
+            )
 
 # Fonction de prédiction
 def page_prediction():
     st.title("Page de Prédiction des Performances Étudiantes")
 
-    # Vérifier si le modèle existe
-    model_filename = "Gradient Boosting Regressor.joblib"
-    if not os.path.exists(model_filename):
-        st.error(f"Le modèle n'a pas été trouvé. Vérifiez que le fichier '{model_filename}' existe dans le répertoire.")
+    # Modèles disponibles dans le registre (seules les métadonnées sont lues)
+    registre = obtenir_registre()
+    index = registre.indexer()
+    if not index:
+        st.error("Aucun modèle n'a été trouvé. Vérifiez que les fichiers .joblib existent dans le répertoire.")
         return
 
-    # Charger le modèle Gradient Boosting enregistré
-    model = joblib.load(model_filename)
+    noms = list(index)
+    defaut = noms.index("Gradient Boosting Regressor") if "Gradient Boosting Regressor" in noms else 0
+    model_name = st.selectbox("Modèle", noms, index=defaut)
+    metadonnees = index[model_name]
+
+    # Le modèle est chargé depuis le disque une seule fois, puis servi par le gestionnaire de ressources partagé
+    with mesurer("prediction.chargement_modele"):
+        model = registre.charger(model_name, metadonnees)
+        pretraitement = registre.charger_pretraitement(model_name, metadonnees)
+
+    # Choix du mode : un étudiant saisi à la main ou une cohorte complète depuis un fichier
+    mode = st.radio("Mode de prédiction", ["Étudiant unique", "Simulation (what-if)", "Lot (fichier)", "Explications"],
+                    horizontal=True)
+    if mode == "Lot (fichier)":
+        page_prediction_lot(model, metadonnees, pretraitement)
+        return
+    if mode == "Explications":
+        page_explications(model, metadonnees, pretraitement)
+        return
     
     # Définir les champs d'entrée pour les variables prédictives
     st.subheader("Entrez les informations de l'étudiant")
     
-    # Variables d'entrée pour les prédicteurs
-    hours_studied = st.number_input("Heures étudiées", min_value=0, max_value=100, value=50)
-    attendance = st.number_input("Assiduité (en %)", min_value=0, max_value=100, value=80)
-    parental_involvement = st.number_input("Implication des parents (en %)", min_value=0, max_value=100, value=70)
-    access_to_resources = st.number_input("Accès aux ressources (en %)", min_value=0, max_value=100, value=80)
-    extracurricular_activities = st.number_input("Activités extra-scolaires (en %)", min_value=0, max_value=100, value=60)
-    sleep_hours = st.number_input("Heures de sommeil par nuit", min_value=0, max_value=24, value=8)
-    previous_scores = st.number_input("Scores précédents", min_value=0, max_value=100, value=75)
-    motivation_level = st.number_input("Niveau de motivation (1 à 10)", min_value=1, max_value=10, value=7)
-    internet_access = st.number_input("Accès à Internet (en %)", min_value=0, max_value=100, value=90)
-    tutoring_sessions = st.number_input("Sessions de tutorat", min_value=0, max_value=10, value=2)
-    family_income = st.number_input("Revenu familial (en $)", min_value=0, max_value=200000, value=50000)
-    teacher_quality = st.number_input("Qualité de l'enseignant (1 à 10)", min_value=1, max_value=10, value=8)
-    school_type = st.selectbox("Type d'école", ['Public', 'Privé'])
-    peer_influence = st.number_input("Influence des pairs (1 à 10)", min_value=1, max_value=10, value=6)
-    physical_activity = st.number_input("Activité physique (en %)", min_value=0, max_value=100, value=50)
-    learning_disabilities = st.selectbox("Troubles d'apprentissage", ['Non', 'Oui'])
-    parental_education_level = st.selectbox("Niveau d'éducation des parents", ['Aucun', 'Secondaire', 'Université', 'Autre'])
-    distance_from_home = st.number_input("Distance domicile-école (en km)", min_value=0, max_value=100, value=5)
-    gender = st.selectbox("Genre", ['Masculin', 'Féminin'])
+    # Variables d'entrée pour les prédicteurs (domaines du jeu de données, catégories d'origine)
+    hours_studied = champ_numerique("Heures d'étude par semaine", "Hours_Studied", 20)
+    attendance = champ_numerique("Assiduité (en %)", "Attendance", 80)
+    parental_involvement = choix_categorie("Implication des parents", "Parental_Involvement", pretraitement, 1)
+    access_to_resources = choix_categorie("Accès aux ressources", "Access_to_Resources", pretraitement, 1)
+    extracurricular_activities = choix_categorie("Activités extra-scolaires", "Extracurricular_Activities", pretraitement, 1)
+    sleep_hours = champ_numerique("Heures de sommeil par nuit", "Sleep_Hours", 7)
+    previous_scores = champ_numerique("Scores précédents", "Previous_Scores", 75)
+    motivation_level = choix_categorie("Niveau de motivation", "Motivation_Level", pretraitement, 1)
+    internet_access = choix_categorie("Accès à Internet", "Internet_Access", pretraitement, 1)
+    tutoring_sessions = champ_numerique("Sessions de tutorat par mois", "Tutoring_Sessions", 1)
+    family_income = choix_categorie("Revenu familial", "Family_Income", pretraitement, 1)
+    teacher_quality = choix_categorie("Qualité de l'enseignant", "Teacher_Quality", pretraitement, 1)
+    school_type = choix_categorie("Type d'école", "School_Type", pretraitement)
+    peer_influence = choix_categorie("Influence des pairs", "Peer_Influence", pretraitement, 1)
+    physical_activity = champ_numerique("Activité physique (heures par semaine)", "Physical_Activity", 3)
+    learning_disabilities = choix_categorie("Troubles d'apprentissage", "Learning_Disabilities", pretraitement)
+    parental_education_level = choix_categorie("Niveau d'éducation des parents", "Parental_Education_Level", pretraitement)
+    distance_from_home = choix_categorie("Distance domicile-école", "Distance_from_Home", pretraitement)
+    gender = choix_categorie("Genre", "Gender", pretraitement)
     
     # Collecte des entrées utilisateur dans un dictionnaire
     input_data = {
@@ -70,17 +300,28 @@ def page_prediction():
     # Convertir les entrées dans un DataFrame pour la prédiction
     input_df = pd.DataFrame([input_data])
 
-    # Encodage des variables catégorielles
-    le = LabelEncoder()
-    input_df['School_Type'] = le.fit_transform(input_df['School_Type'])
-    input_df['Learning_Disabilities'] = le.fit_transform(input_df['Learning_Disabilities'])
-    input_df['Parental_Education_Level'] = le.fit_transform(input_df['Parental_Education_Level'])
-    input_df['Gender'] = le.fit_transform(input_df['Gender'])
+    # Encodage par les tables de correspondance enregistrées avec le modèle (aucun réajustement)
+    with mesurer("prediction.encodage"):
+        X_codes, _ = pretraitement.encoder(input_df)
+
+    if mode == "Simulation (what-if)":
+        page_simulation(model, metadonnees, pretraitement, X_codes)
+        return
     
     # Si l'utilisateur appuie sur le bouton "Prédire"
     if st.button("Prédire"):
-        # Faire la prédiction avec le modèle
-        prediction = model.predict(input_df)
+        # Faire la prédiction avec le modèle (une saisie déjà prédite est servie depuis la mémoire)
+        with mesurer("prediction.prediction"):
+            prediction = predire_memoise(model, metadonnees, pretraitement, X_codes)
         
         # Afficher la prédiction
-        st.subheader(f"Le score prédit pour cet étudiant est : {prediction[0]:.2f}")
+        st.subheader(f"Le score prédit pour cet étudiant est : {prediction:.2f}")
+
+        # Contributions des variables à cette prédiction (modèles à arbres), calculées sur la seule saisie
+        explicateur = obtenir_explicateur(model, metadonnees, pretraitement)
+        if explicateur is not None:
+            with mesurer("prediction.explication"):
+                attributions, base = explicateur.expliquer_ligne(X_codes)
+            st.caption(f"Score de base : {base:.2f}. Contributions des variables à l'écart avec ce score :")
+            st.image(figure_png((cle_artefact(metadonnees), X_codes[0].tobytes(), "attributions"), tracer_attributions(
+                attributions, "Contributions des variables pour cet étudiant")), use_container_width=True)
@@ -0,0 +1,155 @@
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+# Codes des variables catégorielles (mêmes codes que les colonnes *_Encoded de data_clean.csv)
+CODES_CATEGORIES = {
+    "Parental_Involvement": {"Low": 1, "Medium": 2, "High": 3},
+    "Access_to_Resources": {"Low": 1, "Medium": 2, "High": 3},
+    "Extracurricular_Activities": {"No": 0, "Yes": 1},
+    "Motivation_Level": {"Low": 1, "Medium": 2, "High": 3},
+    "Internet_Access": {"No": 0, "Yes": 1},
+    "Family_Income": {"Low": 1, "Medium": 2, "High": 3},
+    "Teacher_Quality": {"Low": 1, "Medium": 2, "High": 3},
+    "School_Type": {"Public": 0, "Private": 1},
+    "Peer_Influence": {"Negative": 1, "Neutral": 2, "Positive": 3},
+    "Learning_Disabilities": {"No": 0, "Yes": 1},
+    "Parental_Education_Level": {"High School": 1, "College": 2, "Postgraduate": 3},
+    "Distance_from_Home": {"Near": 1, "Moderate": 2, "Far": 3},
+    "Gender": {"Male": 0, "Female": 1},
+}
+
+# Colonnes d'origine de StudentPerformanceFactors.csv utilisées comme variables explicatives
+COLONNES_BRUTES = [
+    "Hours_Studied", "Attendance", "Parental_Involvement", "Access_to_Resources",
+    "Extracurricular_Activities", "Sleep_Hours", "Previous_Scores", "Motivation_Level",
+    "Internet_Access", "Tutoring_Sessions", "Family_Income", "Teacher_Quality", "School_Type",
+    "Peer_Influence", "Physical_Activity", "Learning_Disabilities", "Parental_Education_Level",
+    "Distance_from_Home", "Gender"
+]
+
+# Domaines des variables numériques (bornes incluses) observés dans le jeu d'origine : données
+# synthétiques des benchmarks et étudiants tirés au hasard par le générateur de charge
+BORNES = {"Hours_Studied": (1, 44), "Attendance": (60, 100), "Sleep_Hours": (4, 10),
+          "Previous_Scores": (50, 100), "Tutoring_Sessions": (0, 8), "Physical_Activity": (0, 6)}
+
+# Valeurs acceptées à la saisie (champs de la page de prédiction, balayages de la simulation) :
+# plus larges que les domaines observés, un profil atypique reste saisissable
+BORNES_SAISIE = {"Hours_Studied": (0, 60), "Attendance": (0, 100), "Sleep_Hours": (0, 24),
+                 "Previous_Scores": (0, 100), "Tutoring_Sessions": (0, 10), "Physical_Activity": (0, 10)}
+
+# Formats d'entrée attendus par les artefacts de modèles :
+#   "brut"        : colonnes d'origine, catégories en texte (pipeline avec son propre prétraitement)
+#   "codes"       : colonnes d'origine, catégories remplacées par leur code
+#   "standardise" : variables *_Encoded de modelisation.features, standardisées
+FORMATS_ENTREE = ("brut", "codes", "standardise")
+
+SUFFIXE_ENCODE = "_Encoded"
+
+LIGNES_BLOC_STANDARDISATION = 65_536
+
+
+# Nom de la colonne d'origine d'une variable d'entraînement (Gender_Encoded -> Gender)
+def colonne_source(feature):
+    return feature[:-len(SUFFIXE_ENCODE)] if feature.endswith(SUFFIXE_ENCODE) else feature
+
+
+# Matrice "codes" (colonnes COLONNES_BRUTES) à partir des données nettoyées (colonnes *_Encoded)
+def codes_depuis_nettoyees(donnees):
+    renommage = {colonne: colonne_source(colonne) for colonne in donnees.columns}
+    return donnees.rename(columns=renommage)[COLONNES_BRUTES].to_numpy(dtype=np.float64)
+
+
+# Prétraitement ajusté une fois à l'entraînement puis enregistré avec le modèle :
+# tables de correspondance catégorie -> code et statistiques du StandardScaler.
+# Le même objet sert à l'entraînement, à la prédiction interactive et au scoring par lot ;
+# rien n'est réajusté au moment de la prédiction.
+class Pretraitement:
+    def __init__(self, codes=None, features=None, moyennes=None, echelles=None):
+        self.codes = {colonne: dict(table) for colonne, table in (codes or CODES_CATEGORIES).items()}
+        self.features = None if features is None else list(features)
+        self.moyennes = None if moyennes is None else np.asarray(moyennes, dtype=np.float64)
+        self.echelles = None if echelles is None else np.asarray(echelles, dtype=np.float64)
+        self._construire_tables()
+
+    # Tableaux de correspondance précalculés : position de la catégorie -> code, code -> libellé
+    def _construire_tables(self):
+        self._categories = {colonne: pd.Index(list(table)) for colonne, table in self.codes.items()}
+        self._codes = {colonne: np.append(np.fromiter(table.values(), dtype=np.float64), np.nan)
+                       for colonne, table in self.codes.items()}
+        self._libelles = {colonne: pd.Series(list(table), index=list(table.values()))
+                          for colonne, table in self.codes.items()}
+        if self.features is not None:
+            self._indices = np.array([COLONNES_BRUTES.index(colonne_source(f)) for f in self.features])
+
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self._construire_tables()
+
+    def __getstate__(self):
+        return {cle: valeur for cle, valeur in self.__dict__.items() if not cle.startswith("_")}
+
+    # Ajustement des statistiques de standardisation sur les variables d'entraînement (colonnes *_Encoded)
+    def ajuster(self, X_entrainement):
+        scaler = StandardScaler().fit(X_entrainement)
+        self.features = list(X_entrainement.columns)
+        self.moyennes = scaler.mean_
+        self.echelles = scaler.scale_
+        self._construire_tables()
+        return self
+
+    # Encodage vectorisé de données brutes : chaque colonne est traitée en une opération.
+    # Retourne la matrice "codes" (float64, ordre COLONNES_BRUTES) et le masque des lignes valides
+    def encoder(self, donnees):
+        manquantes = [colonne for colonne in COLONNES_BRUTES if colonne not in donnees.columns]
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+
+        X = np.empty((len(donnees), len(COLONNES_BRUTES)), dtype=np.float64)
+        for j, colonne in enumerate(COLONNES_BRUTES):
+            valeurs = donnees[colonne]
+            if colonne in self.codes:
+                # Position de la catégorie dans la table ; une catégorie inconnue (-1) pointe sur le NaN final
+                positions = self._categories[colonne].get_indexer(valeurs.astype("string").str.strip())
+                X[:, j] = self._codes[colonne][positions]
+            else:
+                X[:, j] = pd.to_numeric(valeurs, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+        valides = ~np.isnan(X).any(axis=1)
+        return X, valides
+
+    # Standardisation d'une matrice "codes" dans l'ordre des variables d'entraînement. Le calcul est
+    # toujours fait en float64 ; avec dtype=np.float32, il est fait par blocs de lignes écrits dans
+    # la matrice float32 (sans copie float64 complète), et les valeurs sont exactement celles du
+    # calcul float64 converti en float32.
+    def standardiser(self, X_codes, dtype=np.float64):
+        if self.features is None:
+            raise ValueError("Le prétraitement n'a pas été ajusté (statistiques de standardisation absentes)")
+        if dtype == np.float64:
+            return (X_codes[:, self._indices] - self.moyennes) / self.echelles
+
+        X = np.empty((len(X_codes), len(self._indices)), dtype=dtype)
+        for debut in range(0, len(X), LIGNES_BLOC_STANDARDISATION):
+            bloc = X_codes[debut:debut + LIGNES_BLOC_STANDARDISATION, self._indices]
+            X[debut:debut + LIGNES_BLOC_STANDARDISATION] = (bloc - self.moyennes) / self.echelles
+        return X
+
+    # Conversion d'une matrice "codes" vers le format d'entrée attendu par un artefact
+    def pour_modele(self, X_codes, metadonnees):
+        format_entree = metadonnees["format_entree"]
+        if format_entree == "standardise":
+            return self.standardiser(X_codes)
+
+        donnees = pd.DataFrame(X_codes, columns=COLONNES_BRUTES)
+        if format_entree == "brut":
+            for colonne, libelles in self._libelles.items():
+                donnees[colonne] = donnees[colonne].map(libelles)
+        return donnees[metadonnees["features"]]
+
+    def sauvegarder(self, chemin):
+        joblib.dump(self, chemin)
+
+    @staticmethod
+    def charger(chemin):
+        return joblib.load(chemin)
@@ -0,0 +1,312 @@
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import r2_score
+
+from moteur_entrainement import NB_PROCESSUS_DEFAUT, pool_partage, tableau_partage
+
+# Recherche d'hyperparamètres sous budget, par Hyperband : chaque tour est une réduction
+# successive (successive halving) où de nombreuses configurations tirées au hasard sont
+# évaluées à basse fidélité, puis seul le meilleur tiers est promu au niveau suivant.
+#   - fidélité : nombre de lignes d'ajustement, ou nombre d'arbres pour les forêts et le
+#     boosting, qui sont agrandis par warm_start d'un niveau à l'autre sans tout réentraîner ;
+#   - arrêt anticipé : une configuration à arbres qui ne progresse plus d'un niveau à l'autre
+#     (ou dont le boosting culmine avant son dernier arbre) n'est plus promue ;
+#   - budget : temps écoulé et temps CPU (processus de travail compris), vérifiés entre les
+#     évaluations ; les évaluations non commencées sont annulées dès qu'il est épuisé. Une évaluation
+#     commencée n'est pas interrompue (un ajustement sklearn ne peut pas l'être) : la recherche
+#     rend la main quand elle se termine, et le budget est dépassé au plus de la durée d'une
+#     évaluation par processus de travail.
+# Les configurations sont notées par le R² sur une partie de validation fixe de l'ensemble
+# d'entraînement, jamais sur l'ensemble de test.
+
+ETA = 3                     # Facteur de réduction entre deux niveaux
+PART_VALIDATION = 0.2
+LIGNES_MIN = 200            # Plus petite fidélité en lignes
+ARBRES_MIN, ARBRES_MAX = 10, 270
+TOLERANCE_ARRET = 1e-3      # Progression minimale du R² entre deux niveaux (modèles à arbres)
+BUDGET_SECONDES_DEFAUT = 60
+
+
+# Lois de tirage des hyperparamètres
+def log_uniforme(a, b):
+    return lambda alea: float(np.exp(alea.uniform(np.log(a), np.log(b))))
+
+
+def uniforme(a, b):
+    return lambda alea: float(alea.uniform(a, b))
+
+
+def entier(a, b):
+    return lambda alea: int(alea.integers(a, b + 1))
+
+
+def choix(*valeurs):
+    return lambda alea: valeurs[int(alea.integers(len(valeurs)))]
+
+
+# Espaces de recherche, par nom de modèle de la page de modélisation
+ESPACES_RECHERCHE = {
+    "Régression Ridge": {"alpha": log_uniforme(1e-3, 1e3)},
+    "Régression Lasso": {"alpha": log_uniforme(1e-4, 10)},
+    "Régression ElasticNet": {"alpha": log_uniforme(1e-4, 10), "l1_ratio": uniforme(0.05, 0.95)},
+    "Random Forest Regressor": {
+        "max_depth": choix(None, 5, 10, 20),
+        "min_samples_leaf": choix(1, 2, 5, 10),
+        "max_features": choix(1.0, 0.5, "sqrt"),
+    },
+    "Gradient Boosting Regressor": {
+        "learning_rate": log_uniforme(0.01, 0.3),
+        "max_depth": entier(2, 5),
+        "subsample": choix(0.6, 0.8, 1.0),
+        "min_samples_leaf": choix(1, 5, 20),
+    },
+    "K-Nearest Neighbors (KNN)": {
+        "n_neighbors": entier(1, 50),
+        "weights": choix("uniform", "distance"),
+        "p": choix(1, 2),
+    },
+    "KNN (index persistant)": {
+        "n_neighbors": entier(1, 50),
+        "weights": choix("uniform", "distance"),
+        "p": choix(1, 2),
+    },
+    "Support Vector Regressor (SVR)": {
+        "C": log_uniforme(0.1, 100),
+        "epsilon": log_uniforme(0.01, 1),
+        "gamma": choix("scale", 0.01, 0.05, 0.1),
+    },
+    "SVR approché (Nystroem)": {
+        "svr__C": log_uniforme(0.1, 100),
+        "svr__epsilon": log_uniforme(0.01, 1),
+        "nystroem__gamma": choix(None, 0.01, 0.05, 0.1),
+    },
+    "Decision Tree Regressor": {
+        "max_depth": choix(None, 3, 5, 8, 12, 20),
+        "min_samples_leaf": entier(1, 50),
+    },
+}
+
+
+# Résultat d'une recherche : le classement de toutes les évaluations et, par modèle,
+# la meilleure configuration sous forme d'estimateur non entraîné
+class ResultatRecherche:
+    def __init__(self, classement, meilleurs, budget_epuise):
+        self.classement = classement
+        self.meilleurs = meilleurs
+        self.budget_epuise = budget_epuise
+
+
+# Budget global : temps écoulé et temps CPU (processus courant et processus de travail)
+class BudgetRecherche:
+    def __init__(self, secondes, secondes_cpu=None):
+        self.secondes = secondes
+        self.secondes_cpu = secondes_cpu
+        self.debut = time.monotonic()
+        self.debut_cpu = time.process_time()
+        self.cpu_travail = 0.0
+
+    @property
+    def ecoule(self):
+        return time.monotonic() - self.debut
+
+    @property
+    def cpu(self):
+        return time.process_time() - self.debut_cpu + self.cpu_travail
+
+    def restant(self):
+        return max(0.0, self.secondes - self.ecoule)
+
+    def epuise(self):
+        return self.ecoule >= self.secondes or (self.secondes_cpu is not None and self.cpu >= self.secondes_cpu)
+
+
+# Modèle dont la fidélité est son nombre d'arbres (forêts, boosting)
+def par_arbres(modele):
+    parametres = modele.get_params()
+    return "n_estimators" in parametres and "warm_start" in parametres
+
+
+# Niveaux de fidélité croissants, dans un rapport ETA
+def niveaux_ressource(modele, nb_lignes):
+    if par_arbres(modele):
+        niveaux = [ARBRES_MIN]
+        while niveaux[-1] * ETA <= ARBRES_MAX:
+            niveaux.append(niveaux[-1] * ETA)
+        return niveaux
+    niveaux = [nb_lignes]
+    while niveaux[0] // ETA >= LIGNES_MIN:
+        niveaux.insert(0, niveaux[0] // ETA)
+    return niveaux
+
+
+# Découpage fixe ajustement / validation de l'ensemble d'entraînement
+def decoupage_validation(nb_lignes, graine):
+    ordre = np.random.default_rng(graine).permutation(nb_lignes)
+    nb_validation = max(1, int(nb_lignes * PART_VALIDATION))
+    return ordre[nb_validation:], ordre[:nb_validation]
+
+
+# Évaluation d'une configuration à une fidélité donnée. Pour un modèle à arbres, l'estimateur
+# reçu est agrandi par warm_start puis renvoyé, pour être repris au niveau suivant ; pour le
+# boosting, le meilleur nombre d'arbres est lu sur les prédictions successives (staged_predict).
+def evaluer_configuration(modele, ressource, X, y, graine=0):
+    debut, debut_cpu = time.perf_counter(), time.process_time()
+    ajustement, validation = decoupage_validation(len(y), graine)
+    arbres = None
+    if par_arbres(modele):
+        modele.set_params(n_estimators=ressource, warm_start=True)
+        modele.fit(X[ajustement], y[ajustement])
+        if hasattr(modele, "staged_predict"):
+            scores = [r2_score(y[validation], y_pred) for y_pred in modele.staged_predict(X[validation])]
+            arbres = int(np.argmax(scores)) + 1
+            score = scores[arbres - 1]
+        else:
+            arbres = ressource
+            score = r2_score(y[validation], modele.predict(X[validation]))
+    else:
+        lignes = ajustement[:ressource]
+        modele.fit(X[lignes], y[lignes])
+        score = r2_score(y[validation], modele.predict(X[validation]))
+        modele = None  # Rien à reprendre au niveau suivant : le modèle n'est pas renvoyé
+    return float(score), modele, arbres, time.perf_counter() - debut, time.process_time() - debut_cpu
+
+
+# Unité de travail dans un processus du pool : les tableaux sont mappés en mémoire
+def _unite_recherche(modele, ressource, graine):
+    return evaluer_configuration(modele, ressource, tableau_partage("X_train"), tableau_partage("y_train"), graine)
+
+
+# Évaluation d'un niveau : (clé, résultat) au fil de l'eau, jusqu'à épuisement du budget.
+# Les unités encore en file sont alors annulées ; celles déjà confiées à un processus vont à leur
+# terme, et la sortie du pool (fin de rechercher) les attend.
+def _executer_niveau(unites, pool, budget, X, y, graine):
+    if pool is None:
+        for cle, (modele, ressource) in unites.items():
+            if budget.epuise():
+                return
+            yield cle, evaluer_configuration(modele, ressource, X, y, graine)
+        return
+
+    taches = {pool.submit(_unite_recherche, modele, ressource, graine): cle
+              for cle, (modele, ressource) in unites.items()}
+    restantes = set(taches)
+    try:
+        while restantes:
+            terminees, restantes = wait(restantes, timeout=budget.restant(), return_when=FIRST_COMPLETED)
+            for tache in terminees:
+                resultat = tache.result()
+                budget.cpu_travail += resultat[4]
+                yield taches[tache], resultat
+            if not terminees or budget.epuise():
+                return
+    finally:
+        for tache in restantes:
+            tache.cancel()
+
+
+# Configuration (paramètres tirés) sous forme lisible, pour le classement
+def _decrire(parametres):
+    return ", ".join(f"{nom}={valeur:.4g}" if isinstance(valeur, float) else f"{nom}={valeur}"
+                     for nom, valeur in parametres.items())
+
+
+# Recherche Hyperband sur plusieurs modèles. À chaque tour, les réductions successives de tous
+# les modèles avancent ensemble, niveau par niveau, pour occuper tout le pool de processus ;
+# le premier tour est le plus exploratoire (le plus de configurations, la plus basse fidélité).
+def rechercher(modeles, X_train, y_train, budget_secondes=BUDGET_SECONDES_DEFAUT, budget_cpu=None,
+               nb_processus=NB_PROCESSUS_DEFAUT, graine=0, progression=None):
+    X_train = np.ascontiguousarray(X_train)
+    y_train = np.asarray(y_train, dtype=float)
+    budget = BudgetRecherche(budget_secondes, budget_cpu)
+    alea = np.random.default_rng(graine)
+    nb_lignes = len(decoupage_validation(len(y_train), graine)[0])
+    niveaux = {nom: niveaux_ressource(modele, nb_lignes) for nom, modele in modeles.items()}
+    nb_tours = max(len(n) for n in niveaux.values())
+
+    lignes_classement = []
+    meilleurs = {}  # nom -> (niveau atteint, score, paramètres, arbres)
+
+    # Un seul processus : évaluation directe, sans pool
+    contexte = pool_partage({"X_train": X_train, "y_train": y_train}, nb_processus) if nb_processus > 1 else nullcontext()
+    with contexte as pool:
+        for tour in range(nb_tours):
+            # Tour t : réduction successive depuis le niveau t (fidélité plus haute, moins de configurations)
+            etats = {}
+            for nom, modele in modeles.items():
+                s = len(niveaux[nom]) - 1 - tour
+                if s < 0:
+                    continue
+                nb_configurations = math.ceil((len(niveaux[nom]) / (s + 1)) * ETA ** s)
+                espace = ESPACES_RECHERCHE.get(nom, {})
+                configurations = []
+                for _ in range(nb_configurations if espace else 1):
+                    parametres = {parametre: loi(alea) for parametre, loi in espace.items()}
+                    configurations.append({"parametres": parametres, "modele": clone(modele).set_params(**parametres),
+                                           "score": None, "arret": False})
+                etats[nom] = {"configurations": configurations, "niveau": tour}
+
+            while etats and not budget.epuise():
+                # Unités entrelacées entre modèles : un budget court profite à tous les modèles
+                unites = {}
+                for i in range(max(len(etat["configurations"]) for etat in etats.values())):
+                    for nom, etat in etats.items():
+                        if i < len(etat["configurations"]):
+                            unites[(nom, i)] = (etat["configurations"][i]["modele"], niveaux[nom][etat["niveau"]])
+
+                for (nom, i), (score, modele, arbres, secondes, _) in _executer_niveau(
+                        unites, pool, budget, X_train, y_train, graine):
+                    etat = etats[nom]
+                    configuration = etat["configurations"][i]
+                    precedent = configuration["score"]
+                    configuration["score"], configuration["arbres"] = score, arbres
+                    if modele is not None:
+                        configuration["modele"] = modele
+                        # Arrêt anticipé : plus de progression, ou boosting déjà à son optimum
+                        configuration["arret"] = ((precedent is not None and score - precedent < TOLERANCE_ARRET)
+                                                  or arbres < niveaux[nom][etat["niveau"]])
+                    ligne = {"Modèle": nom, "Tour": tour + 1, "Configuration": _decrire(configuration["parametres"]),
+                             "Ressource": niveaux[nom][etat["niveau"]], "Arbres retenus": arbres,
+                             "R² validation": score, "Durée (s)": secondes}
+                    lignes_classement.append(ligne)
+                    meilleur = meilleurs.get(nom)
+                    if meilleur is None or (etat["niveau"], score) > meilleur[:2]:
+                        meilleurs[nom] = (etat["niveau"], score, configuration["parametres"], arbres)
+                    if progression is not None:
+                        progression(budget.ecoule / budget_secondes, len(lignes_classement))
+
+                # Promotion du meilleur tiers des configurations évaluées, hors arrêts anticipés
+                for nom in list(etats):
+                    etat = etats[nom]
+                    evaluees = [c for c in etat["configurations"] if c["score"] is not None]
+                    etat["niveau"] += 1
+                    if etat["niveau"] >= len(niveaux[nom]):
+                        del etats[nom]
+                        continue
+                    evaluees.sort(key=lambda c: c["score"], reverse=True)
+                    promues = [c for c in evaluees[:max(1, len(evaluees) // ETA)] if not c["arret"]]
+                    if promues:
+                        etat["configurations"] = promues
+                    else:
+                        del etats[nom]
+            if budget.epuise():
+                break
+
+    # Meilleure configuration de chaque modèle, à la plus haute fidélité atteinte
+    configures = {}
+    for nom, (_, _, parametres, arbres) in meilleurs.items():
+        modele = clone(modeles[nom]).set_params(**parametres)
+        if arbres is not None:
+            modele.set_params(n_estimators=arbres, warm_start=False)
+        configures[nom] = modele
+
+    classement = pd.DataFrame(lignes_classement)
+    if not classement.empty:
+        classement = classement.sort_values(by=["Modèle", "Ressource", "R² validation"],
+                                            ascending=[True, False, False], ignore_index=True)
+    return ResultatRecherche(classement, configures, budget.epuise())
@@ -0,0 +1,142 @@
+import glob
+import json
+import os
+import threading
+
+import joblib
+import streamlit as st
+
+from pretraitement import COLONNES_BRUTES, Pretraitement
+from ressources import gestionnaire
+
+SUFFIXE_METADONNEES = ".meta.json"
+SUFFIXE_PRETRAITEMENT = ".pretraitement.joblib"
+
+# Métadonnées des artefacts livrés avec le dépôt (entraînés dans le notebook, sans fichier associé)
+ARTEFACTS_FOURNIS = {
+    "Gradient Boosting Regressor.joblib": {"format_entree": "codes", "features": COLONNES_BRUTES},
+    "Decision Tree Regressor_model.joblib": {"format_entree": "brut", "features": COLONNES_BRUTES},
+}
+
+
+def chemin_metadonnees(chemin_artefact):
+    return chemin_artefact + SUFFIXE_METADONNEES
+
+
+# Métadonnées enregistrées avec un artefact (dictionnaire vide s'il n'y en a pas)
+def lire_metadonnees(chemin_artefact):
+    if not os.path.exists(chemin_metadonnees(chemin_artefact)):
+        return {}
+    with open(chemin_metadonnees(chemin_artefact), "r") as f:
+        return json.load(f)
+
+
+# Écriture des métadonnées d'un artefact (appelée à l'enregistrement d'un modèle) ;
+# le prétraitement ajusté à l'entraînement est enregistré à côté de l'artefact. La clé d'entraînement
+# (celle du cache des modèles) identifie le contenu de l'artefact : un modèle identique n'est pas réécrit.
+def ecrire_metadonnees(chemin_artefact, format_entree, features, pretraitement=None, metriques=None,
+                       empreinte_donnees=None, cle_entrainement=None):
+    fichier_pretraitement = None
+    if pretraitement is not None:
+        fichier_pretraitement = chemin_artefact + SUFFIXE_PRETRAITEMENT
+        pretraitement.sauvegarder(fichier_pretraitement)
+
+    metadonnees = {
+        "format_entree": format_entree,
+        "features": list(features),
+        "pretraitement": fichier_pretraitement,
+        "metriques": None if metriques is None else {k: float(v) for k, v in metriques.items()},
+        "empreinte_donnees": empreinte_donnees,
+        "cle_entrainement": cle_entrainement,
+    }
+    with open(chemin_metadonnees(chemin_artefact), "w") as f:
+        json.dump(metadonnees, f, indent=4)
+
+
+# Enregistrement d'un modèle entraîné et de ses métadonnées, sauf s'il est déjà enregistré avec la même
+# clé d'entraînement. Retourne True si l'artefact a été écrit.
+def enregistrer_artefact(modele, chemin_artefact, format_entree, features, pretraitement=None, metriques=None,
+                         empreinte_donnees=None, cle_entrainement=None):
+    if cle_entrainement is not None and os.path.exists(chemin_artefact) \
+            and lire_metadonnees(chemin_artefact).get("cle_entrainement") == cle_entrainement:
+        return False
+    os.makedirs(os.path.dirname(chemin_artefact) or ".", exist_ok=True)
+    joblib.dump(modele, chemin_artefact)
+    ecrire_metadonnees(chemin_artefact, format_entree, features, pretraitement=pretraitement, metriques=metriques,
+                       empreinte_donnees=empreinte_donnees, cle_entrainement=cle_entrainement)
+    return True
+
+
+# Registre des artefacts de modèles : indexation par métadonnées et chargement paresseux.
+# Les estimateurs et prétraitements désérialisés sont gardés par le gestionnaire de ressources
+# du processus (catégories "modeles" et "pretraitements"), partagés par toutes les sessions.
+class RegistreModeles:
+    def __init__(self, motifs=("*.joblib", os.path.join("models", "*.pkl")), mmap=False):
+        self.motifs = motifs
+        self.mmap = mmap
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    @staticmethod
+    def _nom(chemin):
+        nom = os.path.splitext(os.path.basename(chemin))[0]
+        dossier = os.path.dirname(chemin)
+        return f"{nom} ({dossier}/)" if dossier else nom
+
+    # Index des artefacts : seules les métadonnées sont lues, jamais les modèles eux-mêmes
+    def indexer(self):
+        index = {}
+        for motif in self.motifs:
+            for chemin in sorted(glob.glob(motif)):
+                metadonnees = {"format_entree": "codes", "features": COLONNES_BRUTES, "pretraitement": None,
+                               "metriques": None, "empreinte_donnees": None}
+                metadonnees.update(ARTEFACTS_FOURNIS.get(os.path.basename(chemin), {}))
+                metadonnees.update(lire_metadonnees(chemin))
+                metadonnees["fichier"] = chemin
+                metadonnees["taille_octets"] = os.path.getsize(chemin)
+                index[self._nom(chemin)] = metadonnees
+        return index
+
+    # Entrée de l'index d'un modèle ; l'appelant qui a déjà indexé la passe pour éviter une nouvelle indexation
+    def _metadonnees(self, nom, metadonnees):
+        return metadonnees if metadonnees is not None else self.indexer()[nom]
+
+    # Chargement d'un modèle : depuis le gestionnaire de ressources s'il est déjà en mémoire,
+    # sinon depuis le disque
+    def charger(self, nom, metadonnees=None):
+        chemin = self._metadonnees(nom, metadonnees)["fichier"]
+        cle = ("artefact", chemin, os.path.getmtime(chemin), self.mmap)  # Un artefact réécrit est rechargé
+        charge = []
+
+        def lire():
+            charge.append(True)
+            return joblib.load(chemin, mmap_mode="r" if self.mmap else None)
+
+        modele = gestionnaire.obtenir(cle, lire, "modeles")
+        with self._verrou:
+            if charge:
+                self.echecs += 1
+            else:
+                self.succes += 1
+        return modele
+
+    # Prétraitement enregistré avec un modèle ; les artefacts livrés n'utilisent que les tables de codes
+    def charger_pretraitement(self, nom, metadonnees=None):
+        chemin = self._metadonnees(nom, metadonnees)["pretraitement"]
+        if not chemin or not os.path.exists(chemin):
+            return Pretraitement()
+
+        cle = ("pretraitement", chemin, os.path.getmtime(chemin))
+        return gestionnaire.obtenir(cle, lambda: Pretraitement.charger(chemin), "pretraitements")
+
+    def statistiques(self):
+        with self._verrou:
+            return {"succes": self.succes, "echecs": self.echecs,
+                    "en_memoire": gestionnaire.statistiques()["categories"]["modeles"]["entrees"]}
+
+
+# Registre unique, partagé par toutes les sessions Streamlit du processus
+@st.cache_resource
+def obtenir_registre():
+    return RegistreModeles(mmap=os.environ.get("STUDENT_MODEL_MMAP") == "1")
@@ -0,0 +1,28 @@
+import importlib
+
+from instrumentation import mesurer
+
+# Registre des pages de l'application : pour chaque page, le module et la fonction qui l'affichent.
+# Le module d'une page, et avec lui ses dépendances lourdes (scikit-learn, seaborn, matplotlib,
+# joblib), n'est importé qu'à la première ouverture de cette page ; ensuite il vient de sys.modules.
+# Aucun module de page ne charge ni ne prépare de données à l'import : c'est fait, et mis en cache,
+# au premier affichage de la page qui en a besoin.
+PAGES = {
+    "Introduction": ("introduction", "page_introduction"),
+    "Modélisation": ("modelisation", "page_modelisation"),
+    "Visualisation": ("visualisation", "afficher_page_visualisation"),
+    "Prédiction": ("prediction", "page_prediction"),
+}
+
+
+# Fonction d'affichage d'une page (import de son module au premier appel)
+def fonction_page(nom):
+    module, fonction = PAGES[nom]
+    return getattr(importlib.import_module(module), fonction)
+
+
+def afficher_page(nom):
+    with mesurer("app.import_page"):
+        fonction = fonction_page(nom)
+    with mesurer("app.affichage_page"):
+        fonction()
@@ -0,0 +1,45 @@
+import io
+
+from ressources import gestionnaire
+
+# Rendu des figures matplotlib en images PNG, mises en cache. Une figure est tracée, rasterisée
+# puis fermée aussitôt (le registre global des figures de pyplot ne grossit plus au fil des reruns) ;
+# l'image est gardée par le gestionnaire des ressources (catégorie "figures", plafonnée à
+# STUDENT_FIGURES_MAX_MB), indexée par (empreinte des données, type de graphique, variables choisies) :
+# un graphique déjà rendu n'est ni retracé ni rasterisé de nouveau.
+# Ce module n'importe pas Streamlit : les pages affichent l'image obtenue avec st.image.
+# matplotlib n'est importé qu'au premier rendu.
+
+# Résolution des images (celle de st.pyplot)
+DPI = 200
+
+
+# Rasterisation d'une figure en PNG, puis fermeture de la figure
+def rendre_png(fig, dpi=DPI):
+    import matplotlib.pyplot as plt
+
+    flux = io.BytesIO()
+    try:
+        fig.savefig(flux, format="png", bbox_inches="tight", dpi=dpi)
+    finally:
+        plt.close(fig)
+    return flux.getvalue()
+
+
+# Tracé puis rendu ; si tracer() échoue après avoir créé sa figure, celle-ci est fermée aussi
+def tracer_png(tracer):
+    import matplotlib.pyplot as plt
+
+    ouvertes = set(plt.get_fignums())
+    try:
+        fig = tracer()
+    except BaseException:
+        for numero in set(plt.get_fignums()) - ouvertes:
+            plt.close(numero)
+        raise
+    return rendre_png(fig)
+
+
+# Image d'un graphique : depuis le gestionnaire, sinon tracée par tracer() (qui renvoie la figure) et rendue
+def figure_png(cle, tracer):
+    return gestionnaire.obtenir(("figure", cle), lambda: tracer_png(tracer), "figures")
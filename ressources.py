@@ -0,0 +1,237 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Gestionnaire des ressources partagées par toutes les sessions du processus : jeux de données,
+# données préparées, estimateurs entraînés ou chargés, prétraitements, cubes d'agrégats, contenus à télécharger.
+# Une ressource est construite une seule fois (les sessions qui la demandent en même temps attendent
+# la même construction), puis servie à toutes les sessions tant qu'elle n'est pas évincée.
+#   - comptage de références : une ressource obtenue pendant une exécution du script est retenue
+#     jusqu'à la fin de cette exécution et ne peut pas être évincée pendant qu'une page l'utilise ;
+#   - plafond mémoire global : au-delà, les ressources non retenues les moins récemment utilisées
+#     sont évincées (une ressource évincée sera reconstruite à la prochaine demande) ;
+#   - plafonds par catégorie : les images rendues et les prédictions mémorisées sont bornées à part,
+#     sans évincer les autres ressources ;
+#   - statistiques par catégorie : taux de succès, taille résidente, évictions.
+# Ce module n'importe pas Streamlit : les scripts et le serveur de scoring l'utilisent aussi.
+# Il n'importe pas non plus NumPy ni pandas (le panneau d'instrumentation l'importe au démarrage) :
+# un objet de ces bibliothèques ne peut exister que si elles sont déjà chargées.
+
+PLAFOND_OCTETS = int(os.environ.get("STUDENT_RESSOURCES_MAX_MB", "2048")) * 1024 ** 2
+
+# Plafonds propres à certaines catégories, à l'intérieur du plafond global
+PLAFONDS_CATEGORIES = {"figures": int(os.environ.get("STUDENT_FIGURES_MAX_MB", "32")) * 1024 ** 2,
+                       "predictions": int(os.environ.get("STUDENT_MEMO_PREDICTIONS_MB", "32")) * 1024 ** 2}
+
+CATEGORIES = ("donnees", "modeles", "pretraitements", "agregats", "exports", "explications", "figures",
+              "predictions")
+
+# Ressources retenues par l'exécution courante, propres au thread (une session Streamlit par thread)
+_local = threading.local()
+
+
+# Estimation de la mémoire occupée par un objet : tableaux NumPy, DataFrame, estimateurs scikit-learn
+# (attributs et état des arbres compilés), conteneurs. Les tableaux mappés depuis un fichier (modèles
+# chargés avec mmap_mode) ne sont pas comptés : leurs pages appartiennent au cache du système.
+def taille_octets(objet, _vus=None):
+    # Les objets vus restent référencés pendant le parcours : les états temporaires renvoyés par
+    # __getstate__ gardent leur identifiant, qui serait sinon réutilisé par le suivant
+    if _vus is None:
+        _vus = {}
+    if id(objet) in _vus:
+        return 0
+    _vus[id(objet)] = objet
+
+    np = sys.modules.get("numpy")
+    pd = sys.modules.get("pandas")
+    if np is not None and isinstance(objet, np.memmap):
+        return 0
+    if np is not None and isinstance(objet, np.ndarray):
+        # Une vue est comptée par son tableau de base, une seule fois
+        if isinstance(objet.base, np.ndarray):
+            return taille_octets(objet.base, _vus)
+        if objet.dtype == object:  # Tableau d'objets (arbres du Gradient Boosting, par exemple)
+            return objet.nbytes + sum(taille_octets(element, _vus) for element in objet.flat)
+        return objet.nbytes
+    if pd is not None and isinstance(objet, (pd.DataFrame, pd.Series, pd.Index)):
+        utilisation = objet.memory_usage(deep=True)
+        return int(utilisation.sum() if isinstance(objet, pd.DataFrame) else utilisation)
+    if isinstance(objet, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(objet)
+    if isinstance(objet, dict):
+        return sys.getsizeof(objet) + sum(taille_octets(cle, _vus) + taille_octets(valeur, _vus)
+                                          for cle, valeur in objet.items())
+    if isinstance(objet, (list, tuple, set, frozenset)):
+        return sys.getsizeof(objet) + sum(taille_octets(element, _vus) for element in objet)
+
+    # Objets quelconques : leur état (attributs, ou état sérialisé des objets compilés comme sklearn Tree)
+    try:
+        etat = objet.__getstate__()
+    except Exception:
+        etat = getattr(objet, "__dict__", None)
+    return sys.getsizeof(objet) + (taille_octets(etat, _vus) if etat is not None else 0)
+
+
+class _Entree:
+    def __init__(self, objet, categorie, taille):
+        self.objet = objet
+        self.categorie = categorie
+        self.taille = taille
+        self.references = 0
+
+
+class GestionnaireRessources:
+    def __init__(self, plafond=PLAFOND_OCTETS, plafonds_categories=PLAFONDS_CATEGORIES):
+        self.plafond = plafond
+        self.plafonds_categories = dict(plafonds_categories)
+        self._entrees = OrderedDict()  # clé -> _Entree, ordre LRU
+        self._tailles = {}  # catégorie -> taille totale de ses entrées (tenue à jour : l'éviction reste en O(1))
+        self._taille_totale = 0
+        self._constructions = {}  # clé -> verrou de construction
+        self._verrou = threading.Lock()
+        self._compteurs = {categorie: {"succes": 0, "echecs": 0, "evictions": 0} for categorie in CATEGORIES}
+        self.depassements = 0
+
+    def _compteur(self, categorie):
+        return self._compteurs.setdefault(categorie, {"succes": 0, "echecs": 0, "evictions": 0})
+
+    # Ajout et retrait d'une entrée, tailles tenues à jour (appelées verrou pris)
+    def _inserer(self, cle, entree):
+        self._entrees[cle] = entree
+        self._tailles[entree.categorie] = self._tailles.get(entree.categorie, 0) + entree.taille
+        self._taille_totale += entree.taille
+
+    def _enlever(self, cle):
+        entree = self._entrees.pop(cle, None)
+        if entree is not None:
+            self._tailles[entree.categorie] -= entree.taille
+            self._taille_totale -= entree.taille
+        return entree
+
+    # Référence prise pour l'exécution courante (sans exécution en cours : aucune rétention)
+    def _retenir(self, cle, entree):
+        references = getattr(_local, "references", None)
+        if references is not None and cle not in references:
+            entree.references += 1
+            references[cle] = self
+
+    # Ressource déjà présente, ou None ; compte un succès ou un échec
+    def consulter(self, cle, categorie):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self._compteur(categorie)["echecs"] += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self._compteur(categorie)["succes"] += 1
+            self._retenir(cle, entree)
+            return entree.objet
+
+    # Ajout (ou remplacement) d'une ressource construite ailleurs
+    def deposer(self, cle, objet, categorie, taille=None):
+        taille = taille_octets(objet) if taille is None else taille
+        with self._verrou:
+            ancienne = self._enlever(cle)
+            entree = _Entree(objet, categorie, taille)
+            if ancienne is not None:
+                entree.references = ancienne.references
+            self._inserer(cle, entree)
+            self._retenir(cle, entree)
+            self._evincer()
+        return objet
+
+    # Ressource partagée : construite par fabrique() au premier appel, une seule fois même si
+    # plusieurs sessions la demandent en même temps
+    def obtenir(self, cle, fabrique, categorie, taille=None):
+        objet = self.consulter(cle, categorie)
+        if objet is not None:
+            return objet
+
+        with self._verrou:
+            construction = self._constructions.setdefault(cle, threading.Lock())
+        with construction:
+            # Une autre session a pu la construire pendant l'attente
+            with self._verrou:
+                entree = self._entrees.get(cle)
+                if entree is not None:
+                    self._entrees.move_to_end(cle)
+                    self._retenir(cle, entree)
+                    return entree.objet
+            try:
+                return self.deposer(cle, fabrique(), categorie, taille)
+            finally:
+                with self._verrou:
+                    self._constructions.pop(cle, None)
+
+    def retirer(self, cle):
+        with self._verrou:
+            self._enlever(cle)
+
+    def liberer(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree.references > 0:
+                entree.references -= 1
+            self._evincer()
+
+    # Éviction des ressources non retenues les moins récemment utilisées, jusqu'au plafond de chaque
+    # catégorie plafonnée puis jusqu'au plafond global (appelée verrou pris). Si tout est retenu,
+    # le plafond est dépassé jusqu'aux prochaines libérations.
+    def _evincer(self):
+        for categorie, plafond in self.plafonds_categories.items():
+            self._evincer_jusqua(plafond, categorie)
+        self._evincer_jusqua(self.plafond)
+
+    def _evincer_jusqua(self, plafond, categorie=None):
+        total = self._taille_totale if categorie is None else self._tailles.get(categorie, 0)
+        if total <= plafond:
+            return
+        for cle in list(self._entrees):
+            entree = self._entrees[cle]
+            if entree.references > 0 or (categorie is not None and entree.categorie != categorie):
+                continue
+            self._enlever(cle)
+            self._compteur(entree.categorie)["evictions"] += 1
+            total -= entree.taille
+            if total <= plafond:
+                return
+        self.depassements += 1
+
+    def statistiques(self):
+        with self._verrou:
+            nombres, retenues = {}, {}
+            for entree in self._entrees.values():
+                nombres[entree.categorie] = nombres.get(entree.categorie, 0) + 1
+                retenues[entree.categorie] = retenues.get(entree.categorie, 0) + (entree.references > 0)
+            categories = {}
+            for categorie, compteurs in self._compteurs.items():
+                demandes = compteurs["succes"] + compteurs["echecs"]
+                categories[categorie] = {
+                    **compteurs,
+                    "entrees": nombres.get(categorie, 0),
+                    "retenues": retenues.get(categorie, 0),
+                    "taille_octets": self._tailles.get(categorie, 0),
+                    "taux_succes": compteurs["succes"] / demandes if demandes else None,
+                    "plafond_octets": self.plafonds_categories.get(categorie),
+                }
+            return {"plafond_octets": self.plafond,
+                    "taille_octets": self._taille_totale,
+                    "depassements": self.depassements, "categories": categories}
+
+
+# Gestionnaire unique du processus
+gestionnaire = GestionnaireRessources()
+
+
+# Début d'une exécution du script : les ressources obtenues seront retenues jusqu'à sa fin
+def debut_execution():
+    _local.references = {}
+
+
+# Fin d'une exécution : libération de toutes les ressources qu'elle retenait
+def fin_execution():
+    references = getattr(_local, "references", None) or {}
+    _local.references = None
+    for cle, gestion in references.items():
+        gestion.liberer(cle)
@@ -0,0 +1,71 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from pretraitement import CODES_CATEGORIES, SUFFIXE_ENCODE
+
+# Schéma compact des jeux de données : chaque variable est un petit entier borné, une catégorie
+# à quelques modalités ou une note. Les types par défaut (int64, float64, chaînes object) occupent
+# jusqu'à huit fois plus de mémoire ; le schéma est appliqué à l'ingestion et à chaque lecture du magasin.
+#   - variables numériques bornées (heures, présence, notes précédentes...) : uint8 ;
+#   - note d'examen (cible) : int16, la cible entre dans des différences avec les prédictions
+#     et des notes atypiques peuvent dépasser 100 ;
+#   - codes des catégories (*_Encoded) : uint8 ;
+#   - catégories en texte : dictionnaire Arrow, c'est-à-dire pandas "category".
+# Une colonne numérique avec des valeurs manquantes passe en float32 (pandas n'a pas d'entier
+# nullable compact par défaut) ; une valeur hors du domaine prévu garde le type d'origine.
+TYPES_COLONNES = {
+    "Hours_Studied": pa.uint8(),
+    "Attendance": pa.uint8(),
+    "Sleep_Hours": pa.uint8(),
+    "Previous_Scores": pa.uint8(),
+    "Tutoring_Sessions": pa.uint8(),
+    "Physical_Activity": pa.uint8(),
+    "Exam_Score": pa.int16(),
+    **{f"{colonne}{SUFFIXE_ENCODE}": pa.uint8() for colonne in CODES_CATEGORIES},
+}
+
+# Type de la matrice des variables explicatives transmise aux estimateurs
+TYPE_MATRICE = np.float32
+
+
+# Catégories en dictionnaire Arrow. Les modalités sont triées, comme l'étaient les chaînes
+# d'origine : les tris et regroupements par catégorie donnent le même ordre qu'avant.
+def _encoder_dictionnaire(colonne):
+    if pa.types.is_dictionary(colonne.type):
+        colonne = colonne.cast(colonne.type.value_type)
+    modalites = pc.unique(colonne).drop_null()
+    modalites = modalites.take(pc.array_sort_indices(modalites))
+    indices = pc.index_in(colonne, value_set=modalites)
+    indices = indices.cast(pa.int8() if len(modalites) < 128 else pa.int32())
+    return pa.chunked_array([pa.DictionaryArray.from_arrays(morceau, modalites) for morceau in indices.chunks],
+                            type=pa.dictionary(indices.type, modalites.type))
+
+
+def _convertir(colonne, cible):
+    if colonne.null_count:
+        cible = pa.float32()
+    if colonne.type == cible:
+        return colonne
+    try:
+        return colonne.cast(cible)  # Conversion sûre : un dépassement lève une erreur
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return colonne
+
+
+# Table Arrow au schéma compact ; les colonnes inconnues du schéma sont conservées telles quelles
+def compacter_table(table):
+    colonnes = []
+    for nom, colonne in zip(table.column_names, table.columns):
+        if nom in TYPES_COLONNES:
+            colonne = _convertir(colonne, TYPES_COLONNES[nom])
+        elif pa.types.is_string(colonne.type) or pa.types.is_large_string(colonne.type) \
+                or pa.types.is_dictionary(colonne.type):
+            colonne = _encoder_dictionnaire(colonne)
+        colonnes.append(colonne)
+    return pa.table(colonnes, names=table.column_names)
+
+
+# Mémoire occupée par un DataFrame (chaînes comprises)
+def memoire_octets(donnees):
+    return int(donnees.memory_usage(deep=True, index=True).sum())
@@ -0,0 +1,120 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pretraitement import COLONNES_BRUTES, Pretraitement
+
+COLONNE_PREDICTION = "Score_Predit"
+BUDGET_MEMOIRE_DEFAUT = 64 * 1024 ** 2  # Octets par morceau
+
+
+# Nombre de lignes par morceau pour un budget mémoire donné : on compte la ligne brute
+# (lue par pandas, environ 8 octets par colonne plus les chaînes) et sa copie encodée en float64
+def taille_morceau(budget_octets, nb_colonnes):
+    octets_par_ligne = nb_colonnes * 8 * 4
+    return max(1, int(budget_octets // octets_par_ligne))
+
+
+# Lecture d'un fichier CSV ou Parquet (chemin local ou fichier téléversé) par morceaux
+def lire_par_morceaux(source, taille, nom=None):
+    nom = nom or getattr(source, "name", str(source))
+    if nom.lower().endswith(".parquet"):
+        for lot in pq.ParquetFile(source).iter_batches(batch_size=taille):
+            yield lot.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=taille)
+
+
+# Écriture progressive des résultats au format CSV ou Parquet
+class EcrivainResultats:
+    def __init__(self, destination):
+        self.destination = destination
+        self.parquet = destination.lower().endswith(".parquet")
+        self._ecrivain = None
+        self._premier = True
+
+    def ecrire(self, morceau):
+        if self.parquet:
+            table = pa.Table.from_pandas(morceau, preserve_index=False)
+            if self._ecrivain is None:
+                self._ecrivain = pq.ParquetWriter(self.destination, table.schema)
+            self._ecrivain.write_table(table)
+        else:
+            morceau.to_csv(self.destination, mode="w" if self._premier else "a", header=self._premier, index=False)
+        self._premier = False
+
+    def fermer(self):
+        if self._ecrivain is not None:
+            self._ecrivain.close()
+
+
+# Scoring d'un fichier complet : lecture, encodage et prédiction morceau par morceau,
+# les résultats étant écrits au fil de l'eau dans le fichier de destination
+def scorer_fichier(model, source, destination, budget_octets=BUDGET_MEMOIRE_DEFAUT, nom=None, progression=None,
+                   metadonnees=None, pretraitement=None):
+    metadonnees = metadonnees or {"format_entree": "codes", "features": COLONNES_BRUTES}
+    pretraitement = pretraitement or Pretraitement()
+    taille = taille_morceau(budget_octets, len(COLONNES_BRUTES))
+
+    lignes = 0
+    lignes_invalides = 0
+    debut = time.perf_counter()
+    ecrivain = EcrivainResultats(destination)
+    try:
+        for morceau in lire_par_morceaux(source, taille, nom):
+            X, valides = pretraitement.encoder(morceau)
+
+            # Un seul appel à predict par morceau ; les lignes invalides reçoivent NaN
+            predictions = np.full(len(morceau), np.nan)
+            if valides.any():
+                entree = pretraitement.pour_modele(X[valides], metadonnees)
+                predictions[valides] = model.predict(entree)
+
+            morceau = morceau.copy()
+            morceau[COLONNE_PREDICTION] = predictions
+            ecrivain.ecrire(morceau)
+
+            lignes += len(morceau)
+            lignes_invalides += int((~valides).sum())
+            if progression is not None:
+                progression(lignes)
+    finally:
+        ecrivain.fermer()
+
+    secondes = time.perf_counter() - debut
+    return {
+        "lignes": lignes,
+        "lignes_invalides": lignes_invalides,
+        "taille_morceau": taille,
+        "secondes": secondes,
+        "lignes_par_seconde": lignes / secondes if secondes > 0 else float("inf"),
+    }
+
+
+# Scoring en ligne de commande, sans interface :
+#   python score_lot.py cohorte.csv scores.parquet --budget-mo 128
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scoring par lot des performances étudiantes")
+    parser.add_argument("entree", help="Fichier CSV ou Parquet à scorer")
+    parser.add_argument("sortie", help="Fichier de résultats (.csv ou .parquet)")
+    parser.add_argument("--modele", default="Gradient Boosting Regressor", help="Nom du modèle dans le registre")
+    parser.add_argument("--budget-mo", type=int, default=BUDGET_MEMOIRE_DEFAUT // 1024 ** 2,
+                        help="Budget mémoire par morceau, en Mo")
+    args = parser.parse_args()
+
+    from registre_modeles import RegistreModeles
+
+    registre = RegistreModeles()
+    index = registre.indexer()
+    if args.modele not in index:
+        parser.error(f"Le modèle '{args.modele}' est introuvable (disponibles : {', '.join(index)})")
+    metadonnees = index[args.modele]
+    stats = scorer_fichier(registre.charger(args.modele, metadonnees), args.entree, args.sortie,
+                           args.budget_mo * 1024 ** 2, metadonnees=metadonnees,
+                           pretraitement=registre.charger_pretraitement(args.modele, metadonnees))
+    print(f"{stats['lignes']} lignes scorées ({stats['lignes_invalides']} invalides) "
+          f"en {stats['secondes']:.2f} s, soit {stats['lignes_par_seconde']:,.0f} lignes/s")
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from arbres_compiles import compiler_si_possible
+from registre_modeles import RegistreModeles
+from pretraitement import COLONNES_BRUTES, Pretraitement
+
+# Serveur HTTP de scoring sans interface (asyncio, bibliothèque standard uniquement) :
+#   GET  /sante        -> état du serveur et statistiques de micro-lots
+#   POST /predire      -> un étudiant (objet JSON)              -> {"score": ...}
+#   POST /predire/lot  -> une liste d'étudiants (tableau JSON)  -> {"scores": [...]}
+# Les requêtes unitaires concurrentes sont regroupées en micro-lots : un seul appel
+# vectorisé à predict sert tous les clients arrivés pendant la fenêtre de latence.
+
+FENETRE_MS_DEFAUT = 5
+LOT_MAX_DEFAUT = 256
+TAILLE_MAX_CORPS = 64 * 1024 ** 2
+
+
+class ErreurRequete(Exception):
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+
+
+# Scoring vectorisé d'une liste d'étudiants (dictionnaires de valeurs brutes)
+class Scoreur:
+    def __init__(self, modele, metadonnees, pretraitement=None):
+        self.modele = modele
+        self.metadonnees = metadonnees
+        self.pretraitement = pretraitement or Pretraitement()
+
+    def scorer(self, etudiants):
+        morceau = pd.DataFrame.from_records(etudiants)
+        try:
+            X, valides = self.pretraitement.encoder(morceau)
+        except ValueError as e:
+            raise ErreurRequete(400, str(e))
+
+        scores = np.full(len(morceau), np.nan)
+        if valides.any():
+            entree = self.pretraitement.pour_modele(X[valides], self.metadonnees)
+            scores[valides] = self.modele.predict(entree)
+        return scores
+
+
+# Regroupement des requêtes unitaires en micro-lots
+class MicroLots:
+    def __init__(self, scoreur, fenetre_ms=FENETRE_MS_DEFAUT, lot_max=LOT_MAX_DEFAUT):
+        self.scoreur = scoreur
+        self.fenetre = fenetre_ms / 1000
+        self.lot_max = lot_max
+        self.file = asyncio.Queue()
+        self.nb_lots = 0
+        self.nb_requetes = 0
+
+    async def soumettre(self, etudiant):
+        futur = asyncio.get_running_loop().create_future()
+        await self.file.put((etudiant, futur))
+        return await futur
+
+    async def boucle(self):
+        boucle = asyncio.get_running_loop()
+        while True:
+            lot = [await self.file.get()]
+            echeance = boucle.time() + self.fenetre
+            while len(lot) < self.lot_max:
+                restant = echeance - boucle.time()
+                if restant <= 0:
+                    break
+                try:
+                    lot.append(await asyncio.wait_for(self.file.get(), restant))
+                except asyncio.TimeoutError:
+                    break
+
+            etudiants = [etudiant for etudiant, _ in lot]
+            try:
+                # predict libère la boucle d'événements : il s'exécute dans un thread
+                scores = await boucle.run_in_executor(None, self.scoreur.scorer, etudiants)
+            except Exception as e:
+                for _, futur in lot:
+                    if not futur.done():
+                        futur.set_exception(e)
+                continue
+
+            self.nb_lots += 1
+            self.nb_requetes += len(lot)
+            for (_, futur), score in zip(lot, scores):
+                if not futur.done():
+                    futur.set_result(score)
+
+
+def _reponse(statut, corps):
+    raisons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+    contenu = json.dumps(corps).encode()
+    entete = (f"HTTP/1.1 {statut} {raisons.get(statut, '')}\r\n"
+              "Content-Type: application/json\r\n"
+              f"Content-Length: {len(contenu)}\r\n"
+              "Connection: keep-alive\r\n\r\n")
+    return entete.encode() + contenu
+
+
+# Longueur du corps annoncée par l'en-tête Content-Length (0 sans en-tête), ou None si elle est invalide :
+# seuls les chiffres décimaux sont acceptés (ni signe, ni espace, ni séparateur)
+def _longueur_corps(entetes):
+    valeur = entetes.get("content-length", "0")
+    if not (valeur.isascii() and valeur.isdigit()):
+        return None
+    return int(valeur)
+
+
+def _score_json(score):
+    return None if np.isnan(score) else float(score)
+
+
+class ServeurScoring:
+    def __init__(self, scoreur, micro_lots):
+        self.scoreur = scoreur
+        self.micro_lots = micro_lots
+        self.demarrage = time.time()
+
+    async def traiter(self, methode, chemin, corps):
+        if chemin == "/sante" and methode == "GET":
+            return 200, {"statut": "ok", "depuis_s": round(time.time() - self.demarrage, 1),
+                         "micro_lots": self.micro_lots.nb_lots, "requetes_unitaires": self.micro_lots.nb_requetes}
+        if chemin not in ("/predire", "/predire/lot"):
+            return 404, {"erreur": f"Chemin inconnu : {chemin}"}
+        if methode != "POST":
+            return 405, {"erreur": "Utilisez POST"}
+
+        try:
+            donnees = json.loads(corps or b"null")
+        except json.JSONDecodeError as e:
+            return 400, {"erreur": f"JSON invalide : {e}"}
+
+        if chemin == "/predire":
+            if not isinstance(donnees, dict):
+                return 400, {"erreur": "Un objet JSON (un étudiant) est attendu"}
+            score = await self.micro_lots.soumettre(donnees)
+            if np.isnan(score):
+                return 400, {"erreur": "Valeurs invalides ou catégorie inconnue"}
+            return 200, {"score": float(score)}
+
+        # Les lots explicites sont déjà vectorisés : ils ne passent pas par les micro-lots
+        if isinstance(donnees, dict):
+            donnees = donnees.get("etudiants")
+        if not isinstance(donnees, list) or not donnees:
+            return 400, {"erreur": "Une liste non vide d'étudiants est attendue"}
+        scores = await asyncio.get_running_loop().run_in_executor(None, self.scoreur.scorer, donnees)
+        return 200, {"scores": [_score_json(score) for score in scores]}
+
+    # Connexion HTTP/1.1 persistante : les requêtes sont lues et traitées l'une après l'autre
+    async def connexion(self, lecteur, ecrivain):
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                try:
+                    methode, chemin, _ = ligne.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    ecrivain.write(_reponse(400, {"erreur": "Requête mal formée"}))
+                    break
+
+                entetes = {}
+                while True:
+                    ligne = await lecteur.readline()
+                    if ligne in (b"\r\n", b"\n", b""):
+                        break
+                    nom, _, valeur = ligne.decode("latin-1").partition(":")
+                    entetes[nom.strip().lower()] = valeur.strip()
+
+                # Sans longueur valide, la fin du corps est inconnue : la connexion ne peut pas continuer
+                longueur = _longueur_corps(entetes)
+                if longueur is None:
+                    ecrivain.write(_reponse(400, {"erreur": "En-tête Content-Length invalide"}))
+                    break
+                if longueur > TAILLE_MAX_CORPS:
+                    ecrivain.write(_reponse(413, {"erreur": "Corps de requête trop volumineux"}))
+                    break
+                corps = await lecteur.readexactly(longueur) if longueur else b""
+
+                try:
+                    statut, reponse = await self.traiter(methode, chemin.split("?")[0], corps)
+                except ErreurRequete as e:
+                    statut, reponse = e.statut, {"erreur": str(e)}
+                except Exception as e:
+                    statut, reponse = 500, {"erreur": str(e)}
+                ecrivain.write(_reponse(statut, reponse))
+                await ecrivain.drain()
+
+                if entetes.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            ecrivain.close()
+
+
+async def servir(hote, port, nom_modele, fenetre_ms, lot_max, compilation=True):
+    registre = RegistreModeles()
+    index = registre.indexer()
+    if nom_modele not in index:
+        raise SystemExit(f"Le modèle '{nom_modele}' est introuvable (disponibles : {', '.join(index)})")
+
+    metadonnees = index[nom_modele]
+    modele = registre.charger(nom_modele, metadonnees)
+    pretraitement = registre.charger_pretraitement(nom_modele, metadonnees)
+
+    # Les modèles à base d'arbres sont servis par l'inférence compilée (entrée au format "codes") ; la
+    # standardisation d'un modèle de la page de modélisation est repliée dans la forêt compilée
+    foret = compiler_si_possible(modele, metadonnees, pretraitement) if compilation else None
+    if foret is not None:
+        foret.predict(np.zeros((1, len(COLONNES_BRUTES))))  # Compilation JIT avant la première requête
+        modele, metadonnees = foret, {"format_entree": "codes", "features": COLONNES_BRUTES}
+    scoreur = Scoreur(modele, metadonnees, pretraitement)
+    micro_lots = MicroLots(scoreur, fenetre_ms, lot_max)
+    serveur = ServeurScoring(scoreur, micro_lots)
+
+    tache_lots = asyncio.create_task(micro_lots.boucle())
+    async with await asyncio.start_server(serveur.connexion, hote, port) as srv:
+        inference = "compilée" if foret is not None else "sklearn"
+        print(f"Serveur de scoring ({nom_modele}, inférence {inference}) à l'écoute sur http://{hote}:{port}")
+        try:
+            await srv.serve_forever()
+        finally:
+            tache_lots.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur HTTP de scoring avec regroupement en micro-lots")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--modele", default="Gradient Boosting Regressor", help="Nom du modèle dans le registre")
+    parser.add_argument("--fenetre-ms", type=float, default=FENETRE_MS_DEFAUT,
+                        help="Fenêtre de regroupement des requêtes unitaires, en millisecondes")
+    parser.add_argument("--lot-max", type=int, default=LOT_MAX_DEFAUT, help="Taille maximale d'un micro-lot")
+    parser.add_argument("--sans-compilation", action="store_true", help="Utiliser predict de sklearn")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(servir(args.hote, args.port, args.modele, args.fenetre_ms, args.lot_max,
+                           compilation=not args.sans_compilation))
+    except KeyboardInterrupt:
+        pass
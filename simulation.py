@@ -0,0 +1,72 @@
+import os
+import sys
+
+import numpy as np
+
+from pretraitement import BORNES_SAISIE, COLONNES_BRUTES
+from ressources import gestionnaire
+
+# Simulation « what-if » sur la page de prédiction : toutes les variables d'entrée sont des entiers
+# bornés ou des catégories à quelques modalités. Le balayage d'une variable (ou la grille de deux
+# variables) autour d'un profil d'étudiant est donc petit ; il est évalué en un seul appel de
+# predict sur la matrice de tous les profils modifiés, au lieu d'un aller-retour par valeur.
+# Les prédictions unitaires sont mémorisées par (artefact, vecteur encodé) dans le gestionnaire des
+# ressources (catégorie "predictions", plafonnée à STUDENT_MEMO_PREDICTIONS_MB) : une même saisie
+# est servie sans nouveau calcul, et chaque point d'un balayage alimente aussi cette mémoire.
+# Ce module n'importe pas Streamlit.
+
+
+
+# Identité d'un artefact du registre : un fichier réécrit ne réutilise pas les anciennes prédictions
+def cle_artefact(metadonnees):
+    return metadonnees["fichier"], os.path.getmtime(metadonnees["fichier"]), metadonnees["format_entree"]
+
+
+def _cle_ligne(artefact, ligne):
+    return "prediction", artefact, np.ascontiguousarray(ligne, dtype=np.float64).tobytes()
+
+
+# Mémorisation d'une prédiction ; la taille comptée est celle du vecteur encodé et de la valeur
+def _memoriser(cle, prediction):
+    prediction = float(prediction)
+    gestionnaire.deposer(cle, prediction, "predictions", taille=sys.getsizeof(cle[-1]) + sys.getsizeof(prediction))
+
+
+# Prédiction d'un seul étudiant (matrice "codes" d'une ligne), depuis la mémoire si possible
+def predire_memoise(model, metadonnees, pretraitement, X_codes):
+    cle = _cle_ligne(cle_artefact(metadonnees), X_codes[0])
+    prediction = gestionnaire.consulter(cle, "predictions")
+    if prediction is None:
+        prediction = float(model.predict(pretraitement.pour_modele(X_codes, metadonnees))[0])
+        _memoriser(cle, prediction)
+    return prediction
+
+
+# Valeurs balayées d'une variable : tout son domaine entier, ou toutes ses catégories (codes et libellés)
+def valeurs_balayage(colonne, pretraitement):
+    if colonne in pretraitement.codes:
+        table = pretraitement.codes[colonne]
+        return np.array(list(table.values()), dtype=np.float64), list(table)
+    minimum, maximum = BORNES_SAISIE[colonne]
+    valeurs = np.arange(minimum, maximum + 1, dtype=np.float64)
+    return valeurs, [str(int(valeur)) for valeur in valeurs]
+
+
+# Balayage d'une ou deux variables autour d'un profil (matrice "codes" d'une ligne) : toutes les
+# combinaisons sont construites en une matrice, prédites en un seul appel, puis remises en grille
+# (une dimension par variable balayée). Retourne (prédictions, [(valeurs, libellés) par variable]).
+def balayer(model, metadonnees, pretraitement, X_codes, colonnes):
+    if not 1 <= len(colonnes) <= 2 or len(set(colonnes)) != len(colonnes):
+        raise ValueError("Choisissez une ou deux variables différentes à faire varier")
+    axes = [valeurs_balayage(colonne, pretraitement) for colonne in colonnes]
+    grilles = np.meshgrid(*[valeurs for valeurs, _ in axes], indexing="ij")
+
+    X = np.repeat(X_codes[:1], grilles[0].size, axis=0)
+    for colonne, grille in zip(colonnes, grilles):
+        X[:, COLONNES_BRUTES.index(colonne)] = grille.ravel()
+
+    predictions = np.asarray(model.predict(pretraitement.pour_modele(X, metadonnees)), dtype=np.float64)
+    artefact = cle_artefact(metadonnees)
+    for ligne, prediction in zip(X, predictions):
+        _memoriser(_cle_ligne(artefact, ligne), prediction)
+    return predictions.reshape(grilles[0].shape), axes
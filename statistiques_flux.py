@@ -0,0 +1,424 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import psutil
+import pyarrow as pa
+
+from score_lot import lire_par_morceaux, taille_morceau
+
+# Statistiques en flux pour des jeux de données plus grands que la mémoire : les données sont lues
+# par morceaux de taille bornée et chaque statistique est mise à jour puis fusionnable.
+#   - moments (effectif, moyenne, variance, min, max) : algorithme de Welford/Chan, exact
+#   - quantiles (médianes, quartiles des boîtes) : croquis de type KLL, approché
+#   - effectifs des catégories : exacts
+#   - covariance/corrélation : sommes décalées par paires d'observations complètes, exacte
+#
+# Tolérances documentées par rapport à pandas :
+#   - moments, covariance et corrélation : écart relatif <= TOLERANCE_MOMENTS (arrondis flottants)
+#   - quantiles : erreur de rang <= TOLERANCE_RANG * n ; sur des variables entières (heures,
+#     scores), la valeur retournée est en pratique identique. Exact tant que n <= TAILLE_CROQUIS.
+
+TAILLE_CROQUIS = 2048
+TOLERANCE_MOMENTS = 1e-9
+TOLERANCE_RANG = 0.01
+
+
+# Moments par colonne (NaN ignorés), mis à jour par morceau et fusionnables (formule de Chan)
+class Moments:
+    def __init__(self, nb_colonnes):
+        self.n = np.zeros(nb_colonnes)
+        self.moyenne = np.zeros(nb_colonnes)
+        self.m2 = np.zeros(nb_colonnes)
+        self.min = np.full(nb_colonnes, np.inf)
+        self.max = np.full(nb_colonnes, -np.inf)
+
+    def _combiner(self, n, moyenne, m2, minimum, maximum):
+        total = self.n + n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = moyenne - self.moyenne
+            self.moyenne = np.where(total > 0, self.moyenne + delta * n / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.n * n / total, 0.0)
+        self.n = total
+        self.min = np.fmin(self.min, minimum)
+        self.max = np.fmax(self.max, maximum)
+
+    def mettre_a_jour(self, X):
+        presents = ~np.isnan(X)
+        n = presents.sum(axis=0).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            moyenne = np.where(n > 0, np.where(presents, X, 0.0).sum(axis=0) / n, 0.0)
+        m2 = np.where(presents, (X - moyenne) ** 2, 0.0).sum(axis=0)
+        minimum = np.where(presents, X, np.inf).min(axis=0) if len(X) else np.full(X.shape[1], np.inf)
+        maximum = np.where(presents, X, -np.inf).max(axis=0) if len(X) else np.full(X.shape[1], -np.inf)
+        self._combiner(n, moyenne, m2, minimum, maximum)
+
+    def fusionner(self, autre):
+        self._combiner(autre.n, autre.moyenne, autre.m2, autre.min, autre.max)
+
+    @property
+    def variance(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+    @property
+    def ecart_type(self):
+        return np.sqrt(self.variance)
+
+
+# Croquis de quantiles mergeable de type KLL : des compacteurs empilés, dont la capacité
+# décroît géométriquement vers le bas ; un compacteur plein trie ses valeurs et en promeut
+# une sur deux (décalage aléatoire) au niveau supérieur, où chaque valeur pèse deux fois plus
+class CroquisQuantiles:
+    def __init__(self, k=TAILLE_CROQUIS, graine=0):
+        self.k = k
+        self.niveaux = [np.empty(0)]
+        self.n = 0
+        self._alea = np.random.default_rng(graine)
+
+    def _capacite(self, niveau):
+        hauteur = len(self.niveaux)
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (hauteur - 1 - niveau))))
+
+    def _compresser(self):
+        niveau = 0
+        while niveau < len(self.niveaux):
+            valeurs = self.niveaux[niveau]
+            if valeurs.size > self._capacite(niveau):
+                valeurs = np.sort(valeurs)
+                # Une valeur isolée reste en place : le poids total est conservé exactement
+                reste, valeurs = (valeurs[:1], valeurs[1:]) if valeurs.size % 2 else (valeurs[:0], valeurs)
+                promues = valeurs[self._alea.integers(2)::2]
+                self.niveaux[niveau] = reste
+                if niveau + 1 == len(self.niveaux):
+                    self.niveaux.append(np.empty(0))
+                self.niveaux[niveau + 1] = np.concatenate([self.niveaux[niveau + 1], promues])
+            niveau += 1
+
+    def ajouter(self, valeurs):
+        valeurs = np.asarray(valeurs, dtype=np.float64)
+        valeurs = valeurs[~np.isnan(valeurs)]
+        if valeurs.size:
+            self.niveaux[0] = np.concatenate([self.niveaux[0], valeurs])
+            self.n += valeurs.size
+            self._compresser()
+
+    def fusionner(self, autre):
+        while len(self.niveaux) < len(autre.niveaux):
+            self.niveaux.append(np.empty(0))
+        for niveau, valeurs in enumerate(autre.niveaux):
+            self.niveaux[niveau] = np.concatenate([self.niveaux[niveau], valeurs])
+        self.n += autre.n
+        self._compresser()
+
+    # Valeurs retenues et leur poids (2 ** niveau), triées
+    def _ponderees(self):
+        valeurs = np.concatenate(self.niveaux)
+        poids = np.concatenate([np.full(v.size, 2.0 ** h) for h, v in enumerate(self.niveaux)])
+        ordre = np.argsort(valeurs, kind="stable")
+        return valeurs[ordre], poids[ordre]
+
+    # Quantiles approchés : interpolation linéaire entre les rangs encadrants, comme pandas ;
+    # chaque valeur retenue couvre autant de rangs que son poids
+    def quantiles(self, q):
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.n == 0:
+            return np.full(q.shape, np.nan)
+        valeurs, poids = self._ponderees()
+        cumul = np.cumsum(poids)
+        rang = q * (self.n - 1)
+        bas, haut = np.floor(rang), np.ceil(rang)
+        i_bas = np.minimum(np.searchsorted(cumul, bas, side="right"), valeurs.size - 1)
+        i_haut = np.minimum(np.searchsorted(cumul, haut, side="right"), valeurs.size - 1)
+        return valeurs[i_bas] + (valeurs[i_haut] - valeurs[i_bas]) * (rang - bas)
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    # Valeurs retenues dans un intervalle (moustaches et valeurs aberrantes approchées)
+    def valeurs(self):
+        return np.concatenate(self.niveaux)
+
+
+# Effectifs des catégories, dans l'ordre de première apparition
+class CompteursCategories:
+    def __init__(self):
+        self.effectifs = {}
+
+    def mettre_a_jour(self, valeurs):
+        codes, categories = pd.factorize(valeurs)
+        comptes = np.bincount(codes[codes >= 0], minlength=len(categories))
+        for categorie, compte in zip(categories, comptes):
+            self.effectifs[categorie] = self.effectifs.get(categorie, 0) + int(compte)
+
+    def fusionner(self, autre):
+        for categorie, compte in autre.effectifs.items():
+            self.effectifs[categorie] = self.effectifs.get(categorie, 0) + compte
+
+    def serie(self):
+        return pd.Series(self.effectifs, name="count", dtype=np.int64)
+
+
+# Covariance incrémentale par paires d'observations complètes (comme DataFrame.corr/cov) :
+# pour chaque paire (i, j), effectif, sommes et sommes de produits des valeurs décalées
+# (décalage fixé au premier morceau, pour la stabilité numérique)
+class CovarianceIncrementale:
+    def __init__(self, nb_colonnes):
+        p = nb_colonnes
+        self.decalage = None
+        self.n = np.zeros((p, p))
+        self.somme = np.zeros((p, p))  # somme[i, j] : somme de x_i sur les lignes où i et j sont présents
+        self.carres = np.zeros((p, p))  # carres[i, j] : somme de x_i ** 2, mêmes lignes
+        self.produits = np.zeros((p, p))  # produits[i, j] : somme de x_i * x_j
+
+    def mettre_a_jour(self, X):
+        presents = ~np.isnan(X)
+        if self.decalage is None:
+            with np.errstate(invalid="ignore"):
+                self.decalage = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(X.shape[1])
+        Z = np.where(presents, X - self.decalage, 0.0)
+        M = presents.astype(np.float64)
+        self.n += M.T @ M
+        self.somme += Z.T @ M
+        self.carres += (Z ** 2).T @ M
+        self.produits += Z.T @ Z
+
+    def fusionner(self, autre):
+        if autre.decalage is None:
+            return
+        if self.decalage is None:
+            self.decalage = autre.decalage
+        # Ramener les sommes de l'autre croquis au même décalage
+        d = autre.decalage - self.decalage
+        self.produits += (autre.produits + autre.somme * d[None, :] + autre.somme.T * d[:, None]
+                          + np.outer(d, d) * autre.n)
+        self.carres += autre.carres + 2 * d[:, None] * autre.somme + (d ** 2)[:, None] * autre.n
+        self.somme += autre.somme + d[:, None] * autre.n
+        self.n += autre.n
+
+    def _centres(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = self.produits - self.somme * self.somme.T / self.n
+            variances = self.carres - self.somme ** 2 / self.n
+        return covariance, variances
+
+    def covariance(self):
+        covariance, _ = self._centres()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return covariance / (self.n - 1)
+
+    def correlation(self):
+        covariance, variances = self._centres()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return covariance / np.sqrt(variances * variances.T)
+
+
+# Moments et croquis d'une variable par catégorie d'une autre (analyse croisée), dans l'ordre d'apparition
+class StatistiquesParGroupe:
+    def __init__(self, nb_colonnes, k=TAILLE_CROQUIS):
+        self.nb_colonnes = nb_colonnes
+        self.k = k
+        self.moments = {}
+        self.croquis = {}
+
+    def mettre_a_jour(self, categories, X):
+        codes, valeurs = pd.factorize(categories)
+        for g, categorie in enumerate(valeurs):
+            if categorie not in self.moments:
+                self.moments[categorie] = Moments(self.nb_colonnes)
+                self.croquis[categorie] = [CroquisQuantiles(self.k, graine=j) for j in range(self.nb_colonnes)]
+            lignes = X[codes == g]
+            self.moments[categorie].mettre_a_jour(lignes)
+            for j, croquis in enumerate(self.croquis[categorie]):
+                croquis.ajouter(lignes[:, j])
+
+    def fusionner(self, autre):
+        for categorie, moments in autre.moments.items():
+            if categorie not in self.moments:
+                self.moments[categorie] = Moments(self.nb_colonnes)
+                self.croquis[categorie] = [CroquisQuantiles(self.k, graine=j) for j in range(self.nb_colonnes)]
+            self.moments[categorie].fusionner(moments)
+            for croquis, autre_croquis in zip(self.croquis[categorie], autre.croquis[categorie]):
+                croquis.fusionner(autre_croquis)
+
+
+# Ensemble des statistiques d'un jeu de données, alimenté morceau par morceau
+class StatistiquesFlux:
+    def __init__(self, quantitatives, qualitatives, k=TAILLE_CROQUIS, par_groupe=False):
+        self.quantitatives = list(quantitatives)
+        self.qualitatives = list(qualitatives)
+        self.nb_lignes = 0
+        self.moments = Moments(len(self.quantitatives))
+        self.covariance = CovarianceIncrementale(len(self.quantitatives))
+        self.croquis = {colonne: CroquisQuantiles(k, graine=i) for i, colonne in enumerate(self.quantitatives)}
+        self.categories = {colonne: CompteursCategories() for colonne in self.qualitatives}
+        # Statistiques des variables quantitatives par catégorie de chaque variable qualitative
+        self.groupes = {colonne: StatistiquesParGroupe(len(self.quantitatives), k)
+                        for colonne in self.qualitatives} if par_groupe else {}
+
+    def mettre_a_jour(self, morceau):
+        X = morceau[self.quantitatives].to_numpy(dtype=np.float64, na_value=np.nan)
+        self.nb_lignes += len(morceau)
+        self.moments.mettre_a_jour(X)
+        self.covariance.mettre_a_jour(X)
+        for j, colonne in enumerate(self.quantitatives):
+            self.croquis[colonne].ajouter(X[:, j])
+        for colonne in self.qualitatives:
+            self.categories[colonne].mettre_a_jour(morceau[colonne])
+        for colonne, groupes in self.groupes.items():
+            groupes.mettre_a_jour(morceau[colonne], X)
+
+    def fusionner(self, autre):
+        self.nb_lignes += autre.nb_lignes
+        self.moments.fusionner(autre.moments)
+        self.covariance.fusionner(autre.covariance)
+        for colonne in self.quantitatives:
+            self.croquis[colonne].fusionner(autre.croquis[colonne])
+        for colonne in self.qualitatives:
+            self.categories[colonne].fusionner(autre.categories[colonne])
+        for colonne, groupes in self.groupes.items():
+            groupes.fusionner(autre.groupes[colonne])
+
+    def quantiles(self, colonne, q):
+        return self.croquis[colonne].quantiles(q)
+
+    # Équivalent de DataFrame.describe() sur les variables quantitatives
+    def describe_quantitatives(self):
+        lignes = {"count": self.moments.n, "mean": self.moments.moyenne, "std": self.moments.ecart_type,
+                  "min": self.moments.min}
+        quartiles = np.array([self.quantiles(colonne, [0.25, 0.5, 0.75]) for colonne in self.quantitatives])
+        for i, nom in enumerate(("25%", "50%", "75%")):
+            lignes[nom] = quartiles[:, i] if len(quartiles) else []
+        lignes["max"] = self.moments.max
+        return pd.DataFrame(lignes, index=self.quantitatives).T
+
+    # Équivalent de DataFrame.describe() sur les variables qualitatives
+    def describe_qualitatives(self):
+        resume = {}
+        for colonne, compteurs in self.categories.items():
+            effectifs = compteurs.serie()
+            resume[colonne] = {"count": int(effectifs.sum()), "unique": len(effectifs),
+                               "top": effectifs.idxmax() if len(effectifs) else None,
+                               "freq": int(effectifs.max()) if len(effectifs) else None}
+        return pd.DataFrame(resume, dtype=object)
+
+    def correlation(self):
+        return pd.DataFrame(self.covariance.correlation(), index=self.quantitatives, columns=self.quantitatives)
+
+
+# Suivi du pic mémoire pendant un traitement en flux : tas Python/NumPy (tracemalloc),
+# allocations Arrow et mémoire résidente du processus (échantillonnée à chaque morceau)
+class MesureMemoire:
+    def __enter__(self):
+        self._processus = psutil.Process()
+        self.rss_initial = self._processus.memory_info().rss
+        self.pic_rss = self.rss_initial
+        self.pic_arrow = pa.total_allocated_bytes()
+        self._tracemalloc = not tracemalloc.is_tracing()
+        if self._tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        return self
+
+    def echantillonner(self):
+        self.pic_rss = max(self.pic_rss, self._processus.memory_info().rss)
+        self.pic_arrow = max(self.pic_arrow, pa.total_allocated_bytes())
+
+    def __exit__(self, *exc):
+        self.echantillonner()
+        self.pic_python = tracemalloc.get_traced_memory()[1]
+        if self._tracemalloc:
+            tracemalloc.stop()
+        return False
+
+    def rapport(self):
+        return {"pic_python_octets": self.pic_python, "pic_arrow_octets": self.pic_arrow,
+                "pic_rss_octets": self.pic_rss, "hausse_rss_octets": self.pic_rss - self.rss_initial}
+
+
+# Variables quantitatives et qualitatives d'un morceau (mêmes règles que la page de visualisation) ;
+# les types compacts du magasin (uint8, int16, float32, category) sont reconnus comme les types par défaut
+def types_colonnes(morceau):
+    quantitatives = list(morceau.select_dtypes(include="number").columns)
+    qualitatives = list(morceau.select_dtypes(include=["object", "category", "string"]).columns)
+    return quantitatives, qualitatives
+
+
+# Passage unique sur un fichier CSV ou Parquet, à mémoire bornée
+def analyser(source, budget_octets, k=TAILLE_CROQUIS, progression=None, par_groupe=False):
+    stats = None
+    debut = time.perf_counter()
+    with MesureMemoire() as memoire:
+        for morceau in lire_par_morceaux(source, taille_morceau(budget_octets, 20)):
+            if stats is None:
+                stats = StatistiquesFlux(*types_colonnes(morceau), k=k, par_groupe=par_groupe)
+            stats.mettre_a_jour(morceau)
+            memoire.echantillonner()
+            if progression is not None:
+                progression(stats.nb_lignes)
+    rapport = memoire.rapport()
+    rapport["secondes"] = time.perf_counter() - debut
+    return stats, rapport
+
+
+# Écarts aux calculs pandas sur le jeu complet (validation, jeu tenant en mémoire)
+def comparer(stats, donnees):
+    reference = donnees[stats.quantitatives]
+    ecart_moments = np.nanmax(np.abs(stats.moments.moyenne - reference.mean().to_numpy())
+                              / np.maximum(np.abs(reference.mean().to_numpy()), 1e-12))
+    ecart_variance = np.nanmax(np.abs(stats.moments.variance - reference.var().to_numpy())
+                               / np.maximum(reference.var().to_numpy(), 1e-12))
+    ecart_correlation = np.nanmax(np.abs(stats.correlation().to_numpy() - reference.corr().to_numpy()))
+
+    # Erreur de rang des quartiles : part des valeurs strictement inférieures à la valeur retournée
+    ecart_rang = 0.0
+    for colonne in stats.quantitatives:
+        valeurs = np.sort(reference[colonne].dropna().to_numpy(dtype=np.float64))
+        for q, estime in zip((0.25, 0.5, 0.75), stats.quantiles(colonne, [0.25, 0.5, 0.75])):
+            bas = np.searchsorted(valeurs, estime, side="left") / valeurs.size
+            haut = np.searchsorted(valeurs, estime, side="right") / valeurs.size
+            ecart_rang = max(ecart_rang, max(0.0, bas - q, q - haut))
+
+    effectifs_exacts = all(stats.categories[c].serie().sort_index().equals(
+        donnees[c].value_counts().sort_index().rename("count").astype(np.int64)) for c in stats.qualitatives)
+    return {
+        "ecart_relatif_moyenne": float(ecart_moments),
+        "ecart_relatif_variance": float(ecart_variance),
+        "ecart_correlation": float(ecart_correlation),
+        "ecart_rang_quartiles": float(ecart_rang),
+        "effectifs_exacts": bool(effectifs_exacts),
+        "dans_tolerance": bool(max(ecart_moments, ecart_variance, ecart_correlation) <= TOLERANCE_MOMENTS
+                               and ecart_rang <= TOLERANCE_RANG and effectifs_exacts),
+    }
+
+
+# Statistiques d'un fichier en ligne de commande :
+#   python statistiques_flux.py extraction.parquet --budget-mo 64 [--comparer]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Statistiques en flux, à mémoire bornée, d'un fichier CSV ou Parquet")
+    parser.add_argument("fichier", help="Fichier CSV ou Parquet")
+    parser.add_argument("--budget-mo", type=int, default=64, help="Budget mémoire par morceau, en Mo")
+    parser.add_argument("--k", type=int, default=TAILLE_CROQUIS, help="Taille des croquis de quantiles")
+    parser.add_argument("--comparer", action="store_true", help="Comparer à pandas (charge le fichier en mémoire)")
+    args = parser.parse_args()
+
+    stats, rapport = analyser(args.fichier, args.budget_mo * 1024 ** 2, k=args.k)
+    with pd.option_context("display.width", 200, "display.max_columns", 50):
+        print(f"{stats.nb_lignes} lignes en {rapport['secondes']:.2f} s\n")
+        print(stats.describe_quantitatives().round(3), "\n")
+        print(stats.describe_qualitatives(), "\n")
+        print(stats.correlation().round(2), "\n")
+    print(f"Pic mémoire : Python/NumPy {rapport['pic_python_octets'] / 1024 ** 2:.1f} Mo, "
+          f"Arrow {rapport['pic_arrow_octets'] / 1024 ** 2:.1f} Mo, "
+          f"hausse RSS {rapport['hausse_rss_octets'] / 1024 ** 2:.1f} Mo")
+
+    if args.comparer:
+        fichier = args.fichier
+        donnees = pd.read_parquet(fichier) if fichier.lower().endswith(".parquet") else pd.read_csv(fichier)
+        ecarts = comparer(stats, donnees)
+        for cle, valeur in ecarts.items():
+            print(f"{cle} : {valeur}")
+        if not ecarts["dans_tolerance"]:
+            raise SystemExit("Écarts hors des tolérances documentées")
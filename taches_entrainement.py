@@ -0,0 +1,269 @@
+import itertools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
+
+import numpy as np
+from sklearn.base import clone
+
+from evaluation import assembler_resultat
+from instrumentation import enregistrer
+from moteur_entrainement import NB_PROCESSUS_DEFAUT, _executer_unite, etape_unite, executer_unite, pool_partage
+
+# Entraînement en arrière-plan : chaque modèle à entraîner est une tâche (ses plis de validation
+# croisée et son entraînement complet), placée dans une file commune au processus. Un thread
+# d'ordonnancement distribue les unités des tâches, par priorité décroissante, sur un pool de
+# processus (ou sur un thread quand un seul processus est demandé) ; l'entraînement continue
+# pendant les reruns Streamlit et quelle que soit la session qui l'a demandé.
+#   - avancement et résultats partiels (scores des plis terminés) consultables à tout moment ;
+#   - annulation : les unités non lancées sont abandonnées, celles en cours sont ignorées à leur fin ;
+#   - priorité modifiable tant que la tâche n'est pas terminée ;
+#   - un modèle terminé est enregistré dans le cache persistant des modèles (cache_modeles.py),
+#     où la page le retrouve immédiatement, y compris après un redémarrage ;
+#   - un exécuteur devenu inutilisable (processus de travail tué, arrêt de l'interpréteur) remet ses
+#     unités en vol dans la file et est recréé ; une tâche interrompue trop souvent passe en erreur.
+# Ce module n'importe pas Streamlit.
+
+EN_ATTENTE = "en attente"
+EN_COURS = "en cours"
+TERMINEE = "terminée"
+ANNULEE = "annulée"
+ERREUR = "erreur"
+
+ETATS_ACTIFS = (EN_ATTENTE, EN_COURS)
+
+MAX_INTERRUPTIONS = 2  # Pertes d'exécuteur tolérées par tâche avant de la passer en erreur
+
+
+class TacheEntrainement:
+    def __init__(self, cle, nom, modele, lot, priorite, ordre, nb_plis):
+        self.cle = cle
+        self.nom = nom
+        self.modele = modele
+        self.lot = lot
+        self.priorite = priorite
+        self.ordre = ordre  # Ordre de soumission, à priorité égale
+        self.nb_plis = nb_plis
+        self.generation = 0
+        self.reinitialiser()
+
+    # Nouvelle exécution : la génération change, les unités encore en vol de l'exécution précédente
+    # (annulée puis relancée) seront ignorées à leur fin
+    def reinitialiser(self):
+        self.generation += 1
+        self.etat = EN_ATTENTE
+        self.unites = [None] + list(range(self.nb_plis))  # L'entraînement complet d'abord : l'unité la plus longue
+        self.scores = []
+        self.complet = None
+        self.erreur = None
+        self.debut = None
+        self.fin = None
+        self.interruptions = 0
+
+    @property
+    def avancement(self):
+        return (len(self.scores) + (self.complet is not None)) / (self.nb_plis + 1)
+
+    # Résumé affichable (copie : la tâche continue d'évoluer dans le thread d'ordonnancement)
+    def resume(self):
+        duree = None
+        if self.debut is not None:
+            duree = (self.fin or time.time()) - self.debut
+        return {"cle": self.cle, "nom": self.nom, "etat": self.etat, "priorite": self.priorite,
+                "avancement": self.avancement, "plis_termines": len(self.scores), "nb_plis": self.nb_plis,
+                "r2_cv_partiel": float(np.mean(self.scores)) if self.scores else None,
+                "duree_s": duree, "erreur": self.erreur}
+
+
+class FileTaches:
+    def __init__(self, cache, nb_processus=NB_PROCESSUS_DEFAUT, nb_plis=5):
+        self.cache = cache
+        self.nb_processus = nb_processus
+        self.nb_plis = nb_plis
+        self._taches = {}  # clé du cache des modèles -> TacheEntrainement
+        self._lots = {}  # lot (empreinte des données, graine) -> tableaux d'entraînement et de test
+        self._ordres = itertools.count()
+        self._verrou = threading.Lock()
+        self._ordonnanceur = None
+
+    # Ajout d'une tâche ; une tâche déjà connue pour la même clé (même annulée) est renvoyée telle quelle
+    def soumettre(self, cle, nom, modele, lot, tableaux, priorite=0):
+        with self._verrou:
+            if cle in self._taches:
+                return self._taches[cle].resume()
+            if lot not in self._lots:
+                self._lots[lot] = {nom_tableau: np.asarray(tableau) for nom_tableau, tableau in tableaux.items()}
+            tache = TacheEntrainement(cle, nom, clone(modele), lot, priorite, next(self._ordres), self.nb_plis)
+            self._taches[cle] = tache
+            self._demarrer()
+            return tache.resume()
+
+    def annuler(self, cle):
+        with self._verrou:
+            tache = self._taches.get(cle)
+            if tache is not None and tache.etat in ETATS_ACTIFS:
+                tache.etat = ANNULEE
+                tache.unites = []
+                tache.fin = time.time()
+
+    def relancer(self, cle):
+        with self._verrou:
+            tache = self._taches.get(cle)
+            if tache is not None and tache.etat in (ANNULEE, ERREUR):
+                tache.reinitialiser()
+                self._demarrer()
+
+    # Passage en tête de file
+    def prioriser(self, cle):
+        with self._verrou:
+            if cle in self._taches:
+                self._taches[cle].priorite = max(tache.priorite for tache in self._taches.values()) + 1
+
+    # Une tâche terminée n'est plus suivie : son résultat est dans le cache des modèles
+    def oublier(self, cle):
+        with self._verrou:
+            tache = self._taches.get(cle)
+            if tache is not None and tache.etat not in ETATS_ACTIFS:
+                del self._taches[cle]
+                self._nettoyer_lots()
+
+    # Les tableaux d'un lot sont gardés tant qu'une tâche non terminée peut encore les utiliser
+    # (appelée verrou pris)
+    def _nettoyer_lots(self):
+        utilises = {tache.lot for tache in self._taches.values() if tache.etat != TERMINEE}
+        self._lots = {lot: tableaux for lot, tableaux in self._lots.items() if lot in utilises}
+
+    def resumes(self, cles=None):
+        with self._verrou:
+            taches = [self._taches[cle] for cle in (cles if cles is not None else self._taches) if cle in self._taches]
+            return [tache.resume() for tache in taches]
+
+    def actives(self):
+        with self._verrou:
+            return sum(1 for tache in self._taches.values() if tache.etat in ETATS_ACTIFS)
+
+    # Démarrage du thread d'ordonnancement s'il est arrêté (appelé verrou pris)
+    def _demarrer(self):
+        if self._ordonnanceur is None:
+            self._ordonnanceur = threading.Thread(target=self._ordonnancer, name="file-taches", daemon=True)
+            self._ordonnanceur.start()
+
+    # Prochaine tâche ayant des unités à lancer, de priorité la plus haute (appelée verrou pris)
+    def _prochaine(self, lot=None):
+        candidates = [tache for tache in self._taches.values()
+                      if tache.unites and (lot is None or tache.lot == lot)]
+        return max(candidates, key=lambda tache: (tache.priorite, -tache.ordre), default=None)
+
+    def _ordonnancer(self):
+        try:
+            while True:
+                with self._verrou:
+                    tache = self._prochaine()
+                    if tache is None:
+                        self._ordonnanceur = None
+                        self._nettoyer_lots()
+                        return
+                    lot = tache.lot
+                self._executer_lot(lot)
+        finally:
+            # Sortie sur une erreur inattendue : la prochaine soumission relance un thread d'ordonnancement
+            with self._verrou:
+                if self._ordonnanceur is threading.current_thread():
+                    self._ordonnanceur = None
+
+    # Exécuteur des unités d'un lot : pool de processus partageant les tableaux, ou un thread
+    @contextmanager
+    def _executeur(self, tableaux):
+        if self.nb_processus <= 1:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="entrainement") as executeur:
+                yield executeur, partial(executer_unite, tableaux=tableaux)
+        else:
+            partages = {nom: tableaux[nom] for nom in ("X_train", "y_train", "X_test")}
+            with pool_partage(partages, self.nb_processus) as pool:
+                yield pool, _executer_unite
+
+    # Exécution des tâches d'un lot tant qu'il leur reste des unités ; la priorité est relue
+    # à chaque unité lancée, une tâche priorisée passe donc devant dès qu'une place se libère.
+    # Si l'exécuteur devient inutilisable, les unités en vol sont remises en file et le lot s'arrête :
+    # le thread d'ordonnancement crée un nouvel exécuteur pour le lot suivant.
+    def _executer_lot(self, lot):
+        tableaux = self._lots[lot]
+        en_vol, perdues = {}, []
+        try:
+            with self._executeur(tableaux) as (executeur, fonction):
+                while True:
+                    with self._verrou:
+                        while len(en_vol) < max(1, self.nb_processus):
+                            tache = self._prochaine(lot)
+                            if tache is None:
+                                break
+                            pli = tache.unites.pop(0)
+                            if tache.debut is None:
+                                tache.etat, tache.debut = EN_COURS, time.time()
+                            try:
+                                future = executeur.submit(fonction, tache.modele, pli, tache.nb_plis)
+                            except RuntimeError:  # Pool cassé, ou interpréteur en cours d'arrêt
+                                perdues.append((tache, pli, tache.generation))
+                                raise
+                            en_vol[future] = (tache, pli, tache.generation)
+                    if not en_vol:
+                        return
+                    terminees, _ = wait(en_vol, return_when=FIRST_COMPLETED)
+                    cassure = None
+                    for future in terminees:
+                        if isinstance(future.exception(), BrokenExecutor):
+                            cassure = future.exception()  # L'unité reste en vol : elle sera remise en file
+                            continue
+                        self._terminer_unite(*en_vol.pop(future), future, tableaux)
+                    if cassure is not None:
+                        raise cassure
+        except RuntimeError as e:  # BrokenExecutor en hérite
+            self._reprendre(perdues + list(en_vol.values()), e)
+
+    # Remise en file des unités perdues avec leur exécuteur ; une tâche interrompue plus de
+    # MAX_INTERRUPTIONS fois passe en erreur
+    def _reprendre(self, unites, erreur):
+        with self._verrou:
+            for tache in {tache for tache, _, generation in unites if generation == tache.generation}:
+                if tache.etat != EN_COURS:
+                    continue  # Tâche annulée entre-temps
+                tache.interruptions += 1
+                if tache.interruptions > MAX_INTERRUPTIONS:
+                    message = f"Exécution interrompue {tache.interruptions} fois ({type(erreur).__name__} : {erreur})"
+                    tache.etat, tache.erreur, tache.unites, tache.fin = ERREUR, message, [], time.time()
+                else:
+                    tache.unites[:0] = [pli for autre, pli, _ in unites if autre is tache]
+
+    def _terminer_unite(self, tache, pli, generation, future, tableaux):
+        with self._verrou:
+            if tache.etat != EN_COURS or tache.generation != generation:
+                return  # Tâche annulée (et peut-être relancée) pendant l'unité : résultat ignoré
+            try:
+                resultat, secondes = future.result()
+            except Exception as e:
+                tache.etat, tache.erreur, tache.unites, tache.fin = ERREUR, str(e), [], time.time()
+                return
+            enregistrer(etape_unite(pli), secondes)
+            if pli is None:
+                tache.complet = resultat
+            else:
+                tache.scores.append(resultat)
+            if tache.complet is None or len(tache.scores) < tache.nb_plis:
+                return
+            complet, scores = tache.complet, tache.scores
+
+        try:
+            evaluation = assembler_resultat(complet, scores, tableaux["y_train"], tableaux["y_test"])
+            self.cache.stocker(tache.cle, evaluation)
+        except Exception as e:
+            with self._verrou:
+                if tache.generation == generation:
+                    tache.etat, tache.erreur, tache.fin = ERREUR, str(e), time.time()
+            return
+        with self._verrou:
+            if tache.generation != generation:
+                return  # Relancée pendant l'assemblage : la nouvelle exécution suit son cours
+            tache.complet = True  # L'estimateur est désormais dans le cache des modèles
+            tache.etat, tache.fin = TERMINEE, time.time()
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from arbres_compiles import compiler, compiler_si_possible  # noqa: E402
+from benchmarks.bench_arbres import matrice_codes  # noqa: E402
+from catalogue_modeles import FEATURES  # noqa: E402
+from pretraitement import COLONNES_BRUTES, Pretraitement, colonne_source  # noqa: E402
+from schema_donnees import TYPE_MATRICE  # noqa: E402
+
+# Parité bit à bit de l'inférence compilée avec sklearn, pour chaque espace d'entrée d'artefact :
+# artefacts livrés ("codes" avec feature_names_in_, pipeline "brut") et modèles de la page de
+# modélisation (régresseur nu entraîné sur la matrice standardisée, format "standardise").
+
+ARTEFACTS = {
+    "Gradient Boosting Regressor.joblib": "codes",
+    "Decision Tree Regressor_model.joblib": "brut",
+}
+TAILLES = [1, 100, 5_000]
+
+
+def verifier_parite(modele, metadonnees, pretraitement):
+    foret = compiler(modele, metadonnees, pretraitement)
+    for taille in TAILLES:
+        X = matrice_codes(taille, graine=taille)
+        reference = modele.predict(pretraitement.pour_modele(X, metadonnees))
+        np.testing.assert_array_equal(foret.predict(X), reference)
+
+
+@pytest.mark.parametrize("fichier", list(ARTEFACTS))
+def test_parite_artefacts_fournis(fichier):
+    modele = joblib.load(os.path.join(RACINE, fichier))
+    verifier_parite(modele, {"format_entree": ARTEFACTS[fichier], "features": COLONNES_BRUTES}, Pretraitement())
+
+
+# Régresseur entraîné comme sur la page : variables FEATURES standardisées, matrice float32, sans noms
+def modele_standardise(regresseur):
+    X_codes = matrice_codes(2_000, graine=7)
+    X_entrainement = pd.DataFrame(X_codes[:, [COLONNES_BRUTES.index(colonne_source(f)) for f in FEATURES]],
+                                  columns=FEATURES)
+    pretraitement = Pretraitement().ajuster(X_entrainement)
+    y = X_codes @ np.linspace(0.1, 1.0, len(COLONNES_BRUTES)) + np.random.default_rng(0).normal(0, 1, len(X_codes))
+    regresseur.fit(pretraitement.standardiser(X_codes, dtype=TYPE_MATRICE), y)
+    return regresseur, pretraitement
+
+
+@pytest.mark.parametrize("regresseur", [GradientBoostingRegressor(n_estimators=50, random_state=0),
+                                        DecisionTreeRegressor(max_depth=8, random_state=0)])
+def test_parite_artefact_standardise(regresseur):
+    modele, pretraitement = modele_standardise(regresseur)
+    verifier_parite(modele, {"format_entree": "standardise", "features": FEATURES}, pretraitement)
+
+
+# Sans métadonnées, un régresseur nu (sans feature_names_in_) n'a pas d'espace d'entrée connu : refusé
+def test_refus_espace_entree_inconnu():
+    modele, pretraitement = modele_standardise(DecisionTreeRegressor(max_depth=4, random_state=0))
+    assert compiler_si_possible(modele) is None
+    assert compiler_si_possible(modele, {"format_entree": "standardise", "features": FEATURES}) is None
+    assert compiler_si_possible(modele, {"format_entree": "standardise", "features": FEATURES}, pretraitement) \
+        is not None
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from statistiques_flux import (TOLERANCE_MOMENTS, TOLERANCE_RANG, StatistiquesFlux, comparer,  # noqa: E402
+                               types_colonnes)
+
+# Tolérances documentées des statistiques en flux face à pandas, sur un petit jeu généré :
+# moments et corrélations aux arrondis près, erreur de rang des quartiles sous 1 %, effectifs exacts.
+# Les croquis sont plus petits que le jeu : les quantiles sont bien approchés, pas exacts.
+
+NB_LIGNES = 20_000
+TAILLE_MORCEAU = 1_500
+K = 256
+
+
+# Jeu mêlant variables entières, réelles décalées (stabilité numérique), valeurs manquantes et catégories
+def jeu_genere(graine=0):
+    generateur = np.random.default_rng(graine)
+    heures = generateur.integers(1, 45, NB_LIGNES).astype(np.float64)
+    donnees = pd.DataFrame({
+        "Hours_Studied": heures,
+        "Attendance": generateur.integers(60, 101, NB_LIGNES),
+        "Exam_Score": 55 + 0.3 * heures + generateur.normal(0, 3, NB_LIGNES),
+        "Decale": 1e6 + generateur.normal(0, 1, NB_LIGNES),
+        "Motivation_Level": generateur.choice(["Low", "Medium", "High"], NB_LIGNES),
+        "Gender": generateur.choice(["Male", "Female"], NB_LIGNES),
+    })
+    donnees.loc[generateur.random(NB_LIGNES) < 0.05, "Hours_Studied"] = np.nan
+    donnees.loc[generateur.random(NB_LIGNES) < 0.02, "Motivation_Level"] = None
+    return donnees
+
+
+# Statistiques d'un jeu lu morceau par morceau
+def statistiques(donnees, colonnes):
+    stats = StatistiquesFlux(*colonnes, k=K)
+    for debut in range(0, len(donnees), TAILLE_MORCEAU):
+        stats.mettre_a_jour(donnees.iloc[debut:debut + TAILLE_MORCEAU])
+    return stats
+
+
+def verifier_tolerances(ecarts):
+    assert ecarts["ecart_relatif_moyenne"] <= TOLERANCE_MOMENTS
+    assert ecarts["ecart_relatif_variance"] <= TOLERANCE_MOMENTS
+    assert ecarts["ecart_correlation"] <= TOLERANCE_MOMENTS
+    assert ecarts["ecart_rang_quartiles"] <= TOLERANCE_RANG
+    assert ecarts["effectifs_exacts"]
+    assert ecarts["dans_tolerance"]
+
+
+def test_passage_unique():
+    donnees = jeu_genere()
+    verifier_tolerances(comparer(statistiques(donnees, types_colonnes(donnees)), donnees))
+
+
+# États partiels calculés séparément (un par partie du jeu, tailles inégales) puis fusionnés
+@pytest.mark.parametrize("coupures", [[10_000], [3_000, 9_500, 17_000]])
+def test_etats_fusionnes(coupures):
+    donnees = jeu_genere(graine=len(coupures))
+    colonnes = types_colonnes(donnees)
+    bornes = [0] + coupures + [len(donnees)]
+    parties = [statistiques(donnees.iloc[debut:fin], colonnes) for debut, fin in zip(bornes, bornes[1:])]
+
+    fusion = parties[0]
+    for partie in parties[1:]:
+        fusion.fusionner(partie)
+    assert fusion.nb_lignes == len(donnees)
+    verifier_tolerances(comparer(fusion, donnees))
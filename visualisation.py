@@ -1,18 +1,11 @@
 import streamlit as st
-import pandas as pd
+import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
-
-# Charger la base de données existante
-@st.cache_data
-def charger_donnees():
-    # Simuler la base "data" existante
-    try:
-        data = pd.read_csv("https://raw.githubusercontent.com/OusseynouDIOP16/IML_STUDENT_PERFORMANCE/main/StudentPerformanceFactors.csv", sep=",")
-        return data
-    except Exception as e:
-        st.error(f"Erreur lors du chargement des données : {e}")
-        return pd.DataFrame()
+from donnees import colonnes_donnees_brutes
+from agregats import charger_agregats
+from instrumentation import mesurer
+from rendu_figures import figure_png
 
 # Affichage des statistiques générales sous une forme améliorée
 def afficher_statistiques_generales(total_students, moyenne_exam_score, moyenne_sleep, heures_etude_median):
@@ -53,60 +46,102 @@ def afficher_statistiques_generales(total_students, moyenne_exam_score, moyenne_
 
     st.divider()  # Ajout d'un séparateur pour une meilleure organisation visuelle
 
+# Boîtes à moustaches tracées depuis les statistiques précalculées du cube
+def tracer_boites(ax, boites, etiquettes, couleurs):
+    elements = ax.bxp(boites, positions=range(len(boites)), widths=0.6, patch_artist=True, showfliers=True,
+                      medianprops={"color": "#3b3b3b"}, flierprops={"marker": "o", "markerfacecolor": "none"})
+    for boite, couleur in zip(elements["boxes"], couleurs):
+        boite.set_facecolor(couleur)
+    ax.set_xticks(range(len(boites)), etiquettes)
+
+# Rendu d'un graphique (mesuré : c'est l'étape la plus coûteuse de la page). L'image est mise en cache
+# par (empreinte des données, type de graphique, variables) ; tracer() n'est appelé qu'en cas d'absence.
+def afficher_figure(cle, tracer):
+    with mesurer("visualisation.rendu_graphique"):
+        st.image(figure_png(cle, tracer), use_container_width=True)
+
 # Fonction pour afficher toutes les visualisations
-def afficher_page_visualisation(data):
+def afficher_page_visualisation():
     st.title("📊 Visualisation des Données Étudiantes")
 
-    if data.empty:
+    # Les graphiques sont tracés depuis le cube d'agrégats, calculé une fois par empreinte des données :
+    # une fois le cube enregistré, la page s'affiche sans charger les données elles-mêmes
+    try:
+        with mesurer("visualisation.agregats"):
+            cube = charger_agregats()
+            colonnes = colonnes_donnees_brutes()
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des données : {e}")
+        return
+
+    if cube["nb_lignes"] == 0:
         st.warning("Aucune donnée à afficher.")
         return
 
     # **Statistiques générales**
-    total_students = data.shape[0]
-    moyenne_exam_score = data["Exam_Score"].mean()
-    moyenne_sleep = data["Sleep_Hours"].mean()
-    heures_etude_median = data["Hours_Studied"].median()
-
-    afficher_statistiques_generales(total_students, moyenne_exam_score, moyenne_sleep, heures_etude_median)
+    total_students = cube["nb_lignes"]
+    generales = cube["generales"]
+    afficher_statistiques_generales(total_students, generales["moyenne_exam_score"], generales["moyenne_sleep"],
+                                    generales["heures_etude_median"])
 
     # **Analyse des variables quantitatives**
     st.subheader("📈 Analyse des Variables Quantitatives")
-    quantitative_vars = data.select_dtypes(include=['int64', 'float64']).columns
+    quantitative_vars = cube["quantitatives"]
     var_quant = st.selectbox("Choisissez une variable quantitative", quantitative_vars)
 
+    empreinte = cube["empreinte"]
+
     # Histogramme avec courbe KDE
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(data[var_quant], kde=True, color="skyblue", bins=30, ax=ax)
-    plt.title(f"Distribution de {var_quant}")
-    st.pyplot(fig)
+    def tracer_histogramme():
+        histogramme = cube["histogrammes"][var_quant]
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.bar(histogramme["bornes"][:-1], histogramme["effectifs"], width=np.diff(histogramme["bornes"]),
+               align="edge", color="skyblue", edgecolor="white", alpha=0.75)
+        if histogramme["densite"] is not None:
+            ax.plot(histogramme["densite"]["x"], histogramme["densite"]["y"], color="skyblue")
+        ax.set_xlabel(var_quant)
+        ax.set_ylabel("Count")
+        plt.title(f"Distribution de {var_quant}")
+        return fig
+    afficher_figure((empreinte, "histogramme", var_quant), tracer_histogramme)
 
     # Boxplot pour voir les valeurs aberrantes
     st.subheader("Boxplot de la variable sélectionnée")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.boxplot(data[var_quant], color="lightgreen", ax=ax)
-    plt.xlabel(var_quant)
-    st.pyplot(fig)
+    def tracer_boxplot():
+        fig, ax = plt.subplots(figsize=(10, 6))
+        tracer_boites(ax, [cube["boites"][var_quant]], [""], ["lightgreen"])
+        plt.xlabel(var_quant)
+        return fig
+    afficher_figure((empreinte, "boxplot", var_quant), tracer_boxplot)
 
     st.divider()
 
     # **Analyse des variables qualitatives**
     st.subheader("📊 Analyse des Variables Qualitatives")
-    qualitative_vars = data.select_dtypes(include=['object']).columns
+    qualitative_vars = cube["qualitatives"]
     var_qual = st.selectbox("Choisissez une variable qualitative", qualitative_vars)
+    effectifs = cube["effectifs"][var_qual]
 
     # Diagramme en barres
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.countplot(x=var_qual, data=data, palette="Set2", ax=ax)
-    plt.title(f"Répartition de {var_qual}")
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
+    def tracer_barres():
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.bar(effectifs.index.astype(str), effectifs.to_numpy(), color=sns.color_palette("Set2", len(effectifs)))
+        ax.set_xlabel(var_qual)
+        ax.set_ylabel("count")
+        plt.title(f"Répartition de {var_qual}")
+        plt.xticks(rotation=45)
+        return fig
+    afficher_figure((empreinte, "barres", var_qual), tracer_barres)
 
     # Pie Chart
     st.subheader("Diagramme Circulaire")
-    fig, ax = plt.subplots(figsize=(8, 8))
-    data[var_qual].value_counts().plot.pie(autopct='%1.1f%%', startangle=90, cmap="Pastel1", ax=ax)
-    plt.ylabel("")
-    st.pyplot(fig)
+    def tracer_camembert():
+        fig, ax = plt.subplots(figsize=(8, 8))
+        effectifs.sort_values(ascending=False, kind="stable").plot.pie(autopct='%1.1f%%', startangle=90,
+                                                                       cmap="Pastel1", ax=ax)
+        plt.ylabel("")
+        return fig
+    afficher_figure((empreinte, "camembert", var_qual), tracer_camembert)
 
     st.divider()
 
@@ -114,41 +149,62 @@ def afficher_page_visualisation(data):
     st.subheader("🔄 Analyse Croisée : Qualitatif vs Quantitatif")
     quant_cross = st.selectbox("Variable Quantitative", quantitative_vars, key="quant_cross")
     qual_cross = st.selectbox("Variable Qualitative", qualitative_vars, key="qual_cross")
+    groupes = cube["groupes"][(qual_cross, quant_cross)]
+    categories = [str(categorie) for categorie in groupes]
 
     # Boxplot croisé
     st.subheader(f"Boxplot : {quant_cross} en fonction de {qual_cross}")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.boxplot(x=qual_cross, y=quant_cross, data=data, palette="coolwarm", ax=ax)
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
-
-    # Barplot moyen pour analyser la moyenne
+    def tracer_boxplot_croise():
+        fig, ax = plt.subplots(figsize=(10, 6))
+        tracer_boites(ax, list(groupes.values()), categories, sns.color_palette("coolwarm", len(groupes)))
+        ax.set_xlabel(qual_cross)
+        ax.set_ylabel(quant_cross)
+        plt.xticks(rotation=45)
+        return fig
+    afficher_figure((empreinte, "boxplot_croise", qual_cross, quant_cross), tracer_boxplot_croise)
+
+    # Barplot moyen pour analyser la moyenne (intervalle de confiance à 95 % de la moyenne,
+    # calculé depuis les moments du groupe plutôt que par bootstrap sur les lignes)
     st.subheader(f"Barplot : Moyenne de {quant_cross} par {qual_cross}")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    sns.barplot(x=qual_cross, y=quant_cross, data=data, palette="viridis", estimator="mean", ax=ax)
-    plt.xticks(rotation=45)
-    st.pyplot(fig)
+    def tracer_moyennes():
+        moyennes = np.array([groupe["mean"] for groupe in groupes.values()])
+        marges = np.array([1.96 * groupe["std"] / np.sqrt(groupe["count"]) if groupe["count"] > 1 else 0.0
+                           for groupe in groupes.values()])
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.bar(categories, moyennes, color=sns.color_palette("viridis", len(groupes)))
+        ax.errorbar(categories, moyennes, yerr=marges, fmt="none", ecolor="#3b3b3b", elinewidth=2.5)
+        ax.set_xlabel(qual_cross)
+        ax.set_ylabel(quant_cross)
+        plt.xticks(rotation=45)
+        return fig
+    afficher_figure((empreinte, "moyennes", qual_cross, quant_cross), tracer_moyennes)
 
     st.divider()
 
     # **Heatmap de corrélation des variables quantitatives**
     st.subheader("🔥 Matrice de Corrélation des Variables Quantitatives")
-    fig, ax = plt.subplots(figsize=(12, 8))
-    sns.heatmap(data[quantitative_vars].corr(), annot=True, cmap="coolwarm", fmt=".2f", ax=ax)
-    plt.title("Matrice de Corrélation")
-    st.pyplot(fig)
+    def tracer_correlation():
+        fig, ax = plt.subplots(figsize=(12, 8))
+        sns.heatmap(cube["correlation"], annot=True, cmap="coolwarm", fmt=".2f", ax=ax)
+        plt.title("Matrice de Corrélation")
+        return fig
+    afficher_figure((empreinte, "correlation"), tracer_correlation)
 
     st.divider()
 
     # **Statistiques détaillées pour les variables sélectionnées**
     st.subheader("📋 Statistiques Résumées")
-    stats_var = st.multiselect("Sélectionnez les variables pour voir leurs statistiques", data.columns)
+    stats_var = st.multiselect("Sélectionnez les variables pour voir leurs statistiques", colonnes)
     if stats_var:
-        st.write(data[stats_var].describe())
+        # Comme DataFrame.describe : les variables quantitatives priment sur les qualitatives
+        selection_quant = [var for var in stats_var if var in quantitative_vars]
+        if selection_quant:
+            st.write(cube["describe_quantitatives"][selection_quant])
+        else:
+            st.write(cube["describe_qualitatives"][stats_var])
     else:
         st.warning("Aucune variable sélectionnée pour les statistiques.")
 
 # Lancer l'application Streamlit
 if __name__ == "__main__":
-    data = charger_donnees()
-    afficher_page_visualisation(data)
+    afficher_page_visualisation()